@@ -0,0 +1,242 @@
+"""
+Render latency and memory benchmarks for both pages of the app.
+
+Every stage is timed on its own: the data loaders, building the panel 1 figure for every slider value,
+the panel 2 figures and every Incidents section (load + build). On top of that, both pages are run
+headlessly with Streamlit's AppTest harness to time full reruns, per slider value and per opened section.
+Each stage records the peak and the retained Python allocations of the stage (tracemalloc, reset per stage),
+the size of the figure JSON that would be sent to the browser and, for reference, the peak RSS of the whole
+process so far. ru_maxrss never decreases, so that column is cumulative and says nothing about one stage.
+
+Results are stored as JSON, compare two runs with --compare.
+
+Usage:
+    python benchmarks/run_benchmarks.py [--repeat N] [--out FILE]
+    python benchmarks/run_benchmarks.py --compare OLD.json NEW.json
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable
+
+ROOT = Path(__file__).parent.parent
+CODE_DIR = ROOT / 'code'
+RESULTS_DIR = Path(__file__).parent / 'results'
+sys.path.insert(0, str(CODE_DIR))
+
+import plotly.io as pio
+from streamlit.testing.v1 import AppTest
+
+import data_utils
+import figure_cache
+import incident_plots
+import plot_utils
+
+
+MAIN_PAGE = CODE_DIR / 'Sri_Lankas_Journey.py'
+INCIDENTS_PAGE = CODE_DIR / 'pages' / 'Incidents.py'
+INCIDENTS_DIR = data_utils.DATA_DIR / 'incidents'
+
+# section key in pages/Incidents.py -> (builder, csv, extra builder arguments)
+INCIDENT_SECTIONS = {
+    'tsunami': (incident_plots.plot_tsunami_map, 'tsunami_data.csv', ()),
+    'civil_war': (incident_plots.plot_civil_war_map, 'civil_war_events_2000_2009.csv', (2000,)),
+    'financial_crisis': (incident_plots.plot_financial_crisis_map, 'financial_crisis_data.csv', ()),
+    'refugee_crisis': (incident_plots.plot_refugee_crisis_map, 'refugee_crisis_data.csv', ()),
+    'tourism_boom': (incident_plots.plot_tourism_boom, 'Tourism_Sri_Lanka_2016_2019.csv', ()),
+    'easter_attacks': (incident_plots.plot_easter_attacks_map, 'easter_attacks_data.csv', ()),
+    'covid': (incident_plots.plot_covid, 'covid_data.csv', ()),
+    'economic_crisis': (incident_plots.plot_economic_crisis, 'economic_crisis_data.csv', ()),
+}
+
+
+def process_peak_rss_kb() -> int:
+    # the peak of the process lifetime, kilobytes on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == 'darwin' else peak
+
+
+def measure(run: Callable[[], object], repeat: int, setup: Callable[[], None] | None = None) -> dict:
+    """
+    Calls setup() and run() `repeat` times and returns the timings of run(), plus the allocations of one
+    extra run (tracing allocations would distort the timings): the peak during the run and what it retained.
+    """
+    timings = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        run()
+        timings.append((time.perf_counter() - start) * 1000)
+
+    if setup is not None:
+        setup()
+    tracemalloc.start()
+    result = run()
+    traced_current, traced_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    stage = {
+        'median_ms': statistics.median(timings),
+        'min_ms': min(timings),
+        'max_ms': max(timings),
+        'runs': repeat,
+        'traced_peak_kb': traced_peak // 1024,
+        'traced_retained_kb': traced_current // 1024,
+        'process_peak_rss_kb': process_peak_rss_kb(),
+    }
+    payload = payload_bytes(result)
+    if payload:
+        stage['payload_bytes'] = payload
+    return stage
+
+
+def payload_bytes(result: object) -> int:
+    """
+    Size of the figure JSON sent to the browser, for figures and AppTest runs.
+    """
+    if isinstance(result, AppTest):
+        return sum(len(chart.proto.spec) for chart in result.get('plotly_chart'))
+    if hasattr(result, 'to_plotly_json'):
+        return len(pio.to_json(result, validate=False))
+    if isinstance(result, dict):
+        return sum(payload_bytes(value) for value in result.values())
+    return 0
+
+
+def bench_loaders(repeat: int) -> dict[str, dict]:
+    return {
+        'load_data (cold)': measure(lambda: data_utils.load_data(), repeat, setup=data_utils.clear_cache),
+        'load_data (cached)': measure(lambda: data_utils.load_data(), repeat),
+    }
+
+
+def bench_figures(repeat: int) -> dict[str, dict]:
+    stages = {}
+    data = data_utils.load_data()
+
+    for year in plot_utils.YEAR_OPTIONS:
+        stages[f'plot_panel1 build {year}'] = measure(lambda: plot_utils.build_panel1_figure(data, year), repeat)
+
+    sl_events = data_utils.load_sl_events(data_utils.DATA_DIR / 'sl_events.json')
+    stages['plot_panel1 animation build'] = measure(lambda: plot_utils.build_panel1_animation(data, sl_events), repeat)
+
+    panel2 = {
+        'inflation': plot_utils.plot_inflation_data,
+        'GDP': plot_utils.plot_GDP_data,
+        'happiness': plot_utils.plot_happiness_data,
+        'tourism': plot_utils.plot_tourism_data,
+    }
+    stages['plot_panel2 build'] = measure(lambda: {key: build(data[key]) for key, build in panel2.items()}, repeat)
+
+    for key, (builder, csv, args) in INCIDENT_SECTIONS.items():
+        def section() -> object:
+            if key == 'civil_war':
+                df = data_utils.load_events_by_year(INCIDENTS_DIR / csv)[args[0]]
+            else:
+                df = data_utils.load_incident_data(INCIDENTS_DIR / csv)
+            return builder(df, *args)
+        stages[f'incidents {key} build'] = measure(section, repeat, setup=data_utils.clear_cache)
+
+    return stages
+
+
+def bench_pages(repeat: int) -> dict[str, dict]:
+    stages = {}
+
+    # first run of a session, caches of earlier runs in this process stay warm
+    stages['main page first run'] = measure(lambda: AppTest.from_file(str(MAIN_PAGE), default_timeout=60).run(), repeat)
+
+    main = AppTest.from_file(str(MAIN_PAGE), default_timeout=60).run()
+    for year in plot_utils.YEAR_OPTIONS:
+        def select_year() -> AppTest:
+            return main.select_slider[0].set_value(year).run()
+        stages[f'main page rerun slider={year}'] = measure(select_year, repeat)
+
+    stages['incidents page first run'] = measure(lambda: AppTest.from_file(str(INCIDENTS_PAGE), default_timeout=60).run(), repeat)
+
+    for key in INCIDENT_SECTIONS:
+        incidents = AppTest.from_file(str(INCIDENTS_PAGE), default_timeout=60).run()
+
+        def open_section() -> AppTest:
+            incidents.session_state[f'expand_{key}'] = True
+            return incidents.run()
+        stages[f'incidents page open {key}'] = measure(open_section, repeat)
+
+    return stages
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def run(repeat: int) -> dict:
+    stages = {}
+    stages.update(bench_loaders(repeat))
+    stages.update(bench_figures(repeat))
+    stages.update(bench_pages(repeat))
+
+    return {
+        'commit': git_commit(),
+        'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'figure_cache': figure_cache.ENABLED,
+        'repeat': repeat,
+        'stages': stages,
+    }
+
+
+def compare(old_path: Path, new_path: Path) -> None:
+    with open(old_path) as f:
+        old = json.load(f)
+    with open(new_path) as f:
+        new = json.load(f)
+
+    print(f"{'stage':<40} {old['commit']:>12} {new['commit']:>12} {'change':>8}")
+    for name, stage in new['stages'].items():
+        if name not in old['stages']:
+            print(f"{name:<40} {'-':>12} {stage['median_ms']:>10.2f}ms")
+            continue
+        before, after = old['stages'][name]['median_ms'], stage['median_ms']
+        change = (after / before - 1) * 100 if before else float('nan')
+        print(f"{name:<40} {before:>10.2f}ms {after:>10.2f}ms {change:>+7.1f}%")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=5, help="runs per stage (default: 5)")
+    parser.add_argument('--out', type=Path, help="result file (default: benchmarks/results/<commit>.json)")
+    parser.add_argument('--compare', type=Path, nargs=2, metavar=('OLD', 'NEW'), help="compare two result files")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        sys.exit()
+
+    os.chdir(ROOT)
+    results = run(args.repeat)
+
+    out = args.out or RESULTS_DIR / f"{results['commit']}.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    with open(out, 'w') as f:
+        json.dump(results, f, indent=2)
+
+    for name, stage in results['stages'].items():
+        print(
+            f"{name:<40} {stage['median_ms']:>10.2f}ms  peak {stage['traced_peak_kb'] / 1024:>7.1f}MB  "
+            f"retained {stage['traced_retained_kb'] / 1024:>7.1f}MB  {stage.get('payload_bytes', 0):>9} B"
+        )
+    print(f"Results written to {out}")
@@ -1,23 +1,34 @@
-from pathlib import Path
-from data_utils import load_data, load_sl_events, load_plot_descriptions
+import streamlit as st
+
+from data_utils import DATA_DIR, DATASET_LOADERS, LoadError, load_data, load_plot_descriptions, load_sl_events
 from plot_utils import plot_panel1, plot_panel2
 from definitions import add_heading_and_intro, add_summary
+from instrumentation import render_diagnostics_sidebar
+
 
+sl_events_path = DATA_DIR / 'sl_events.json'
+plot_description_path = DATA_DIR / 'plot_descriptions.json'
 
-data_dir = Path(__file__).parent.parent / 'data'
-sl_events_path = data_dir / 'sl_events.json'
-inflation_path = data_dir / 'inflation/Inflation_Germany_SriLanka_2000_2023.csv'
-GDP_path = data_dir / 'gdp/gdp_de_sl_V2.csv'
-happiness_path = data_dir / 'happiness/happiness_de_sl.csv'
-tourism_path = data_dir / 'tourism/tourism_de_sl.csv'
-plot_description_path = data_dir / 'plot_descriptions.json'
 
+# the datasets in parallel, a failed source is reported and only hides the charts that depend on it
+try:
+    data = load_data()
+except LoadError as e:
+    for name, error in e.errors.items():
+        st.error(f"Could not load {name}: {error}")
+    data = e.results
 
-data = load_data(inflation_path, GDP_path, happiness_path, tourism_path)
-sl_events = load_sl_events(sl_events_path)
-plot_desc = load_plot_descriptions(plot_description_path)
+texts = {}
+for name, loader, path in [('sl_events', load_sl_events, sl_events_path), ('plot_descriptions', load_plot_descriptions, plot_description_path)]:
+    try:
+        texts[name] = loader(path)
+    except (OSError, ValueError) as e:
+        st.error(f"Could not load {name}: {e}")
 
 add_heading_and_intro()
-plot_panel1(data, sl_events)
-plot_panel2(data, plot_desc)
+# the timeline combines all four datasets, each comparison chart needs only its own
+if all(dataset in data for dataset in DATASET_LOADERS):
+    plot_panel1(data, texts.get('sl_events', {}))
+plot_panel2(data, texts.get('plot_descriptions', {}))
 add_summary()
+render_diagnostics_sidebar()
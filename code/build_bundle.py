@@ -0,0 +1,81 @@
+"""
+Compiles the curated CSVs in data/ into a columnar bundle of Arrow IPC files
+that data_utils.read_table memory-maps instead of parsing text at runtime.
+
+Usage: python code/build_bundle.py
+"""
+import argparse
+import json
+import os
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+
+from data_utils import BUNDLE_DIR, DATA_DIR, file_digest
+from schemas import SCHEMAS, enforce_schema
+
+
+# source CSV (relative to data/) -> index columns
+SOURCES: dict[str, list[int] | None] = {
+    'inflation/Inflation_Germany_SriLanka_2000_2023.csv': [0, 1],
+    'gdp/gdp_de_sl_V2.csv': [0, 1],
+    'happiness/happiness_de_sl.csv': [0, 1],
+    'tourism/tourism_de_sl.csv': [0, 1],
+    'incidents/Tourism_Sri_Lanka_2016_2019.csv': None,
+    'incidents/civil_war_events_2000_2009.csv': None,
+    'incidents/covid_data.csv': None,
+    'incidents/easter_attacks_data.csv': None,
+    'incidents/economic_crisis_data.csv': None,
+    'incidents/financial_crisis_data.csv': None,
+    'incidents/refugee_crisis_data.csv': None,
+    'incidents/tsunami_data.csv': None,
+}
+
+
+def build_bundle(out_dir: Path = BUNDLE_DIR) -> dict:
+    out_dir.mkdir(parents=True, exist_ok=True)
+    tables = {}
+
+    for source, index_col in SOURCES.items():
+        path = DATA_DIR / source
+        # typed once here, so loading the bundle needs no casts
+        df = enforce_schema(pd.read_csv(path, index_col=index_col), SCHEMAS[source], source)
+        if index_col is not None:
+            df = df.sort_index() # (Year, Country)
+
+        table = pa.Table.from_pandas(df, preserve_index=index_col is not None)
+        file = source.replace('/', '__').removesuffix('.csv') + '.arrow'
+
+        # uncompressed, so readers can map the buffers without copying
+        tmp = out_dir / (file + '.tmp')
+        with pa.OSFile(str(tmp), 'wb') as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        os.replace(tmp, out_dir / file)
+
+        stat = os.stat(path)
+        tables[source] = {
+            'file': file,
+            'sha256': file_digest(path),
+            'mtime_ns': stat.st_mtime_ns,
+            'size': stat.st_size,
+            'rows': table.num_rows,
+        }
+
+    manifest = {'tables': tables}
+    # atomic, the app may read the bundle while it is rebuilt (see refresh.py)
+    tmp = out_dir / 'manifest.json.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp, out_dir / 'manifest.json')
+    return manifest
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.parse_args()
+
+    manifest = build_bundle()
+    for source, entry in manifest['tables'].items():
+        print(f"{source} -> {entry['file']} ({entry['rows']} rows)")
@@ -0,0 +1,303 @@
+"""
+Builds the derived datasets in data/ from the raw files they come from.
+
+TARGETS declares every output with its inputs (paths relative to data/), the function building it and the
+modules that function delegates to. Outputs that are inputs of other targets form a dependency graph, which is
+built in topological order. A target is rebuilt only if it is stale: its output is missing or was edited, or
+the content of an input or the code of its recipe changed since the last build, as recorded in
+data/.build_state.json.
+
+Usage: python code/build_data.py [TARGET ...] [--force] [--dry-run]
+"""
+import argparse
+import hashlib
+import inspect
+import json
+import os
+import time
+from graphlib import TopologicalSorter
+from pathlib import Path
+from types import ModuleType
+from typing import Callable
+
+import numpy as np
+import pandas as pd
+
+import build_bundle
+import happiness
+import images
+import peers
+import schemas
+import worldbank
+from data_utils import BUNDLE_DIR, DATA_DIR, file_digest, previous_year
+
+
+BUILD_STATE = DATA_DIR / '.build_state.json'
+
+
+def _write_csv(df: pd.DataFrame, output: Path, **kwargs) -> None:
+    # atomic, a failed build never leaves a half-written dataset behind
+    tmp = output.with_name(output.name + '.tmp')
+    df.to_csv(tmp, **kwargs)
+    os.replace(tmp, output)
+
+
+def build_inflation(inputs: list[Path], output: Path) -> None:
+    """
+    Annual consumer price inflation of Germany (Destatis table 61111-0001) and Sri Lanka (FRED FPCPITOTLZGLKA),
+    with the reason for every year from inflation_reasons.csv.
+    """
+    germany_path, sri_lanka_path, reasons_path = inputs
+
+    # Destatis export: 6 header lines, then year;index;flag;annual change (%);flag, then a footer
+    germany = pd.read_csv(
+        germany_path, sep=';', skiprows=6, header=None, usecols=[0, 3], names=['Year', 'Inflation Value (%)'],
+        encoding='utf-8-sig'
+    )
+    germany = germany[pd.to_numeric(germany['Year'], errors='coerce').notna()].astype({'Year': int, 'Inflation Value (%)': float})
+
+    sri_lanka = pd.read_csv(sri_lanka_path, parse_dates=['observation_date'])
+    sri_lanka = pd.DataFrame({
+        'Year': sri_lanka['observation_date'].dt.year,
+        # truncated to 3 decimals like the rest of the curated data
+        'Inflation Value (%)': np.trunc(sri_lanka['FPCPITOTLZGLKA'] * 1000) / 1000,
+    })
+
+    values = pd.concat([germany.assign(Country='Germany'), sri_lanka.assign(Country='Sri Lanka')])
+    reasons = pd.read_csv(reasons_path)
+    df = reasons.merge(values, on=['Year', 'Country'], how='left', validate='one_to_one')
+    if df['Inflation Value (%)'].isna().any():
+        missing = df[df['Inflation Value (%)'].isna()]
+        raise ValueError(f"No inflation value for {list(zip(missing['Year'], missing['Country']))}")
+
+    _write_csv(df[['Year', 'Country', 'Inflation Value (%)', 'Reason']], output, index=False)
+
+
+def build_gdp(inputs: list[Path], output: Path) -> None:
+    """
+    The curated GDP data of Germany and Sri Lanka, extended by the years after it from the World Bank dumps,
+    with Germany's government debt from the ECB (Q4 value, like the curated years since 2014).
+    """
+    curated_path, *worldbank_paths, ecb_path = inputs
+    curated = pd.read_csv(curated_path, index_col=[0, 1])
+
+    # the curated years stay as they are, the World Bank revises them, see "GDP Data" in the README
+    df = worldbank.read_GDP_data(worldbank_paths, range(curated.index.levels[0].max() + 1, 2100), ['Germany', 'Sri Lanka'])
+    df = df[df['GDP (billion US$)'].notna()]
+
+    ecb = pd.read_csv(ecb_path)
+    ecb = ecb[ecb['TIME PERIOD'].str.endswith('Q4')]
+    debt = pd.Series(ecb.iloc[:, 2].to_numpy(), index=ecb['TIME PERIOD'].str[:4].astype(int))
+    years = df.index.get_level_values('Year')
+    germany = df.index.get_level_values('Country') == 'Germany'
+    df.loc[germany, 'Government debt (% of GDP)'] = debt.reindex(years[germany]).to_numpy()
+
+    # rounded like the curated data, the annual changes from the rounded values
+    df = df.round({'GDP (billion US$)': 1, 'Government debt (% of GDP)': 1})
+    combined = pd.concat([curated, df]).sort_index()
+    for column in worldbank.GDP_ANNUAL_CHANGES:
+        changes = (combined[column] / previous_year(combined[column]) - 1) * 100
+        df[f"{column} Annual Change (%)"] = changes.reindex(df.index)
+
+    # appended to the curated text, so the curated rows are written byte for byte
+    tmp = output.with_name(output.name + '.tmp')
+    with open(tmp, 'w', newline='') as f:
+        f.write(curated_path.read_text())
+        df[curated.columns].sort_index(level=['Year', 'Country']).to_csv(f, header=False)
+    os.replace(tmp, output)
+
+
+def build_passengers(inputs: list[Path], output: Path) -> None:
+    """
+    Air passengers carried per country (Our World in Data) in 2000.
+    """
+    df = pd.read_csv(inputs[0])
+    _write_csv(df[df['Year'] == 2000], output, index=False)
+
+
+def build_happiness(inputs: list[Path], output: Path) -> None:
+    """
+    Germany and Sri Lanka from the World Happiness Report vintages, see happiness.py.
+    """
+    happiness.write_merged(output, ['Germany', 'Sri Lanka'], inputs)
+
+
+def build_trajectories(inputs: list[Path], output: Path) -> None:
+    """
+    The metrics of all countries the peer index compares, see peers.py.
+    """
+    output.parent.mkdir(parents=True, exist_ok=True)
+    _write_csv(peers.build_trajectories(*inputs), output)
+
+
+def build_data_bundle(inputs: list[Path], output: Path) -> None:
+    """
+    The columnar bundle of the curated CSVs, see build_bundle.py.
+    """
+    build_bundle.build_bundle(output.parent)
+
+
+def build_picture_variants(inputs: list[Path], output: Path) -> None:
+    """
+    The responsive variants of the intro pictures, see images.py.
+    """
+    images.build_variants(inputs, output.parent)
+
+
+# output (relative to data/) -> inputs (relative to data/), the recipe building the output from them and the
+# modules the recipe delegates to, whose code is part of the recipe
+TARGETS: dict[str, dict] = {
+    'inflation/Inflation_Germany_SriLanka_2000_2023.csv': {
+        'inputs': ['inflation/Inflation_Germany.csv', 'inflation/Inflation_Sri_Lanka.csv', 'inflation/inflation_reasons.csv'],
+        'build': build_inflation,
+    },
+    'gdp/gdp_de_sl_V2.csv': {
+        'inputs': [
+            'gdp/gdp_de_sl_curated.csv',
+            'gdp/API_DEU_DS2_en_csv_v2_15903.csv',
+            'gdp/API_LKA_DS2_en_csv_v2_21470.csv',
+            'gdp/ECB Data Portal_20250106050459.csv',
+        ],
+        'build': build_gdp,
+        'code': [worldbank],
+    },
+    'tourism/passengers_from_2000.csv': {
+        'inputs': ['tourism/air-passengers-carried.csv'],
+        'build': build_passengers,
+    },
+    'happiness/happiness_de_sl.csv': {
+        'inputs': [f'happiness/{file}' for file in happiness.VINTAGES],
+        'build': build_happiness,
+        'code': [happiness],
+    },
+    peers.TRAJECTORIES.relative_to(DATA_DIR).as_posix(): {
+        'inputs': [
+            'happiness/World Happiness Report 2008-2024.csv',
+            'tourism/air-passengers-carried.csv',
+            'tourism/API_SP.POP.TOTL_DS2_en_csv_v2_900.zip',
+        ],
+        'build': build_trajectories,
+        'code': [peers],
+    },
+    (BUNDLE_DIR / 'manifest.json').relative_to(DATA_DIR).as_posix(): {
+        'inputs': list(build_bundle.SOURCES),
+        'build': build_data_bundle,
+        'code': [build_bundle, schemas],
+    },
+    # served from code/static/, see images.py
+    os.path.relpath(images.VARIANT_MANIFEST, DATA_DIR).replace(os.sep, '/'): {
+        'inputs': ['pictures/srilanka_ella.jpg', 'pictures/srilanka_surf.jpg'],
+        'build': build_picture_variants,
+        'code': [images],
+    },
+}
+
+
+def recipe_digest(build: Callable, code: list[ModuleType] = ()) -> str:
+    """
+    Hash of the code of `build` and of the modules in `code`, so editing one recipe only makes its own target
+    stale, and editing e.g. happiness.VINTAGES or schemas.SCHEMAS the targets using them.
+    """
+    sources = [inspect.getsource(build), *(inspect.getsource(module) for module in code)]
+    return hashlib.sha256(''.join(sources).encode()).hexdigest()
+
+
+def build_order(targets: dict[str, dict] = TARGETS) -> list[str]:
+    """
+    The targets in dependency order, every target after the targets producing its inputs.
+    """
+    graph = {output: [path for path in spec['inputs'] if path in targets] for output, spec in targets.items()}
+    return list(TopologicalSorter(graph).static_order())
+
+
+def dependents(paths: list[str], targets: dict[str, dict] = TARGETS) -> list[str]:
+    """
+    The targets built from any of `paths` (relative to data/), directly or through other targets, in build order.
+    """
+    affected = set(paths)
+    for output in build_order(targets):
+        if affected & set(targets[output]['inputs']):
+            affected.add(output)
+    return [output for output in build_order(targets) if output in affected]
+
+
+def _load_state() -> dict:
+    try:
+        with open(BUILD_STATE, 'r') as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError): # no or a corrupt state, everything is stale
+        return {}
+
+
+def _stamp(spec: dict) -> dict:
+    return {
+        'inputs': {path: file_digest(DATA_DIR / path) for path in spec['inputs']},
+        'recipe': recipe_digest(spec['build'], spec.get('code', [])),
+    }
+
+
+def build(names: list[str] | None = None, force: bool = False, dry_run: bool = False) -> dict[str, str]:
+    """
+    Builds the stale targets among `names` (default: all) and the targets they depend on.
+    Returns {target: 'built' | 'stale' (dry run) | 'up to date'}.
+    """
+    wanted = set(names or TARGETS)
+    unknown = wanted - set(TARGETS)
+    if unknown:
+        raise ValueError(f"Unknown targets {sorted(unknown)}, choose from {list(TARGETS)}")
+
+    # the targets producing inputs of the wanted ones
+    pending = list(wanted)
+    while pending:
+        for path in TARGETS[pending.pop()]['inputs']:
+            if path in TARGETS and path not in wanted:
+                wanted.add(path)
+                pending.append(path)
+
+    state = _load_state()
+    results = {}
+    for output in build_order():
+        if output not in wanted:
+            continue
+        spec = TARGETS[output]
+        # inputs built earlier in this run are hashed after their rebuild
+        stamp = _stamp(spec)
+        previous = state.get(output)
+        up_to_date = (
+            not force
+            and not any(results.get(path) == 'stale' for path in spec['inputs'])
+            and (DATA_DIR / output).exists()
+            and previous is not None
+            and previous['stamp'] == stamp
+            and previous['output'] == file_digest(DATA_DIR / output)
+        )
+        if up_to_date:
+            results[output] = 'up to date'
+            continue
+        if dry_run:
+            results[output] = 'stale'
+            continue
+
+        start = time.perf_counter()
+        spec['build']([DATA_DIR / path for path in spec['inputs']], DATA_DIR / output)
+        state[output] = {'stamp': stamp, 'output': file_digest(DATA_DIR / output)}
+        results[output] = f"built in {time.perf_counter() - start:.2f} s"
+
+        # saved after every target, so an interrupted build keeps what it finished
+        tmp = BUILD_STATE.with_name(BUILD_STATE.name + '.tmp')
+        with open(tmp, 'w') as f:
+            json.dump(state, f, indent=2)
+        os.replace(tmp, BUILD_STATE)
+
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('targets', nargs='*', metavar='TARGET', help=f"output to build (default: all), one of {', '.join(TARGETS)}")
+    parser.add_argument('--force', action='store_true', help="rebuild even if up to date")
+    parser.add_argument('--dry-run', action='store_true', help="only list the stale targets")
+    args = parser.parse_args()
+
+    for output, result in build(args.targets, args.force, args.dry_run).items():
+        print(f"{output}: {result}")
@@ -1,76 +1,421 @@
+import copy
+import hashlib
 import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from os import PathLike
+from pathlib import Path
+from typing import Callable, TypeVar
+import numpy as np
 import pandas as pd
 
+from instrumentation import count, timed
+from schemas import SCHEMAS, enforce_schema
+
+try:
+    import pyarrow as pa
+except ImportError: # the bundle is optional, the CSVs are always there
+    pa = None
+
+
+K = TypeVar("K")
+T = TypeVar("T")
+V = TypeVar("V", pd.DataFrame, "CountryPanel", dict)
+
+DATA_DIR = Path(__file__).parent.parent / 'data'
+BUNDLE_DIR = DATA_DIR / 'bundle'
+BUNDLE_MANIFEST = BUNDLE_DIR / 'manifest.json'
+
+# keys of the per-country frames returned by the dataset loaders
+COUNTRY_NAMES = {"de": "Germany", "sl": "Sri Lanka"}
 
-def load_sl_events(path: str | PathLike[str]) -> dict[int, dict[str, str]]:
-    try:
-        with open(path, "r") as f:
-            data = json.load(f)
 
-        # Convert the keys to integers for convenience
-        data = {int(key): value for key, value in data.items()}
-        return data
+def load_sl_events(path: str | PathLike[str]) -> dict[int, dict[str, str]]:
+    """
+    Loads the events of the panel 1 timeline, keyed by year. Raises OSError or ValueError (e.g. invalid JSON).
+    """
+    with open(path, "r") as f:
+        data = json.load(f)
 
-    except Exception as e:
-        print(e)
-        return {}
+    # Convert the keys to integers for convenience
+    data = {int(key): value for key, value in data.items()}
+    return data
 
 
 def load_plot_descriptions(path: str | PathLike[str]) -> dict[str, str]:
     """
     Loads textual descriptions for the app's main body.
     These descriptions will be displayed beside the charts to help users interpret them.
+    Raises OSError or ValueError (e.g. invalid JSON).
+    """
+    with open(path, "r") as f:
+        data = json.load(f)
+    return data
+
+
+class LoadError(Exception):
+    """
+    Raised by load_parallel if sources failed. `errors` maps every failed source to its exception,
+    `results` holds the sources that did load.
+    """
+    def __init__(self, errors: dict[str, Exception], results: dict[str, object]):
+        super().__init__("; ".join(f"{name}: {error}" for name, error in errors.items()))
+        self.errors = errors
+        self.results = results
+
+
+@timed()
+def load_parallel(loaders: dict[str, Callable[[], T]]) -> dict[str, T]:
+    """
+    Runs every loader on its own thread and returns {name: result}, so a cold start takes about as long
+    as the slowest source instead of the sum of all. Threads suffice, pandas and pyarrow parse without the GIL.
+    All loaders run to completion, then a LoadError reports every source that failed.
+    """
+    with ThreadPoolExecutor(max_workers=max(len(loaders), 1), thread_name_prefix="load") as pool:
+        futures = {name: pool.submit(loader) for name, loader in loaders.items()}
+
+    results, errors = {}, {}
+    for name, future in futures.items():
+        error = future.exception()
+        if error is None:
+            results[name] = future.result()
+        else:
+            errors[name] = error
+
+    if errors:
+        raise LoadError(errors, results) # type: ignore
+    return results
+
+
+def file_digest(path: str | PathLike[str]) -> str:
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def _source(path: str | PathLike[str]) -> str | None:
+    """
+    `path` relative to data/, the key of the bundle manifest and of schemas.SCHEMAS.
     """
     try:
-        with open(path, "r") as f:
-            data = json.load(f)
-        return data
+        return Path(path).resolve().relative_to(DATA_DIR.resolve()).as_posix()
+    except ValueError: # not part of the data/ tree
+        return None
+
+
+def _bundle_entry(path: str | PathLike[str]) -> dict | None:
+    """
+    Returns the manifest entry of the bundled table compiled from the CSV at `path`,
+    or None if there is no bundle, pyarrow is missing or the CSV changed since the build.
+    """
+    source = _source(path)
+    if pa is None or source is None or not BUNDLE_MANIFEST.exists():
+        return None
+
+    with open(BUNDLE_MANIFEST, "r") as f:
+        entry = json.load(f)["tables"].get(source)
+    if entry is None or not (BUNDLE_DIR / entry["file"]).exists():
+        return None
+
+    stat = os.stat(path)
+    if (stat.st_mtime_ns, stat.st_size) == (entry["mtime_ns"], entry["size"]):
+        return entry
+    return entry if file_digest(path) == entry["sha256"] else None
+
+
+@timed()
+def read_table(path: str | PathLike[str], index_col: list[int] | None = None) -> pd.DataFrame:
+    """
+    Reads a dataset from the precompiled bundle (see build_bundle.py) if it is up to date,
+    otherwise parses the CSV. Bundled tables are memory-mapped and already carry their index.
+    Datasets with a declared schema (schemas.SCHEMAS) are checked and cast to it, raising schemas.SchemaError.
+    """
+    entry = _bundle_entry(path)
+    if entry is None:
+        df = pd.read_csv(path, index_col=index_col)
+    else:
+        with pa.memory_map(str(BUNDLE_DIR / entry["file"]), "r") as source:
+            table = pa.ipc.open_file(source).read_all()
+        df = table.to_pandas(split_blocks=True)
+
+    source = _source(path)
+    if source in SCHEMAS:
+        df = enforce_schema(df, SCHEMAS[source], source)
+    return df
+
+
+def previous_year(series: pd.Series) -> pd.Series:
+    """
+    Aligns each value of a (Year, Country) indexed series with the same country's value of the previous
+    calendar year, so gaps in the data yield NaN instead of a multi-year step.
+    """
+    years = series.index.get_level_values(0)
+    countries = series.index.get_level_values(1)
+    shifted = series.set_axis(pd.MultiIndex.from_arrays([years + 1, countries]))
+    return shifted.reindex(pd.MultiIndex.from_arrays([years, countries])).set_axis(series.index)
+
+
+def add_derived_metrics(df: pd.DataFrame, dataset: str) -> pd.DataFrame:
+    """
+    Appends the metrics derived from `dataset` ('inflation', 'GDP', 'happiness' or 'tourism') to its
+    (Year, Country) indexed frame. Runs once per load for all countries, so the plots never compute them.
+    """
+    derived = {}
+    if dataset == 'inflation':
+        inflation = df['Inflation Value (%)']
+        derived['Inflation Value Annual Change (pp)'] = inflation - previous_year(inflation)
+    elif dataset == 'happiness':
+        score = df['Happiness score']
+        derived['Happiness score Annual Change (%)'] = (score / previous_year(score) - 1) * 100
+    elif dataset == 'tourism':
+        tourists = df['tourists arrived']
+        derived['tourists_per_capita'] = tourists / df['population']
+        derived['tourists arrived Annual Change (%)'] = (tourists / previous_year(tourists) - 1) * 100
+    return df.assign(**derived)
+
+
+class CountryPanel:
+    """
+    One (Year, Country) indexed frame for any number of countries. The rows are sorted by country, so each
+    country's rows are contiguous and panel[country] is a slice of the shared data instead of an xs() copy.
+    Read-only, cached panels are shared by all sessions.
+    """
+    __slots__ = ("_frame", "_rows")
+
+    def __init__(self, df: pd.DataFrame) -> None:
+        frame = df.sort_index(level=[1, 0])
+        codes, uniques = pd.factorize(frame.index.get_level_values(1))
+        starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]])
+        ends = np.r_[starts[1:], len(codes)]
+        object.__setattr__(self, "_frame", frame)
+        object.__setattr__(self, "_rows", {uniques[codes[start]]: slice(start, end) for start, end in zip(starts, ends)})
+
+    def __setattr__(self, name: str, value: object) -> None:
+        raise AttributeError(f"{type(self).__name__} is read-only")
+
+    @property
+    def frame(self) -> pd.DataFrame:
+        # copy-on-write view, see _load_cached
+        return self._frame.copy(deep=False)
+
+    @property
+    def countries(self) -> list[str]:
+        return list(self._rows)
+
+    def __contains__(self, country: str) -> bool:
+        return country in self._rows
 
-    except Exception as e:
-        print(e)
-        return {}
+    def __getitem__(self, country: str) -> pd.DataFrame:
+        """
+        The Year indexed rows of `country`.
+        """
+        return self._frame.iloc[self._rows[country]].droplevel(1)
 
 
-# df.xs() may return a pd.Series and .to_frame() doesn't satisfy type checking for some reason
+@timed()
+def read_panel(path: str | PathLike[str], dataset: str) -> CountryPanel:
+    return CountryPanel(add_derived_metrics(read_table(path, index_col=[0, 1]), dataset))
+
+
+def load_panel(path: str | PathLike[str], dataset: str) -> CountryPanel:
+    """
+    Loads a (Year, Country) indexed dataset ('inflation', 'GDP', 'happiness' or 'tourism' layout)
+    for all of its countries through the process-wide cache: one parse, however many countries are used.
+    """
+    return _load_cached(path, lambda p: {dataset: read_panel(p, dataset)}, dataset)[dataset]
+
+
+@timed()
 def load_inflation_data(path: str | PathLike[str]) -> dict[str, pd.DataFrame]:
-    df = pd.read_csv(path, index_col=[0, 1])
-    de = pd.DataFrame(df.xs('Germany', level=1))
-    sl = pd.DataFrame(df.xs('Sri Lanka', level=1))
-    return {"de": de, "sl": sl}
+    panel = read_panel(path, 'inflation')
+    return {key: panel[country] for key, country in COUNTRY_NAMES.items()}
 
 
+@timed()
 def load_GDP_data(path: str | PathLike[str]) -> dict[str, pd.DataFrame]:
-    df = pd.read_csv(path, index_col=[0, 1])
-    de = pd.DataFrame(df.xs('Germany', level=1))
-    sl = pd.DataFrame(df.xs('Sri Lanka', level=1))
-    return {"de": de, "sl": sl}
+    panel = read_panel(path, 'GDP')
+    return {key: panel[country] for key, country in COUNTRY_NAMES.items()}
 
 
+@timed()
 def load_happiness_data(path: str | PathLike[str]) -> dict[str, pd.DataFrame]:
-    df = pd.read_csv(path, index_col=[0, 1])
-    de = pd.DataFrame(df.xs('Germany', level=1))
-    sl = pd.DataFrame(df.xs('Sri Lanka', level=1))
-    return {"de": de, "sl": sl}
+    panel = read_panel(path, 'happiness')
+    return {key: panel[country] for key, country in COUNTRY_NAMES.items()}
 
 
+@timed()
 def load_tourism_data(path: str | PathLike[str]) -> dict[str, pd.DataFrame]:
-    df = pd.read_csv(path, index_col=[0, 1])
-    de = pd.DataFrame(df.xs('Germany', level=1))
-    sl = pd.DataFrame(df.xs('Sri Lanka', level=1))
-    return {"de": de, "sl": sl}
-
-
-def load_data(
-    inflation_path: str | PathLike[str],
-    GDP_path: str | PathLike[str],
-    happiness_path: str | PathLike[str],
-    tourism_path: str | PathLike[str]
-) -> dict[str, dict[str, pd.DataFrame]]:
-    data = {
-        'inflation': load_inflation_data(inflation_path),
-        'GDP': load_GDP_data(GDP_path),
-        'happiness': load_happiness_data(happiness_path),
-        'tourism': load_tourism_data(tourism_path)
+    panel = read_panel(path, 'tourism')
+    return {key: panel[country] for key, country in COUNTRY_NAMES.items()}
+
+
+# Process-wide cache shared by all Streamlit sessions.
+# (path, loader, loader arguments) -> (mtime_ns, size, sha256, frames)
+_cache: dict[tuple[str, str, tuple], tuple[int, int, str, dict]] = {}
+_cache_lock = threading.Lock()
+# held while a file is parsed: one parse per file, while different files are parsed concurrently
+_key_locks: dict[tuple[str, str, tuple], threading.Lock] = {}
+_cache_stats = {"hits": 0, "misses": 0}
+
+
+def _load_cached(
+    path: str | PathLike[str],
+    loader: Callable[[str | PathLike[str]], dict[K, V]],
+    *args: object
+) -> dict[K, V]:
+    """
+    Returns the frames (or panels) parsed by `loader` from `path`, parsing the file only if it is new or has changed.
+    A changed mtime alone only triggers re-hashing, the file is re-parsed if the content hash differs.
+    `args` are the values a loader closes over (e.g. the dataset of load_panel), they are part of the cache key
+    since all closures created by one function share their __qualname__.
+    """
+    path = os.path.abspath(path)
+    key = (path, loader.__qualname__, args)
+    stat = os.stat(path)
+
+    with _cache_lock:
+        key_lock = _key_locks.setdefault(key, threading.Lock())
+
+    with key_lock:
+        with _cache_lock:
+            entry = _cache.get(key)
+
+        if entry is not None and entry[:2] != (stat.st_mtime_ns, stat.st_size):
+            # touched or rewritten, only the content decides
+            digest = file_digest(path)
+            entry = (stat.st_mtime_ns, stat.st_size, digest, entry[3]) if digest == entry[2] else None
+
+        hit = entry is not None
+        if entry is None:
+            entry = (stat.st_mtime_ns, stat.st_size, file_digest(path), loader(path))
+
+        with _cache_lock:
+            _cache[key] = entry
+            _cache_stats["hits" if hit else "misses"] += 1
+        count("data_cache.hits" if hit else "data_cache.misses")
+
+    # shallow copies are copy-on-write views, writes by the caller never reach the cache.
+    # Panels are read-only and only hand out such views, other values (e.g. a GeoJSON dict) are deep-copied
+    return {
+        name: (
+            value.copy(deep=False) if isinstance(value, pd.DataFrame)
+            else value if isinstance(value, CountryPanel)
+            else copy.deepcopy(value)
+        )
+        for name, value in entry[3].items()
     }
-    return data
+
+
+DATASET_LOADERS = {
+    'inflation': load_inflation_data,
+    'GDP': load_GDP_data,
+    'happiness': load_happiness_data,
+    'tourism': load_tourism_data,
+}
+
+
+def load_dataset(dataset: str, path: str | PathLike[str]) -> dict[str, pd.DataFrame]:
+    """
+    One of the DATASET_LOADERS datasets ({"de": ..., "sl": ...}) through the process-wide cache.
+    """
+    return _load_cached(path, DATASET_LOADERS[dataset])
+
+
+@timed()
+def load_incident_data(path: str | PathLike[str]) -> pd.DataFrame:
+    """
+    Loads one of the data/incidents/ tables through the process-wide cache.
+    """
+    return _load_cached(path, lambda p: {"df": read_table(p)})["df"]
+
+
+@timed()
+def load_events_by_year(path: str | PathLike[str]) -> dict[int, pd.DataFrame]:
+    """
+    Loads a table of events with a 'Year' column (e.g. civil_war_events_2000_2009.csv), pre-grouped by year
+    for O(1) lookups. The groups are slices of one year-sorted frame, numeric columns keep their dtypes.
+    """
+    def group_by_year(p: str | PathLike[str]) -> dict[int, pd.DataFrame]:
+        df = read_table(p).sort_values("Year", kind="stable", ignore_index=True)
+        years = df["Year"].to_numpy()
+        # row ranges of every year in one pass over the sorted column
+        starts = np.flatnonzero(np.r_[True, years[1:] != years[:-1]])
+        ends = np.r_[starts[1:], len(years)]
+        return {int(years[start]): df.iloc[start:end] for start, end in zip(starts, ends)}
+
+    return _load_cached(path, group_by_year)
+
+
+def _round_coordinates(coordinates: list, decimals: int) -> list:
+    if coordinates and isinstance(coordinates[0], (int, float)):
+        return [round(value, decimals) for value in coordinates]
+    return [_round_coordinates(part, decimals) for part in coordinates]
+
+
+@timed()
+def load_geojson(path: str | PathLike[str]) -> dict:
+    """
+    Loads a GeoJSON FeatureCollection (e.g. code/pages/sri_lanka_geo.json) through the process-wide cache,
+    reduced to what a map layer draws: the geometries without properties, rounded to 3 decimals (~100 m).
+    Every call returns its own copy.
+    """
+    def read_geometries(p: str | PathLike[str]) -> dict[str, dict]:
+        with open(p, "r", encoding="utf-8") as f:
+            collection = json.load(f)
+        features = [
+            {
+                "type": "Feature",
+                "properties": {},
+                "geometry": {
+                    "type": feature["geometry"]["type"],
+                    "coordinates": _round_coordinates(feature["geometry"]["coordinates"], 3),
+                },
+            }
+            for feature in collection["features"]
+        ]
+        return {"geojson": {"type": "FeatureCollection", "features": features}}
+
+    return _load_cached(path, read_geometries)["geojson"]
+
+
+def data_fingerprint(frames: dict[str, pd.DataFrame]) -> str:
+    """
+    Content hash of a {name: frame} dict, e.g. data['GDP'], usable as a cache key for derived results.
+    """
+    h = hashlib.sha256()
+    for name in sorted(frames):
+        df = frames[name]
+        h.update(name.encode())
+        h.update(",".join(map(str, df.columns)).encode())
+        h.update(pd.util.hash_pandas_object(df, index=True).to_numpy().tobytes())
+    return h.hexdigest()
+
+
+def cache_stats() -> dict[str, int]:
+    with _cache_lock:
+        return {**_cache_stats, "entries": len(_cache)}
+
+
+def clear_cache() -> None:
+    with _cache_lock:
+        _cache.clear()
+        _cache_stats.update(hits=0, misses=0)
+
+
+# dataset -> its file, the data of the main page
+DATASET_PATHS: dict[str, Path] = {
+    'inflation': DATA_DIR / 'inflation/Inflation_Germany_SriLanka_2000_2023.csv',
+    'GDP': DATA_DIR / 'gdp/gdp_de_sl_V2.csv',
+    'happiness': DATA_DIR / 'happiness/happiness_de_sl.csv',
+    'tourism': DATA_DIR / 'tourism/tourism_de_sl.csv',
+}
+
+
+@timed()
+def load_data(paths: dict[str, str | PathLike[str]] = DATASET_PATHS) -> dict[str, dict[str, pd.DataFrame]]:
+    """
+    The datasets of the main page ({dataset: {"de": ..., "sl": ...}}), loaded in parallel through the
+    process-wide cache. Raises LoadError, see load_parallel.
+    """
+    return load_parallel({dataset: partial(load_dataset, dataset, path) for dataset, path in paths.items()})
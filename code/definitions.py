@@ -1,7 +1,8 @@
-import os
 import pandas as pd
 import streamlit as st
 
+from images import picture
+
 
 COLORS = {'good': '#34C759',
           'bad': '#FF3737',
@@ -19,6 +20,7 @@ COLORS = {'good': '#34C759',
           'Sri Lanka2': '#FF8767',
           'Sri Lanka3': '#FFA183',
           'Sri Lanka4': '#FFBBA7',
+          'peer': '#7986CB', # comparison countries other than Germany
 }
 
 
@@ -52,21 +54,11 @@ def add_heading_and_intro() -> None:
         This application will compare Sri Lanka to Germany, highlighting the similarities and differences between them and providing insights into their respective economic and social landscapes.
         """, unsafe_allow_html=True)
 
-    # Adding 2 images
+    # Adding 2 images, as responsive variants if they were built (see images.py)
     with col2:
-        base_dir = os.path.dirname(os.path.abspath(__file__))
-
-        st.image(
-            os.path.join(base_dir, "../data/pictures/srilanka_ella.jpg"),
-            caption="Scenic Ella train ride in Sri Lanka",
-            width="stretch"
-        )
-
-        st.image(
-            os.path.join(base_dir, "../data/pictures/srilanka_surf.jpg"),
-            caption="Surfing in Sri Lanka",
-            width="stretch"
-        )
+        # above the fold, the largest element of the first paint
+        picture("srilanka_ella.jpg", caption="Scenic Ella train ride in Sri Lanka", eager=True)
+        picture("srilanka_surf.jpg", caption="Surfing in Sri Lanka")
 
 
 def add_summary() -> None:
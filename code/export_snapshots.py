@@ -0,0 +1,155 @@
+"""
+Pre-renders every figure of both pages (panel 1 for every slider position and the animated variant,
+panel 2 incl. the comparison with every selectable peer, every Incidents figure incl. every civil war year) into
+data/snapshots/.
+
+Each figure is written as standalone HTML and as plotly JSON, plus SVG and PNG when kaleido is installed
+(pip install kaleido, not in requirements.txt, it also needs a Chrome installation). File names contain a hash
+of the content, the manifest maps figure names to files and records the data version of the export. The HTML
+files share one copy of plotly.js, so the folder can be hosted as is. With SL_STATIC_SNAPSHOTS=1 the app shows
+the snapshots instead of building figures as long as the data version matches, see snapshots.py.
+
+Usage: python code/export_snapshots.py [--formats html json svg png]
+"""
+import argparse
+import hashlib
+import json
+import logging
+import os
+import re
+from pathlib import Path
+
+import plotly.graph_objects as go
+import plotly.io as pio
+from plotly.offline import get_plotlyjs
+
+from data_utils import DATA_DIR, load_data, load_events_by_year, load_incident_data, load_sl_events
+from incident_plots import (
+    cached_plot,
+    plot_civil_war_map,
+    plot_covid,
+    plot_easter_attacks_map,
+    plot_economic_crisis,
+    plot_financial_crisis_map,
+    plot_refugee_crisis_map,
+    plot_tourism_boom,
+    plot_tsunami_map,
+)
+from plot_utils import panel1_animation, panel1_figures, panel2_figures, peer_figure, peer_options, peer_snapshot_name
+from snapshots import SNAPSHOT_DIR, data_version
+
+try:
+    import kaleido
+except ImportError: # only needed for the image formats
+    kaleido = None
+
+
+IMAGE_FORMATS = ['svg', 'png']
+
+logger = logging.getLogger(__name__)
+
+# section key in pages/Incidents.py -> (builder, csv in data/incidents/)
+INCIDENT_FIGURES = {
+    'tsunami': (plot_tsunami_map, 'tsunami_data.csv'),
+    'financial_crisis': (plot_financial_crisis_map, 'financial_crisis_data.csv'),
+    'refugee_crisis': (plot_refugee_crisis_map, 'refugee_crisis_data.csv'),
+    'tourism_boom': (plot_tourism_boom, 'Tourism_Sri_Lanka_2016_2019.csv'),
+    'easter_attacks': (plot_easter_attacks_map, 'easter_attacks_data.csv'),
+    'covid': (plot_covid, 'covid_data.csv'),
+    'economic_crisis': (plot_economic_crisis, 'economic_crisis_data.csv'),
+}
+
+
+def all_figures() -> dict[str, go.Figure]:
+    """
+    Every figure the pages can show, under the snapshot names they look up.
+    """
+    data = load_data()
+    sl_events = load_sl_events(DATA_DIR / 'sl_events.json')
+
+    figures = {f"panel1_{year}": fig for year, fig in panel1_figures(data).items()}
+    figures["panel1_animation"] = panel1_animation(data, sl_events)
+    figures.update({f"panel2_{key}": fig for key, fig in panel2_figures(data).items()})
+    try:
+        peer_countries, _ = peer_options()
+    except (FileNotFoundError, KeyError): # no peer index, panel 2 shows no comparison either
+        peer_countries = []
+    figures.update({peer_snapshot_name(peer): peer_figure(peer) for peer in peer_countries})
+
+    incidents_dir = DATA_DIR / 'incidents'
+    for key, (builder, csv) in INCIDENT_FIGURES.items():
+        figures[key] = cached_plot(builder, load_incident_data(incidents_dir / csv))
+
+    # every position of the civil war slider, years without events show an empty map
+    events_by_year = load_events_by_year(incidents_dir / 'civil_war_events_2000_2009.csv')
+    first_year, last_year = min(events_by_year), max(events_by_year)
+    for year in range(first_year, last_year + 1):
+        events = events_by_year.get(year, events_by_year[first_year].iloc[:0])
+        figures[f"civil_war_{year}"] = cached_plot(plot_civil_war_map, events, year)
+
+    return figures
+
+
+def write_hashed(out_dir: Path, name: str, ext: str, content: bytes) -> str:
+    """
+    Writes `content` to <name>-<hash>.<ext> in `out_dir` and returns the file name.
+    """
+    file = f"{name}-{hashlib.sha256(content).hexdigest()[:16]}.{ext}"
+    if not (out_dir / file).exists():
+        tmp = out_dir / (file + '.tmp')
+        tmp.write_bytes(content)
+        os.replace(tmp, out_dir / file)
+    return file
+
+
+def export_snapshots(out_dir: Path = SNAPSHOT_DIR, formats: list[str] | None = None) -> dict:
+    if formats is None:
+        formats = ['html', 'json'] + (IMAGE_FORMATS if kaleido is not None else [])
+        if kaleido is None:
+            logger.warning("kaleido is not installed, exporting without %s (pip install kaleido)", " and ".join(IMAGE_FORMATS))
+    if kaleido is None and set(formats) & set(IMAGE_FORMATS):
+        raise RuntimeError(f"Exporting {', '.join(set(formats) & set(IMAGE_FORMATS))} needs kaleido (pip install kaleido)")
+
+    out_dir.mkdir(parents=True, exist_ok=True)
+    # before building, a file changing during the export makes the snapshots outdated rather than mislabeled
+    version = data_version()
+    plotly_js = write_hashed(out_dir, 'plotly', 'min.js', get_plotlyjs().encode())
+
+    entries = {}
+    for name, fig in all_figures().items():
+        entry = {}
+        for fmt in formats:
+            if fmt == 'html':
+                content = pio.to_html(fig, include_plotlyjs=plotly_js, full_html=True).encode()
+            elif fmt == 'json':
+                content = pio.to_json(fig, validate=False).encode()
+            else:
+                content = pio.to_image(fig, format=fmt)
+            entry[fmt] = write_hashed(out_dir, name, fmt, content)
+        entries[name] = entry
+
+    manifest = {'version': version, 'plotly_js': plotly_js, 'formats': formats, 'figures': entries}
+    tmp = out_dir / 'manifest.json.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp, out_dir / 'manifest.json')
+
+    # files of earlier exports
+    current = {plotly_js, *(file for entry in entries.values() for file in entry.values())}
+    for path in out_dir.iterdir():
+        if re.fullmatch(r".+-[0-9a-f]{16}\.(min\.js|html|json|svg|png)", path.name) and path.name not in current:
+            path.unlink()
+
+    return manifest
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--formats', nargs='+', choices=['html', 'json', *IMAGE_FORMATS], help="default: html json, plus svg png if kaleido is installed")
+    parser.add_argument('--out', type=Path, default=SNAPSHOT_DIR, help=f"output folder (default: {SNAPSHOT_DIR})")
+    args = parser.parse_args()
+
+    logging.basicConfig(format="%(levelname)s: %(message)s")
+    manifest = export_snapshots(args.out, args.formats)
+    for name, entry in manifest['figures'].items():
+        print(f"{name} -> {', '.join(entry.values())}")
@@ -0,0 +1,86 @@
+"""
+Process-wide cache of finished figures, shared by all Streamlit sessions and pages.
+
+Entries are keyed on the builder's name plus fingerprints of everything the figure depends on
+(see data_utils.data_fingerprint). The go.Figure objects themselves are cached and not their JSON:
+st.plotly_chart re-validates dict/JSON input, which costs more than building the figure again.
+Cached figures are shared, callers must not modify them.
+
+The cache holds the MAX_ENTRIES most recently used figures, so the figures of outdated data fingerprints are
+dropped eventually. Concurrent misses of one key wait for a single build.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, TypeVar
+
+from instrumentation import count
+
+
+T = TypeVar("T")
+
+# SL_FIGURE_CACHE=0 disables the cache, e.g. to measure the uncached baseline
+ENABLED = os.environ.get("SL_FIGURE_CACHE", "1") != "0"
+# e.g. both panel 1 modes for all years, the panel 2 and Incidents figures and the peer charts fit easily
+MAX_ENTRIES = int(os.environ.get("SL_FIGURE_CACHE_SIZE", "256"))
+
+# least recently used first
+_cache: OrderedDict[tuple[str, ...], object] = OrderedDict()
+_lock = threading.Lock()
+# held while a key is built, so concurrent misses of the same key build it once
+_key_locks: dict[tuple[str, ...], threading.Lock] = {}
+_stats = {"hits": 0, "builds": 0, "build_seconds": 0.0, "evictions": 0}
+
+
+def _lookup(key: tuple[str, ...]) -> tuple[bool, object]:
+    # callers hold _lock
+    if ENABLED and key in _cache:
+        _cache.move_to_end(key)
+        _stats["hits"] += 1
+        count("figure_cache.hits")
+        return True, _cache[key]
+    return False, None
+
+
+def get_or_build(key: tuple[str, ...], build: Callable[[], T]) -> T:
+    with _lock:
+        hit, value = _lookup(key)
+        if hit:
+            return value # type: ignore
+        key_lock = _key_locks.setdefault(key, threading.Lock())
+
+    with key_lock:
+        # another session may have built it while this one waited
+        with _lock:
+            hit, value = _lookup(key)
+        if hit:
+            return value # type: ignore
+
+        try:
+            start = time.perf_counter()
+            value = build()
+            with _lock:
+                _stats["builds"] += 1
+                count("figure_cache.builds")
+                _stats["build_seconds"] += time.perf_counter() - start
+                if ENABLED:
+                    _cache[key] = value
+                    while len(_cache) > MAX_ENTRIES:
+                        _cache.popitem(last=False)
+                        _stats["evictions"] += 1
+        finally:
+            with _lock:
+                _key_locks.pop(key, None)
+    return value # type: ignore
+
+
+def stats() -> dict[str, float]:
+    with _lock:
+        return {**_stats, "entries": len(_cache)}
+
+
+def clear() -> None:
+    with _lock:
+        _cache.clear()
+        _stats.update(hits=0, builds=0, build_seconds=0.0, evictions=0)
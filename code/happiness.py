@@ -0,0 +1,254 @@
+"""
+Merges the World Happiness Report vintages in data/happiness/ into one (Year, Country) panel in the layout of
+data/happiness/happiness_de_sl.csv, which data_utils.load_happiness_data reads.
+
+Every vintage names its columns differently, VINTAGES maps them onto one schema, and renames countries to the
+names of the 2008-2024 panel (COUNTRY_NAMES, plus per vintage). All vintages are stacked into
+one frame and merged in a single pass for all countries: ranks and residuals missing from a report are derived
+per vintage (so ranks are among all countries), then the first vintage in VINTAGES wins for every (Year, Country).
+Each row keeps the file it came from in 'Source'. Next to the output, <out>.version.json records a version hash
+of the sources and the mapping, so a new release only needs a VINTAGES entry and a rerun.
+
+Usage: python code/happiness.py --out data/happiness/happiness_de_sl.csv --country Germany --country "Sri Lanka"
+"""
+import argparse
+import hashlib
+import json
+import os
+from os import PathLike
+from pathlib import Path
+from typing import Iterable
+
+import pandas as pd
+
+from data_utils import DATA_DIR, file_digest
+
+
+HAPPINESS_DIR = DATA_DIR / 'happiness'
+
+COLUMNS = [
+    'Happiness rank',
+    'Happiness score',
+    'GDP per capita',
+    'Social support',
+    'Healthy life expectancy',
+    'Freedom to make life choices',
+    'Generosity',
+    'Perceptions of corruption',
+    'Dystopia + residual',
+]
+
+# the parts of the score explained by the six factors, the rest is 'Dystopia + residual'
+COMPONENTS = COLUMNS[2:8]
+
+_EXPLAINED_BY = {
+    'Explained by: Log GDP per capita': 'GDP per capita',
+    'Explained by: Social support': 'Social support',
+    'Explained by: Healthy life expectancy': 'Healthy life expectancy',
+    'Explained by: Freedom to make life choices': 'Freedom to make life choices',
+    'Explained by: Generosity': 'Generosity',
+    'Explained by: Perceptions of corruption': 'Perceptions of corruption',
+}
+
+# The yearly reports, their score breakdown is in "explained by" units
+_REPORT_2015_2016 = {
+    'Country': 'Country',
+    'Happiness Rank': 'Happiness rank',
+    'Happiness Score': 'Happiness score',
+    'Economy (GDP per Capita)': 'GDP per capita',
+    'Family': 'Social support',
+    'Health (Life Expectancy)': 'Healthy life expectancy',
+    'Freedom': 'Freedom to make life choices',
+    'Generosity': 'Generosity',
+    'Trust (Government Corruption)': 'Perceptions of corruption',
+    'Dystopia Residual': 'Dystopia + residual',
+}
+_REPORT_2018_2019 = {
+    'Country or region': 'Country',
+    'Overall rank': 'Happiness rank',
+    'Score': 'Happiness score',
+    'GDP per capita': 'GDP per capita',
+    'Social support': 'Social support',
+    'Healthy life expectancy': 'Healthy life expectancy',
+    'Freedom to make life choices': 'Freedom to make life choices',
+    'Generosity': 'Generosity',
+    'Perceptions of corruption': 'Perceptions of corruption',
+}
+_REPORT_2020_2023 = {
+    'Country name': 'Country',
+    'Ladder score': 'Happiness score',
+    **_EXPLAINED_BY,
+    'Dystopia + residual': 'Dystopia + residual',
+}
+# The survey panels, in survey units (e.g. Social support as a share), only the comparable columns are kept
+_PANEL = {
+    'Country name': 'Country',
+    'year': 'Year',
+    'Life Ladder': 'Happiness score',
+    'Social support': 'Social support',
+    'Freedom to make life choices': 'Freedom to make life choices',
+    'Generosity': 'Generosity',
+    'Perceptions of corruption': 'Perceptions of corruption',
+}
+
+# country name in older vintages -> name in the 2008-2024 panel. The 2022 report marks some countries with a
+# trailing '*', which is stripped first
+COUNTRY_NAMES = {
+    'Czech Republic': 'Czechia',
+    'Eswatini, Kingdom of': 'Eswatini',
+    'Hong Kong': 'Hong Kong S.A.R. of China',
+    'Hong Kong S.A.R., China': 'Hong Kong S.A.R. of China',
+    'Macedonia': 'North Macedonia',
+    'Northern Cyprus': 'North Cyprus',
+    'Palestinian Territories': 'State of Palestine',
+    'Somaliland Region': 'Somaliland region',
+    'Swaziland': 'Eswatini',
+    'Taiwan': 'Taiwan Province of China',
+    'Trinidad & Tobago': 'Trinidad and Tobago',
+    'Turkey': 'Türkiye',
+    'Turkiye': 'Türkiye',
+}
+
+# file in data/happiness/ -> how to read it, in order of precedence:
+#   columns: source column -> column of the merged panel
+#   year: report year of all rows, for files without a year column
+#   until: last year taken from the file
+#   derive: columns the report lacks and that are computed (ranks among all countries of the report)
+#   countries: country names of this vintage only, on top of COUNTRY_NAMES
+VINTAGES: dict[str, dict] = {
+    '2015.csv': {'year': 2015, 'columns': _REPORT_2015_2016},
+    '2016.csv': {'year': 2016, 'columns': _REPORT_2015_2016},
+    '2017.csv': {'year': 2017, 'columns': {
+        'Country': 'Country',
+        'Happiness.Rank': 'Happiness rank',
+        'Happiness.Score': 'Happiness score',
+        'Economy..GDP.per.Capita.': 'GDP per capita',
+        'Family': 'Social support',
+        'Health..Life.Expectancy.': 'Healthy life expectancy',
+        'Freedom': 'Freedom to make life choices',
+        'Generosity': 'Generosity',
+        'Trust..Government.Corruption.': 'Perceptions of corruption',
+        'Dystopia.Residual': 'Dystopia + residual',
+    }},
+    '2018.csv': {'year': 2018, 'columns': _REPORT_2018_2019, 'derive': ['Dystopia + residual']},
+    '2019.csv': {'year': 2019, 'columns': _REPORT_2018_2019, 'derive': ['Dystopia + residual']},
+    'World Happiness Report 2020.csv': {'year': 2020, 'columns': _REPORT_2020_2023, 'derive': ['Happiness rank']},
+    'World Happiness Report 2021.csv': {'year': 2021, 'columns': _REPORT_2020_2023, 'derive': ['Happiness rank']},
+    # the only Congo of the 2022 report, the 2021 report only has Brazzaville as well
+    'World Happiness Report 2022.csv': {'year': 2022, 'derive': ['Happiness rank'], 'countries': {'Congo': 'Congo (Brazzaville)'}, 'columns': {
+        'Country': 'Country',
+        'Happiness score': 'Happiness score',
+        'Explained by: GDP per capita': 'GDP per capita',
+        **{column: target for column, target in _EXPLAINED_BY.items() if target != 'GDP per capita'},
+        'Dystopia (1.83) + residual': 'Dystopia + residual',
+    }},
+    'World Happiness Report 2023.csv': {'year': 2023, 'columns': _REPORT_2020_2023, 'derive': ['Happiness rank']},
+    'World Happiness Report 2024.csv': {'year': 2024, 'columns': _REPORT_2020_2023, 'derive': ['Happiness rank']},
+    # the reports start in 2015, the panels fill the years before
+    'World Happiness Report 2008-2024.csv': {'until': 2014, 'columns': _PANEL},
+    'world-happiness-report_2008_2020.csv': {'until': 2014, 'columns': _PANEL},
+}
+
+# decimals of the derived residuals, like the reports' own
+DECIMALS = 3
+
+# vintages with the report's score breakdown, the methodology plot_happiness_data draws as its own line
+REPORTS = [file for file, spec in VINTAGES.items() if 'year' in spec]
+
+
+def read_vintage(path: str | PathLike[str], spec: dict) -> pd.DataFrame:
+    """
+    One vintage with its columns and countries renamed to the merged schema (missing columns are NaN) and its rows
+    limited to spec['until'].
+    """
+    df = pd.read_csv(path, usecols=list(spec['columns']), encoding='utf-8-sig').rename(columns=spec['columns'])
+    df['Country'] = df['Country'].str.rstrip('*').replace({**COUNTRY_NAMES, **spec.get('countries', {})})
+    if 'year' in spec:
+        df['Year'] = spec['year']
+    if 'until' in spec:
+        df = df[df['Year'] <= spec['until']]
+    return df.reindex(columns=['Year', 'Country', *COLUMNS])
+
+
+def merge_vintages(
+    vintages: dict[str, dict] = VINTAGES,
+    countries: Iterable[str] | None = None,
+    directory: Path = HAPPINESS_DIR
+) -> pd.DataFrame:
+    """
+    All `vintages` merged into one frame indexed by (Year, Country), plus the 'Source' file of every row.
+    `countries` filters by country name, after the ranks have been derived among all countries.
+    """
+    parts = [read_vintage(directory / file, spec).assign(Source=file) for file, spec in vintages.items()]
+    df = pd.concat(parts, ignore_index=True)
+
+    sources = df['Source']
+    derive_rank = sources.isin([file for file, spec in vintages.items() if 'Happiness rank' in spec.get('derive', [])])
+    derive_residual = sources.isin([file for file, spec in vintages.items() if 'Dystopia + residual' in spec.get('derive', [])])
+
+    df.loc[derive_rank, 'Happiness rank'] = df[derive_rank].groupby('Source')['Happiness score'].rank(ascending=False, method='min')
+    df.loc[derive_residual, 'Dystopia + residual'] = (df['Happiness score'] - df[COMPONENTS].sum(axis=1)).round(DECIMALS)
+
+    if countries is not None:
+        df = df[df['Country'].isin(list(countries))]
+
+    # stable sort by precedence, the first vintage wins for every (Year, Country)
+    precedence = sources.map({file: i for i, file in enumerate(vintages)})
+    df = df.loc[precedence.loc[df.index].sort_values(kind='stable').index]
+    df = df.drop_duplicates(['Year', 'Country'])
+
+    df['Happiness rank'] = df['Happiness rank'].astype('Int16')
+    return df.set_index(['Year', 'Country']).sort_index()
+
+
+def version(vintages: dict[str, dict] = VINTAGES, directory: Path = HAPPINESS_DIR) -> dict:
+    """
+    Version of a merge: a hash over the content of every source and the mappings, plus the per-source hashes.
+    """
+    sources = {file: file_digest(directory / file) for file in vintages}
+    h = hashlib.sha256(json.dumps([vintages, COUNTRY_NAMES, DECIMALS, sources], sort_keys=True).encode())
+    return {'version': h.hexdigest()[:16], 'sources': sources}
+
+
+def write_merged(
+    out: Path,
+    countries: Iterable[str] | None = None,
+    paths: Iterable[str | PathLike[str]] | None = None
+) -> pd.DataFrame:
+    """
+    Writes the merged panel to `out` and its version to <out>.version.json, both atomically. `paths` are the
+    vintage files to merge, in order of precedence and all in one directory (default: all VINTAGES in data/happiness/).
+    """
+    paths = [Path(path) for path in paths] if paths is not None else [HAPPINESS_DIR / file for file in VINTAGES]
+    directories = {path.parent for path in paths}
+    if len(directories) != 1:
+        raise ValueError(f"The vintages must be in one directory, not {sorted(map(str, directories))}")
+    vintages = {path.name: VINTAGES[path.name] for path in paths}
+    directory = directories.pop()
+
+    df = merge_vintages(vintages, countries, directory)
+    info = {
+        **version(vintages, directory),
+        'countries': sorted(df.index.get_level_values('Country').unique()),
+        'rows_per_source': df['Source'].value_counts().sort_index().to_dict(),
+    }
+
+    tmp = out.with_name(out.name + '.tmp')
+    df.to_csv(tmp)
+    os.replace(tmp, out)
+    version_path = out.with_name(out.name + '.version.json')
+    tmp = version_path.with_name(version_path.name + '.tmp')
+    with open(tmp, 'w') as f:
+        json.dump(info, f, indent=2)
+    os.replace(tmp, version_path)
+    return df
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--out', type=Path, required=True, help="output CSV")
+    parser.add_argument('--country', action='append', help="country name to keep, repeatable (default: all)")
+    args = parser.parse_args()
+
+    df = write_merged(args.out, args.country)
+    print(f"Wrote {len(df)} rows to {args.out}")
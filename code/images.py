@@ -0,0 +1,147 @@
+"""
+Responsive variants of the pictures in data/pictures/ for the intro.
+
+build_variants encodes every picture as AVIF (Pillow 11.3+), WebP and JPEG at the WIDTHS below its own
+width into code/static/pictures/, with a content hash in every file name. Streamlit serves that folder at
+app/static/pictures/ (server.enableStaticServing), the names never change for other content, so the files
+can be cached forever. picture() shows a picture as <picture> with srcsets, the browser downloads the first
+format it supports at the width the viewport needs. Without variants (build_data.py not run) or static serving
+it falls back to st.image of the original.
+"""
+import hashlib
+import html
+import io
+import json
+import os
+import re
+from pathlib import Path
+
+import streamlit as st
+from PIL import Image, features
+
+from data_utils import DATA_DIR
+
+
+PICTURES_DIR = DATA_DIR / 'pictures'
+VARIANT_DIR = Path(__file__).parent / 'static' / 'pictures'
+VARIANT_MANIFEST = VARIANT_DIR / 'manifest.json'
+VARIANT_URL = 'app/static/pictures/'
+
+WIDTHS = [320, 640, 960]
+
+# format -> (MIME type, Pillow save options), in order of preference
+FORMATS: dict[str, tuple[str, dict]] = {
+    'avif': ('image/avif', {'quality': 50}),
+    'webp': ('image/webp', {'quality': 75, 'method': 6}),
+    'jpeg': ('image/jpeg', {'quality': 80, 'optimize': True, 'progressive': True}),
+}
+if not features.check('avif'): # Pillow without libavif
+    del FORMATS['avif']
+
+# the intro column is a third of the centered layout, on narrow screens the columns stack
+SIZES = '(max-width: 640px) 100vw, 240px'
+
+
+def _encode(image: Image.Image, fmt: str) -> bytes:
+    buffer = io.BytesIO()
+    image.save(buffer, format=fmt.upper(), **FORMATS[fmt][1])
+    return buffer.getvalue()
+
+
+def build_variants(pictures: list[Path], out_dir: Path = VARIANT_DIR) -> dict:
+    """
+    Writes the variants of `pictures` to `out_dir` and a manifest mapping every picture to its variants.
+    """
+    out_dir.mkdir(parents=True, exist_ok=True)
+    entries = {}
+    for path in pictures:
+        with Image.open(path) as original:
+            original = original.convert('RGB')
+        widths = [width for width in WIDTHS if width < original.width] + [original.width]
+
+        variants = {}
+        for width in widths:
+            height = round(original.height * width / original.width)
+            image = original.resize((width, height), Image.Resampling.LANCZOS) if width != original.width else original
+            for fmt in FORMATS:
+                content = _encode(image, fmt)
+                file = f"{path.stem}-{width}w-{hashlib.sha256(content).hexdigest()[:16]}.{fmt}"
+                if not (out_dir / file).exists():
+                    tmp = out_dir / (file + '.tmp')
+                    tmp.write_bytes(content)
+                    os.replace(tmp, out_dir / file)
+                variants.setdefault(fmt, []).append({'width': width, 'file': file, 'bytes': len(content)})
+
+        entries[path.name] = {'width': original.width, 'height': original.height, 'variants': variants}
+
+    tmp = out_dir / 'manifest.json.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(entries, f, indent=2)
+    os.replace(tmp, out_dir / 'manifest.json')
+
+    # variants of earlier builds
+    current = {variant['file'] for entry in entries.values() for variants in entry['variants'].values() for variant in variants}
+    for path in out_dir.iterdir():
+        if re.fullmatch(r".+-\d+w-[0-9a-f]{16}\.(avif|webp|jpeg)", path.name) and path.name not in current:
+            path.unlink()
+
+    return entries
+
+
+# mtime_ns of the manifest, parsed manifest
+_manifest: tuple[int, dict] | None = None
+
+
+def manifest() -> dict:
+    """
+    The manifest written by build_variants, {} if there is none. Re-read when it changes.
+    """
+    global _manifest
+    try:
+        mtime_ns = os.stat(VARIANT_MANIFEST).st_mtime_ns
+    except FileNotFoundError:
+        return {}
+
+    if _manifest is None or _manifest[0] != mtime_ns:
+        with open(VARIANT_MANIFEST, "r") as f:
+            _manifest = (mtime_ns, json.load(f))
+    return _manifest[1]
+
+
+def picture_html(entry: dict, caption: str, eager: bool = False) -> str:
+    """
+    A <figure> showing the variants of one manifest entry, the JPEGs being the fallback for old browsers.
+    Lazy-loaded unless `eager`, for pictures above the fold, which are fetched first instead.
+    """
+    def srcset(fmt: str) -> str:
+        return ", ".join(f"{VARIANT_URL}{variant['file']} {variant['width']}w" for variant in entry['variants'][fmt])
+
+    sources = "".join(
+        f'<source type="{mime}" srcset="{srcset(fmt)}" sizes="{SIZES}">'
+        for fmt, (mime, _) in FORMATS.items() if fmt != 'jpeg'
+    )
+    fallback = entry['variants']['jpeg'][0]['file']
+    loading = 'loading="eager" fetchpriority="high"' if eager else 'loading="lazy"'
+    return (
+        f'<figure style="margin: 0 0 1rem 0">'
+        f'<picture>{sources}'
+        f'<img src="{VARIANT_URL}{fallback}" srcset="{srcset("jpeg")}" sizes="{SIZES}" '
+        f'width="{entry["width"]}" height="{entry["height"]}" alt="{html.escape(caption)}" '
+        f'{loading} decoding="async" style="width: 100%; height: auto">'
+        f'</picture>'
+        f'<figcaption style="text-align: center; font-size: 14px; opacity: 0.6">{html.escape(caption)}</figcaption>'
+        f'</figure>'
+    )
+
+
+def picture(name: str, caption: str, eager: bool = False) -> None:
+    """
+    Shows data/pictures/`name` in the width of its container, see the module docstring. `eager` for the
+    pictures visible without scrolling.
+    """
+    entry = manifest().get(name)
+    # the variant URLs only resolve with static serving, e.g. not with a config.toml missing it
+    if entry is None or not st.get_option("server.enableStaticServing"):
+        st.image(str(PICTURES_DIR / name), caption=caption, width="stretch")
+    else:
+        st.html(picture_html(entry, caption, eager))
@@ -0,0 +1,329 @@
+import os
+from pathlib import Path
+from typing import Callable
+
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+
+import figure_cache
+from data_utils import data_fingerprint, load_geojson
+from definitions import COLORS
+from instrumentation import timed
+
+
+#Adjust to increase/decrease the dotsize for the shown maps
+map_dot_size = 12
+
+SRI_LANKA_CENTER = {"lat": 7.8731, "lon": 80.7718}
+GERMANY_CENTER = {"lat": 51.1657, "lon": 10.4515}
+
+# SL_OFFLINE_MAPS=1 draws the maps on the bundled country outlines instead of carto-positron tiles,
+# for deployments without outbound network
+OFFLINE_MAPS = os.environ.get("SL_OFFLINE_MAPS", "0") == "1"
+
+GEOJSON_DIR = Path(__file__).parent / "pages"
+OUTLINES = {
+    "Sri Lanka": GEOJSON_DIR / "sri_lanka_geo.json",
+    "Germany": GEOJSON_DIR / "germany_geo.json",
+}
+
+
+def basemap(country: str) -> dict:
+    """
+    Map layout settings for the background of a map of `country`. Offline, that's a blank style
+    with the country's outline as map layers, nothing is fetched when the map is viewed.
+    """
+    if not OFFLINE_MAPS:
+        return dict(map_style="carto-positron")
+
+    # one fill layer with an outline color, a separate line layer would ship the geometry twice
+    return dict(
+        map_style="white-bg",
+        map_layers=[dict(
+            source=load_geojson(OUTLINES[country]),
+            type="fill",
+            color="#eef0f2",
+            fill=dict(outlinecolor="#9aa0a6"),
+            below="traces"
+        )]
+    )
+
+
+def cached_plot(builder: Callable[..., go.Figure], df: pd.DataFrame, *args: object) -> go.Figure:
+    """
+    Returns builder(df, *args), building it only once per process for the same data and arguments.
+    Callers must not modify the returned figure.
+    """
+    key = (builder.__name__, data_fingerprint({"df": df}), *map(str, args))
+    return figure_cache.get_or_build(key, lambda: builder(df, *args))
+
+
+@timed()
+def plot_tsunami_map(tsunami_df: pd.DataFrame) -> go.Figure:
+    tsunami_fig = px.scatter_map(
+        tsunami_df,
+        lat="Latitude",
+        lon="Longitude",
+        hover_name="District",
+        hover_data={
+            "Deaths": True,
+            "Damage": True,
+            "Latitude": False,
+            "Longitude": False
+        },
+        color_discrete_sequence=[COLORS["Sri Lanka"]],
+        zoom=6.8, # type: ignore
+        center=SRI_LANKA_CENTER,
+    )
+    tsunami_fig.update_traces(marker=dict(size=map_dot_size))
+    tsunami_fig.update_layout(
+        **basemap("Sri Lanka"),
+        title="Sri Lanka Tsunami 2004 Affected Districts",
+        height=800,
+        width=1000
+    )
+    return tsunami_fig
+
+
+@timed()
+def plot_civil_war_map(events: pd.DataFrame, selected_year: int) -> go.Figure:
+    """
+    Map of the civil war events of `selected_year`, see data_utils.load_events_by_year.
+    """
+    # The store keeps casualties as nullable Int32 (see schemas.py), 'N/A' is only for display.
+    # Cast to object to allow 'N/A', this only touches the events of one year
+    numeric_columns = ["Army Casualties", "LTTE Casualties", "Civilian Casualties"]
+    filtered_df = events.astype({col: object for col in numeric_columns}).fillna("N/A")
+
+    civil_war_fig = px.scatter_map(
+        filtered_df,
+        lat="Latitude",
+        lon="Longitude",
+        hover_name="Description",
+        hover_data={
+            "Year": True,
+            "Army Casualties": True,
+            "LTTE Casualties": True,
+            "Civilian Casualties": True,
+            "Latitude": False,
+            "Longitude": False
+        },
+        color_discrete_sequence=[COLORS["Sri Lanka"]],
+        zoom=6.8, # type: ignore
+        center=SRI_LANKA_CENTER,
+    )
+    civil_war_fig.update_traces(marker=dict(size=map_dot_size))
+    civil_war_fig.update_layout(
+        **basemap("Sri Lanka"),
+        title=f"Sri Lankan Civil War Events in {selected_year}",
+        height=800,
+        width=1000
+    )
+    return civil_war_fig
+
+
+@timed()
+def plot_financial_crisis_map(financial_crisis_df: pd.DataFrame) -> go.Figure:
+    financial_crisis_df = financial_crisis_df.fillna("N/A")  # Replace empty values with 'N/A'
+
+    financial_crisis_fig = px.scatter_map(
+        financial_crisis_df,
+        lat="Latitude",
+        lon="Longitude",
+        hover_name="State",
+        hover_data={
+            "2008 Unemployment Rate (%)": True,
+            "2009 Unemployment Rate (%)": True,
+            "2008 Industrial Output Change (%)": True,
+            "2009 Industrial Output Change (%)": True,
+            "Latitude": False,
+            "Longitude": False
+        },
+        color_discrete_sequence=[COLORS["Germany"]],
+        zoom=5,
+        center=GERMANY_CENTER,
+    )
+    financial_crisis_fig.update_traces(marker=dict(size=map_dot_size))
+    financial_crisis_fig.update_layout(
+        **basemap("Germany"),
+        title="Germany 2008/09 Financial Crisis Impact",
+        height=800,
+        width=1000
+    )
+    return financial_crisis_fig
+
+
+@timed()
+def plot_refugee_crisis_map(refugee_crisis_df: pd.DataFrame) -> go.Figure:
+    refugee_crisis_fig = px.scatter_map(
+        refugee_crisis_df,
+        lat="Latitude",
+        lon="Longitude",
+        hover_name="State",
+        hover_data={"Refugees Accepted": True, "Cost (Million Euros)": True, "Latitude": False, "Longitude": False},
+        color_discrete_sequence=[COLORS["Germany"]],
+        zoom=5,
+        center=GERMANY_CENTER,
+    )
+    refugee_crisis_fig.update_traces(marker=dict(size=map_dot_size))
+    refugee_crisis_fig.update_layout(
+        **basemap("Germany"),
+        title="Germany Refugee Crisis Impact",
+        height=800,
+        width=1000
+    )
+    return refugee_crisis_fig
+
+
+@timed()
+def plot_tourism_boom(tourism_df: pd.DataFrame) -> go.Figure:
+    tourism_fig = px.line(
+        tourism_df,
+        x="Year",
+        y="Arrivals_in_Millions",
+        title="Tourist Arrivals in Sri Lanka (2016-2019)",
+        markers=True,
+        line_shape="spline",
+        hover_data=["Revenue_in_Billions_USD"]
+    )
+    tourism_fig.update_traces(line_color=COLORS["Sri Lanka"])
+    tourism_fig.update_layout(
+        xaxis=dict(
+            title="Year",
+            tickmode="linear",
+            tick0=2016,  # Start at 2016
+            dtick=1      # Increment by 1 to ensure integer ticks
+        ),
+        yaxis_title="Arrivals (in Millions)",
+        height=600,
+        width=900
+    )
+    return tourism_fig
+
+
+@timed()
+def plot_easter_attacks_map(easter_attacks_df: pd.DataFrame) -> go.Figure:
+    easter_attacks_fig = px.scatter_map(
+        easter_attacks_df,
+        lat="Latitude",
+        lon="Longitude",
+        hover_name="Location",
+        hover_data={"Killed": True, "Injured": True, "Terrorists Killed": True, "Latitude": False, "Longitude": False},
+        color_discrete_sequence=[COLORS["Sri Lanka"]],
+        zoom=6.8, # type: ignore
+        center=SRI_LANKA_CENTER,
+    )
+    easter_attacks_fig.update_traces(marker=dict(size=map_dot_size))
+    easter_attacks_fig.update_layout(
+        **basemap("Sri Lanka"),
+        title="Easter Attacks Locations",
+        height=800,
+        width=1000
+    )
+    return easter_attacks_fig
+
+
+@timed()
+def plot_covid(covid_df: pd.DataFrame) -> go.Figure:
+    # Combine data for both countries
+    fig = go.Figure()
+    for country in covid_df['Country'].unique():
+        country_data = covid_df[covid_df['Country'] == country]
+        if country == "Germany":
+            fig.add_trace(go.Bar(
+                x=country_data['Year'],
+                y=country_data['Infections'],
+                name=f"{country} Infections",
+                marker_color=COLORS["Germany1"]
+            ))
+            fig.add_trace(go.Bar(
+                x=country_data['Year'],
+                y=country_data['Deaths'],
+                name=f"{country} Deaths",
+                marker_color=COLORS["Germany2"]
+            ))
+            fig.add_trace(go.Bar(
+                x=country_data['Year'],
+                y=country_data['Economic Loss (Billion USD)'],
+                name=f"{country} Economic Loss",
+                marker_color=COLORS["Germany3"]
+            ))
+        else:
+            fig.add_trace(go.Bar(
+                x=country_data['Year'],
+                y=country_data['Infections'],
+                name=f"{country} Infections",
+                marker_color=COLORS["Sri Lanka1"]
+            ))
+            fig.add_trace(go.Bar(
+                x=country_data['Year'],
+                y=country_data['Deaths'],
+                name=f"{country} Deaths",
+                marker_color=COLORS["Sri Lanka3"]
+            ))
+            fig.add_trace(go.Bar(
+                x=country_data['Year'],
+                y=country_data['Economic Loss (Billion USD)'],
+                name=f"{country} Economic Loss",
+                marker_color=COLORS["Sri Lanka4"]
+            ))
+
+    fig.update_layout(
+        title="COVID-19 Impact in Germany and Sri Lanka",
+        barmode="group",
+        xaxis_title="Year",
+        yaxis=dict(
+            title="Number of incidents (log scale)",
+            type="log"
+        ),
+        height=800,
+        width=1000,
+        legend=dict(
+            groupclick="toggleitem"  # Group legend items for clarity
+        )
+    )
+    return fig
+
+
+#we maybe should use the same colouring as in the plot above for sri lanka based attributes right here this is just a suggestion
+@timed()
+def plot_economic_crisis(economic_crisis_df: pd.DataFrame) -> go.Figure:
+    fig = go.Figure()
+    fig.add_trace(go.Bar(
+        x=economic_crisis_df['Year'],
+        y=economic_crisis_df['GDP Growth (%)'],
+        name="GDP Growth (%)",
+        marker_color=COLORS["Sri Lanka1"]
+    ))
+    fig.add_trace(go.Bar(
+        x=economic_crisis_df['Year'],
+        y=economic_crisis_df['Inflation (%)'],
+        name="Inflation (%)",
+        marker_color=COLORS["Sri Lanka2"]
+    ))
+    fig.add_trace(go.Bar(
+        x=economic_crisis_df['Year'],
+        y=economic_crisis_df['Debt to GDP Ratio (%)'],
+        name="Debt to GDP Ratio (%)",
+        marker_color=COLORS["Sri Lanka3"]
+    ))
+    fig.add_trace(go.Bar(
+        x=economic_crisis_df['Year'],
+        y=economic_crisis_df['Unemployment Rate (%)'],
+        name="Unemployment Rate (%)",
+        marker_color=COLORS["Sri Lanka4"]
+    ))
+
+    fig.update_layout(
+        title="Economic Crisis Impact in Sri Lanka",
+        barmode="group",
+        xaxis_title="Year",
+        yaxis_title="Percentage",
+        height=800,
+        width=1000,
+        legend=dict(
+            groupclick="toggleitem"  # Group legend items for clarity
+        )
+    )
+    return fig
@@ -0,0 +1,165 @@
+"""
+Lightweight timers and counters for the hot paths (data loaders, figure builders, page sections).
+
+Switched on with SL_INSTRUMENT=1. When off, @timed returns the function unchanged and timer()
+returns a shared no-op context manager, so the instrumentation costs nothing.
+Results can be viewed in the diagnostics sidebar panel and exported as Prometheus text or JSON lines.
+"""
+import contextlib
+import functools
+import json
+import os
+import threading
+import time
+from typing import Callable, Iterator, TypeVar
+
+
+F = TypeVar("F", bound=Callable)
+
+ENABLED = os.environ.get("SL_INSTRUMENT", "0") == "1"
+
+# name -> {"calls", "errors", "total_seconds", "max_seconds", "last_seconds"}
+_timers: dict[str, dict[str, float]] = {}
+_counters: dict[str, int] = {}
+_lock = threading.Lock()
+_noop = contextlib.nullcontext()
+
+
+def _record(name: str, seconds: float, failed: bool) -> None:
+    with _lock:
+        stats = _timers.setdefault(name, {"calls": 0, "errors": 0, "total_seconds": 0.0, "max_seconds": 0.0, "last_seconds": 0.0})
+        stats["calls"] += 1
+        stats["errors"] += failed
+        stats["total_seconds"] += seconds
+        stats["max_seconds"] = max(stats["max_seconds"], seconds)
+        stats["last_seconds"] = seconds
+
+
+@contextlib.contextmanager
+def _timer(name: str) -> Iterator[None]:
+    start = time.perf_counter()
+    failed = True
+    try:
+        yield
+        failed = False
+    finally:
+        _record(name, time.perf_counter() - start, failed)
+
+
+def timer(name: str) -> contextlib.AbstractContextManager:
+    """
+    Times the enclosed block as `name`.
+    """
+    return _timer(name) if ENABLED else _noop
+
+
+def timed(name: str | None = None) -> Callable[[F], F]:
+    """
+    Decorator timing every call of the function, as `name` or module.function.
+    """
+    def decorator(func: F) -> F:
+        if not ENABLED:
+            return func
+
+        label = name or f"{func.__module__}.{func.__qualname__}"
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with _timer(label):
+                return func(*args, **kwargs)
+        return wrapper # type: ignore
+
+    return decorator
+
+
+def count(name: str, n: int = 1) -> None:
+    if ENABLED:
+        with _lock:
+            _counters[name] = _counters.get(name, 0) + n
+
+
+def snapshot() -> dict[str, dict]:
+    with _lock:
+        return {
+            "timers": {name: dict(stats) for name, stats in _timers.items()},
+            "counters": dict(_counters),
+        }
+
+
+def reset() -> None:
+    with _lock:
+        _timers.clear()
+        _counters.clear()
+
+
+def _label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def to_prometheus() -> str:
+    """
+    Prometheus text exposition format.
+    """
+    data = snapshot()
+    lines = [
+        "# HELP sl_stage_calls_total Calls of an instrumented stage.",
+        "# TYPE sl_stage_calls_total counter",
+        *(f'sl_stage_calls_total{{stage="{_label(name)}"}} {stats["calls"]:.0f}' for name, stats in data["timers"].items()),
+        "# HELP sl_stage_errors_total Calls of an instrumented stage that raised.",
+        "# TYPE sl_stage_errors_total counter",
+        *(f'sl_stage_errors_total{{stage="{_label(name)}"}} {stats["errors"]:.0f}' for name, stats in data["timers"].items()),
+        "# HELP sl_stage_seconds_total Time spent in an instrumented stage.",
+        "# TYPE sl_stage_seconds_total counter",
+        *(f'sl_stage_seconds_total{{stage="{_label(name)}"}} {stats["total_seconds"]:.6f}' for name, stats in data["timers"].items()),
+        "# HELP sl_stage_seconds_max Slowest call of an instrumented stage.",
+        "# TYPE sl_stage_seconds_max gauge",
+        *(f'sl_stage_seconds_max{{stage="{_label(name)}"}} {stats["max_seconds"]:.6f}' for name, stats in data["timers"].items()),
+        "# HELP sl_events_total Instrumented event counters.",
+        "# TYPE sl_events_total counter",
+        *(f'sl_events_total{{name="{_label(name)}"}} {value}' for name, value in data["counters"].items()),
+    ]
+    return "\n".join(lines) + "\n"
+
+
+def to_json_lines() -> str:
+    """
+    One JSON object per timer and counter.
+    """
+    data = snapshot()
+    timestamp = time.time()
+    records = [
+        {"type": "timer", "name": name, "timestamp": timestamp, **stats}
+        for name, stats in data["timers"].items()
+    ] + [
+        {"type": "counter", "name": name, "timestamp": timestamp, "value": value}
+        for name, value in data["counters"].items()
+    ]
+    return "".join(json.dumps(record) + "\n" for record in records)
+
+
+def render_diagnostics_sidebar() -> None:
+    """
+    Diagnostics panel at the bottom of the sidebar, only shown when instrumentation is enabled.
+    """
+    if not ENABLED:
+        return
+
+    import pandas as pd
+    import streamlit as st
+
+    data = snapshot()
+    with st.sidebar.expander("Diagnostics"):
+        timers = pd.DataFrame.from_dict(data["timers"], orient="index")
+        if not timers.empty:
+            timers["mean_ms"] = timers["total_seconds"] / timers["calls"] * 1000
+            timers["last_ms"] = timers["last_seconds"] * 1000
+            timers["max_ms"] = timers["max_seconds"] * 1000
+            st.dataframe(
+                timers[["calls", "errors", "mean_ms", "last_ms", "max_ms"]].sort_values("mean_ms", ascending=False),
+                width="stretch"
+            )
+        if data["counters"]:
+            st.dataframe(pd.Series(data["counters"], name="count"), width="stretch")
+
+        st.download_button("Prometheus", to_prometheus(), file_name="metrics.prom", mime="text/plain")
+        st.download_button("JSON lines", to_json_lines(), file_name="metrics.jsonl", mime="application/jsonl")
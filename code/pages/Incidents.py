@@ -1,12 +1,25 @@
 import os
 
-import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
 import streamlit as st
+from streamlit.delta_generator import DeltaGenerator
 
-from data_utils import load_sl_events
+from data_utils import load_events_by_year, load_incident_data, load_sl_events
 from definitions import COLORS
+from instrumentation import render_diagnostics_sidebar, timed, timer
+from incident_plots import (
+    GEOJSON_DIR,
+    cached_plot,
+    plot_civil_war_map,
+    plot_covid,
+    plot_easter_attacks_map,
+    plot_economic_crisis,
+    plot_financial_crisis_map,
+    plot_refugee_crisis_map,
+    plot_tourism_boom,
+    plot_tsunami_map,
+)
+from schemas import SchemaError
+from snapshots import plotly_chart
 
 
 # Page configuration
@@ -20,11 +33,175 @@ st.set_page_config(
 # File paths
 base_dir = os.path.dirname(os.path.abspath(__file__))
 data_dir = os.path.abspath(os.path.join(base_dir, "..", "..", "data", "incidents"))
-geojson_dir = base_dir  # GeoJSON files are in the same folder as this script
-sl_events = load_sl_events(os.path.join(base_dir, "..", "..", "data", "sl_events.json"))
+geojson_dir = GEOJSON_DIR  # GeoJSON files are in the same folder as this script, used by the offline maps
+
+# Only the events are needed up front, for the section anchors. Every section loads its own table when it is
+# opened and reports a missing or invalid file itself
+try:
+    sl_events = load_sl_events(os.path.join(base_dir, "..", "..", "data", "sl_events.json"))
+except (OSError, ValueError) as e:
+    st.error(f"Could not load the events: {e}")
+    st.stop()
+
+
+def lazy_expander(label: str, key: str) -> DeltaGenerator | None:
+    """
+    Collapsed expander whose content is only built while it is open.
+    Inside a fragment, opening it or using its widgets reruns only that fragment.
+    """
+    expander = st.expander(label, key=f"expand_{key}", on_change="rerun")
+    return expander if expander.open else None
+
+
+# Each section is a fragment, interacting with one section doesn't re-execute the others
+@st.fragment
+@timed()
+def tsunami_section() -> None:
+    expander = lazy_expander("Map of the affected districts", key="tsunami")
+    if expander is None:
+        return
+
+    with expander:
+        try:
+            path = os.path.join(data_dir, "tsunami_data.csv")
+            with timer("st.plotly_chart tsunami"):
+                plotly_chart("tsunami", lambda: cached_plot(plot_tsunami_map, load_incident_data(path)))
+        except FileNotFoundError:
+            st.error("Tsunami data file not found. Please ensure 'tsunami_data.csv' is located in the 'data/incidents/' directory.")
+        except SchemaError as e:
+            st.error(f"Invalid data file: {e}")
+
+
+@st.fragment
+@timed()
+def civil_war_section() -> None:
+    expander = lazy_expander("Map of the civil war events", key="civil_war")
+    if expander is None:
+        return
+
+    with expander:
+        try:
+            events_by_year = load_events_by_year(os.path.join(data_dir, "civil_war_events_2000_2009.csv"))
+            first_year, last_year = min(events_by_year), max(events_by_year)
+            selected_year = st.slider("Select a year to view events", first_year, last_year, first_year, key="civil_war_year")
+
+            # years without events show an empty map
+            events = events_by_year.get(selected_year, events_by_year[first_year].iloc[:0])
+            with timer("st.plotly_chart civil_war"):
+                plotly_chart(f"civil_war_{selected_year}", lambda: cached_plot(plot_civil_war_map, events, selected_year))
+        except FileNotFoundError:
+            st.error("Civil war data file not found. Please ensure 'civil_war_events_2000_2009.csv' is located in the 'data/incidents/' directory.")
+        except SchemaError as e:
+            st.error(f"Invalid data file: {e}")
+
+
+@st.fragment
+@timed()
+def financial_crisis_section() -> None:
+    expander = lazy_expander("Map of the crisis impact by state", key="financial_crisis")
+    if expander is None:
+        return
+
+    with expander:
+        try:
+            path = os.path.join(data_dir, "financial_crisis_data.csv")
+            with timer("st.plotly_chart financial_crisis"):
+                plotly_chart("financial_crisis", lambda: cached_plot(plot_financial_crisis_map, load_incident_data(path)))
+        except FileNotFoundError:
+            st.error("Financial crisis data file not found. Please ensure 'financial_crisis_data.csv' is located in the 'data/incidents/' directory.")
+        except SchemaError as e:
+            st.error(f"Invalid data file: {e}")
+
+
+@st.fragment
+@timed()
+def refugee_crisis_section() -> None:
+    expander = lazy_expander("Map of refugees accepted by state", key="refugee_crisis")
+    if expander is None:
+        return
+
+    with expander:
+        try:
+            path = os.path.join(data_dir, "refugee_crisis_data.csv")
+            with timer("st.plotly_chart refugee_crisis"):
+                plotly_chart("refugee_crisis", lambda: cached_plot(plot_refugee_crisis_map, load_incident_data(path)))
+        except FileNotFoundError:
+            st.error("Refugee crisis data file not found. Please ensure 'refugee_crisis_data.csv' is located in the 'data/incidents/' directory.")
+        except SchemaError as e:
+            st.error(f"Invalid data file: {e}")
+
+
+@st.fragment
+@timed()
+def tourism_boom_section() -> None:
+    expander = lazy_expander("Chart of tourist arrivals", key="tourism_boom")
+    if expander is None:
+        return
+
+    with expander:
+        try:
+            path = os.path.join(data_dir, "Tourism_Sri_Lanka_2016_2019.csv")
+            with timer("st.plotly_chart tourism_boom"):
+                plotly_chart("tourism_boom", lambda: cached_plot(plot_tourism_boom, load_incident_data(path)))
+        except FileNotFoundError:
+            st.error("Tourism data file not found. Please ensure 'Tourism_Sri_Lanka_2016_2019.csv' is located in the 'data/incidents/' directory.")
+        except SchemaError as e:
+            st.error(f"Invalid data file: {e}")
+
+
+@st.fragment
+@timed()
+def easter_attacks_section() -> None:
+    expander = lazy_expander("Map of the attack locations", key="easter_attacks")
+    if expander is None:
+        return
+
+    with expander:
+        try:
+            path = os.path.join(data_dir, "easter_attacks_data.csv")
+            with timer("st.plotly_chart easter_attacks"):
+                plotly_chart("easter_attacks", lambda: cached_plot(plot_easter_attacks_map, load_incident_data(path)))
+        except FileNotFoundError:
+            st.error("Easter attacks data file not found. Please ensure 'easter_attacks_data.csv' is located in the 'data/incidents/' directory.")
+        except SchemaError as e:
+            st.error(f"Invalid data file: {e}")
+
+
+@st.fragment
+@timed()
+def covid_section() -> None:
+    expander = lazy_expander("Chart of the pandemic impact", key="covid")
+    if expander is None:
+        return
+
+    with expander:
+        try:
+            path = os.path.join(data_dir, "covid_data.csv")
+            with timer("st.plotly_chart covid"):
+                plotly_chart("covid", lambda: cached_plot(plot_covid, load_incident_data(path)))
+        except FileNotFoundError:
+            st.error("COVID-19 data file not found. Please ensure 'covid_data.csv' is located in the 'data/incidents/' directory.")
+        except SchemaError as e:
+            st.error(f"Invalid data file: {e}")
+
+
+@st.fragment
+@timed()
+def economic_crisis_section() -> None:
+    expander = lazy_expander("Chart of the crisis indicators", key="economic_crisis")
+    if expander is None:
+        return
+
+    with expander:
+        try:
+            path = os.path.join(data_dir, "economic_crisis_data.csv")
+            with timer("st.plotly_chart economic_crisis"):
+                plotly_chart("economic_crisis", lambda: cached_plot(plot_economic_crisis, load_incident_data(path)))
+        except FileNotFoundError:
+            st.error("Economic crisis data file not found. Please ensure 'economic_crisis_data.csv' is located in the 'data/incidents/' directory.")
+        except SchemaError as e:
+            st.error(f"Invalid data file: {e}")
 
-#Adjust to increase/decrease the dotsize for the shown maps
-map_dot_size = 12
 
 # Sidebar navigation
 st.sidebar.markdown("""
@@ -76,33 +253,7 @@ Sri Lanka was among the worst-affected countries, with significant loss of life,
 destruction of infrastructure, and economic devastation.
 """)
 
-try:
-    tsunami_df = pd.read_csv(os.path.join(data_dir, "tsunami_data.csv"))
-    tsunami_fig = px.scatter_map(
-        tsunami_df,
-        lat="Latitude",
-        lon="Longitude",
-        hover_name="District",
-        hover_data={
-            "Deaths": True,
-            "Damage": True,
-            "Latitude": False,
-            "Longitude": False
-        },
-        color_discrete_sequence=[COLORS["Sri Lanka"]],
-        zoom=6.8, # type: ignore
-        center={"lat": 7.8731, "lon": 80.7718},
-    )
-    tsunami_fig.update_traces(marker=dict(size=map_dot_size))
-    tsunami_fig.update_layout(
-        map_style="carto-positron",
-        title="Sri Lanka Tsunami 2004 Affected Districts",
-        height=800,
-        width=1000
-    )
-    st.plotly_chart(tsunami_fig)
-except FileNotFoundError:
-    st.error("Tsunami data file not found. Please ensure 'tsunami_data.csv' is located in the 'data/incidents/' directory.")
+tsunami_section()
 
 # Civil War Section
 st.header("Sri Lankan Civil War (2000-2009)", anchor=sl_events[2009]["Id"])
@@ -111,46 +262,7 @@ The Sri Lankan Civil War was a prolonged armed conflict between the government a
 It caused widespread destruction and loss of life, particularly in the Northern and Eastern provinces.
 """)
 
-try:
-    civil_war_df = pd.read_csv(os.path.join(data_dir, "civil_war_events_2000_2009.csv"))
-
-    # Explicitly cast numeric columns to object to allow 'N/A'
-    numeric_columns = ["Army Casualties", "LTTE Casualties", "Civilian Casualties"]
-    for col in numeric_columns:
-        civil_war_df[col] = civil_war_df[col].astype(object)
-
-    civil_war_df.fillna("N/A", inplace=True)  # Replace empty values with 'N/A'
-
-    selected_year = st.slider("Select a year to view events", 2000, 2009, 2000)
-    filtered_df = civil_war_df[civil_war_df["Year"] == selected_year]
-
-    civil_war_fig = px.scatter_map(
-        filtered_df,
-        lat="Latitude",
-        lon="Longitude",
-        hover_name="Description",
-        hover_data={
-            "Year": True,
-            "Army Casualties": True,
-            "LTTE Casualties": True,
-            "Civilian Casualties": True,
-            "Latitude": False,
-            "Longitude": False
-        },
-        color_discrete_sequence=[COLORS["Sri Lanka"]],
-        zoom=6.8, # type: ignore
-        center={"lat": 7.8731, "lon": 80.7718},
-    )
-    civil_war_fig.update_traces(marker=dict(size=map_dot_size))
-    civil_war_fig.update_layout(
-        map_style="carto-positron",
-        title=f"Sri Lankan Civil War Events in {selected_year}",
-        height=800,
-        width=1000
-    )
-    st.plotly_chart(civil_war_fig)
-except FileNotFoundError:
-    st.error("Civil war data file not found. Please ensure 'civil_war_events_2000_2009.csv' is located in the 'data/incidents/' directory.")
+civil_war_section()
 
 # 2008/09 Financial Crisis Section
 st.header("2008/09 Financial Crisis in Germany", anchor="financial-crisis-germany")
@@ -159,37 +271,7 @@ The 2008/09 financial crisis had a significant impact on Germany, Europe's large
 It caused a contraction in industrial output, increased unemployment, and higher government spending.
 """)
 
-try:
-    financial_crisis_df = pd.read_csv(os.path.join(data_dir, "financial_crisis_data.csv"))
-    financial_crisis_df.fillna("N/A", inplace=True)  # Replace empty values with 'N/A'
-
-    financial_crisis_fig = px.scatter_map(
-        financial_crisis_df,
-        lat="Latitude",
-        lon="Longitude",
-        hover_name="State",
-        hover_data={
-            "2008 Unemployment Rate (%)": True,
-            "2009 Unemployment Rate (%)": True,
-            "2008 Industrial Output Change (%)": True,
-            "2009 Industrial Output Change (%)": True,
-            "Latitude": False,
-            "Longitude": False
-        },
-        color_discrete_sequence=[COLORS["Germany"]],
-        zoom=5,
-        center={"lat": 51.1657, "lon": 10.4515},
-    )
-    financial_crisis_fig.update_traces(marker=dict(size=map_dot_size))
-    financial_crisis_fig.update_layout(
-        map_style="carto-positron",
-        title="Germany 2008/09 Financial Crisis Impact",
-        height=800,
-        width=1000
-    )
-    st.plotly_chart(financial_crisis_fig)
-except FileNotFoundError:
-    st.error("Financial crisis data file not found. Please ensure 'financial_crisis_data.csv' is located in the 'data/incidents/' directory.")
+financial_crisis_section()
 
 # 2015 Refugee Crisis Section
 st.header("2015 Refugee Crisis in Germany", anchor="refugee-crisis-germany")
@@ -198,28 +280,7 @@ In 2015, Germany became a primary destination for refugees fleeing conflict, par
 The crisis placed significant strain on resources but highlighted Germany's humanitarian efforts.
 """)
 
-try:
-    refugee_crisis_df = pd.read_csv(os.path.join(data_dir, "refugee_crisis_data.csv"))
-    refugee_crisis_fig = px.scatter_map(
-        refugee_crisis_df,
-        lat="Latitude",
-        lon="Longitude",
-        hover_name="State",
-        hover_data={"Refugees Accepted": True, "Cost (Million Euros)": True, "Latitude": False, "Longitude": False},
-        color_discrete_sequence=[COLORS["Germany"]],
-        zoom=5,
-        center={"lat": 51.1657, "lon": 10.4515},
-    )
-    refugee_crisis_fig.update_traces(marker=dict(size=map_dot_size))
-    refugee_crisis_fig.update_layout(
-        map_style="carto-positron",
-        title="Germany Refugee Crisis Impact",
-        height=800,
-        width=1000
-    )
-    st.plotly_chart(refugee_crisis_fig)
-except FileNotFoundError:
-    st.error("Refugee crisis data file not found. Please ensure 'refugee_crisis_data.csv' is located in the 'data/incidents/' directory.")
+refugee_crisis_section()
 
 
 
@@ -231,33 +292,7 @@ as a top travel destination. The tourism sector significantly contributed to for
 and employment opportunities, showcasing the country's cultural and natural attractions.
 """)
 
-try:
-    tourism_df = pd.read_csv(os.path.join(data_dir, "Tourism_Sri_Lanka_2016_2019.csv"))
-
-    tourism_fig = px.line(
-        tourism_df,
-        x="Year",
-        y="Arrivals_in_Millions",
-        title="Tourist Arrivals in Sri Lanka (2016-2019)",
-        markers=True,
-        line_shape="spline",
-        hover_data=["Revenue_in_Billions_USD"]
-    )
-    tourism_fig.update_traces(line_color=COLORS["Sri Lanka"])
-    tourism_fig.update_layout(
-        xaxis=dict(
-            title="Year",
-            tickmode="linear",
-            tick0=2016,  # Start at 2016
-            dtick=1      # Increment by 1 to ensure integer ticks
-        ),
-        yaxis_title="Arrivals (in Millions)",
-        height=600,
-        width=900
-    )
-    st.plotly_chart(tourism_fig)
-except FileNotFoundError:
-    st.error("Tourism data file not found. Please ensure 'Tourism_Sri_Lanka_2016_2019.csv' is located in the 'data/incidents/' directory.")
+tourism_boom_section()
 
 
 
@@ -268,28 +303,7 @@ The 2019 Easter attacks were a series of coordinated bombings targeting churches
 These attacks resulted in significant loss of life and were among the deadliest in the country's history.
 """)
 
-try:
-    easter_attacks_df = pd.read_csv(os.path.join(data_dir, "easter_attacks_data.csv"))
-    easter_attacks_fig = px.scatter_map(
-        easter_attacks_df,
-        lat="Latitude",
-        lon="Longitude",
-        hover_name="Location",
-        hover_data={"Killed": True, "Injured": True, "Terrorists Killed": True, "Latitude": False, "Longitude": False},
-        color_discrete_sequence=[COLORS["Sri Lanka"]],
-        zoom=6.8, # type: ignore
-        center={"lat": 7.8731, "lon": 80.7718},
-    )
-    easter_attacks_fig.update_traces(marker=dict(size=map_dot_size))
-    easter_attacks_fig.update_layout(
-        map_style="carto-positron",
-        title="Easter Attacks Locations",
-        height=800,
-        width=1000
-    )
-    st.plotly_chart(easter_attacks_fig)
-except FileNotFoundError:
-    st.error("Easter attacks data file not found. Please ensure 'easter_attacks_data.csv' is located in the 'data/incidents/' directory.")
+easter_attacks_section()
 
 # COVID-19 Pandemic Section
 st.header("COVID-19 Pandemic", anchor=sl_events[2020]["Id"])
@@ -298,69 +312,7 @@ The COVID-19 pandemic had a profound impact globally, including in Germany and S
 It caused waves of infections, significant fatalities, and widespread economic challenges.
 """)
 
-try:
-    covid_df = pd.read_csv(os.path.join(data_dir, "covid_data.csv"))
-
-    # Combine data for both countries
-    fig = go.Figure()
-    for country in covid_df['Country'].unique():
-        country_data = covid_df[covid_df['Country'] == country]
-        if country == "Germany":
-            fig.add_trace(go.Bar(
-                x=country_data['Year'],
-                y=country_data['Infections'],
-                name=f"{country} Infections",
-                marker_color=COLORS["Germany1"]
-            ))
-            fig.add_trace(go.Bar(
-                x=country_data['Year'],
-                y=country_data['Deaths'],
-                name=f"{country} Deaths",
-                marker_color=COLORS["Germany2"]
-            ))
-            fig.add_trace(go.Bar(
-                x=country_data['Year'],
-                y=country_data['Economic Loss (Billion USD)'],
-                name=f"{country} Economic Loss",
-                marker_color=COLORS["Germany3"]
-            ))
-        else:
-            fig.add_trace(go.Bar(
-                x=country_data['Year'],
-                y=country_data['Infections'],
-                name=f"{country} Infections",
-                marker_color=COLORS["Sri Lanka1"]
-            ))
-            fig.add_trace(go.Bar(
-                x=country_data['Year'],
-                y=country_data['Deaths'],
-                name=f"{country} Deaths",
-                marker_color=COLORS["Sri Lanka3"]
-            ))
-            fig.add_trace(go.Bar(
-                x=country_data['Year'],
-                y=country_data['Economic Loss (Billion USD)'],
-                name=f"{country} Economic Loss",
-                marker_color=COLORS["Sri Lanka4"]
-            ))
-
-    fig.update_layout(
-        title="COVID-19 Impact in Germany and Sri Lanka",
-        barmode="group",
-        xaxis_title="Year",
-        yaxis=dict(
-            title="Number of incidents (log scale)",
-            type="log"
-        ),
-        height=800,
-        width=1000,
-        legend=dict(
-            groupclick="toggleitem"  # Group legend items for clarity
-        )
-    )
-    st.plotly_chart(fig)
-except FileNotFoundError:
-    st.error("COVID-19 data file not found. Please ensure 'covid_data.csv' is located in the 'data/incidents/' directory.")
+covid_section()
 
 # Economic Crisis Section
 st.header("Economic Crisis in Sri Lanka", anchor=sl_events[2021]["Id"])
@@ -368,50 +320,7 @@ st.markdown("""
 The Sri Lankan economic crisis, starting in 2019, is considered the worst since independence in 1948.
 It was marked by unsustainable debt, inflation, and shortages of essential goods.
 """)
-#we maybe should use the same colouring as in the plot above for sri lanka based attributes right here this is just a suggestion
-try:
-    economic_crisis_df = pd.read_csv(os.path.join(data_dir, "economic_crisis_data.csv"))
-
-    fig = go.Figure()
-    fig.add_trace(go.Bar(
-        x=economic_crisis_df['Year'],
-        y=economic_crisis_df['GDP Growth (%)'],
-        name="GDP Growth (%)",
-        marker_color=COLORS["Sri Lanka1"]
-    ))
-    fig.add_trace(go.Bar(
-        x=economic_crisis_df['Year'],
-        y=economic_crisis_df['Inflation (%)'],
-        name="Inflation (%)",
-        marker_color=COLORS["Sri Lanka2"]
-    ))
-    fig.add_trace(go.Bar(
-        x=economic_crisis_df['Year'],
-        y=economic_crisis_df['Debt to GDP Ratio (%)'],
-        name="Debt to GDP Ratio (%)",
-        marker_color=COLORS["Sri Lanka3"]
-    ))
-    fig.add_trace(go.Bar(
-        x=economic_crisis_df['Year'],
-        y=economic_crisis_df['Unemployment Rate (%)'],
-        name="Unemployment Rate (%)",
-        marker_color=COLORS["Sri Lanka4"]
-    ))
-
-    fig.update_layout(
-        title="Economic Crisis Impact in Sri Lanka",
-        barmode="group",
-        xaxis_title="Year",
-        yaxis_title="Percentage",
-        height=800,
-        width=1000,
-        legend=dict(
-            groupclick="toggleitem"  # Group legend items for clarity
-        )
-    )
-    st.plotly_chart(fig)
-except FileNotFoundError:
-    st.error("Economic crisis data file not found. Please ensure 'economic_crisis_data.csv' is located in the 'data/incidents/' directory.")
+economic_crisis_section()
 
 # Protests against the Government Section
 st.header("Protests against the Government", anchor=sl_events[2022]["Id"])
@@ -462,3 +371,5 @@ st.markdown("""
 ---
 This dashboard provides a comparative study of significant incidents in Sri Lanka and Germany.
 """)
+
+render_diagnostics_sidebar()
@@ -0,0 +1,197 @@
+"""
+Peer countries: the countries whose trajectory over the years looks most like a given country's.
+
+Every country is a vector of its yearly values of the METRICS below, normalized so the metrics are comparable.
+The distance of two countries is the root mean square difference over the entries both have data for, countries
+sharing fewer than MIN_OVERLAP entries are not compared. The distances of all pairs are computed at once with
+matrix products over the (countries x entries) arrays, a top-k query is then an argpartition of one row.
+
+The yearly values come from data/peers/trajectories.csv, built by build_data.py from the World Happiness
+Report panel (happiness, GDP per capita), the air passengers of Our World in Data per head of the World Bank
+population (tourism). Only metrics every country has are compared, so distances are comparable across pairs:
+the curated inflation data only covers Germany and Sri Lanka and is left out.
+
+Usage: python code/peers.py [--country "Sri Lanka"] [-k 10]
+"""
+import argparse
+import os
+import threading
+import time
+import zipfile
+from os import PathLike
+
+import numpy as np
+import pandas as pd
+
+from data_utils import DATA_DIR
+
+
+TRAJECTORIES = DATA_DIR / 'peers' / 'trajectories.csv'
+
+YEARS = range(2005, 2024)
+
+# column -> normalization. "level": compared by value, "log level": by the logarithm of the value, for ratios
+# spanning orders of magnitude
+METRICS: dict[str, str] = {
+    'Log GDP per capita': 'level', # already logged by the WHR, PPP in constant dollars
+    'Happiness score': 'level',
+    'Air passengers per capita': 'log level',
+}
+
+# normalized values beyond this many standard deviations are clipped, e.g. Sri Lanka's inflation in 2022
+CLIP = 4.0
+# shared (metric, year) entries, more than the 19 years of a single metric
+MIN_OVERLAP = 20
+
+# OWID country name -> WHR country name
+_OWID_NAMES = {
+    'Congo': 'Congo (Brazzaville)',
+    'Democratic Republic of Congo': 'Congo (Kinshasa)',
+    "Cote d'Ivoire": 'Ivory Coast',
+    'Hong Kong': 'Hong Kong S.A.R. of China',
+    'Turkey': 'Türkiye',
+}
+
+
+def read_population(path: str | PathLike[str]) -> pd.DataFrame:
+    """
+    The population (Code, Year, Population) of a World Bank SP.POP.TOTL download, a zip with the data and two
+    metadata files.
+    """
+    with zipfile.ZipFile(path) as archive:
+        name = next(name for name in archive.namelist() if name.startswith("API_"))
+        with archive.open(name) as f:
+            # 4 metadata lines before the header
+            wide = pd.read_csv(f, skiprows=4, encoding='utf-8-sig')
+    years = [column for column in wide.columns if column.isdigit()]
+    long = wide.melt(id_vars=['Country Code'], value_vars=years, var_name='Year', value_name='Population')
+    return long.rename(columns={'Country Code': 'Code'}).astype({'Year': 'int64'})
+
+
+def build_trajectories(
+    whr_path: str | PathLike[str],
+    passengers_path: str | PathLike[str],
+    population_path: str | PathLike[str]
+) -> pd.DataFrame:
+    """
+    The METRICS of all countries for YEARS, indexed by (Year, Country), NaN where a source has no value.
+    """
+    whr = pd.read_csv(whr_path, usecols=['Country name', 'year', 'Life Ladder', 'Log GDP per capita'])
+    whr = whr.rename(columns={'Country name': 'Country', 'year': 'Year', 'Life Ladder': 'Happiness score'})
+
+    passengers = pd.read_csv(passengers_path)
+    # aggregates like "World" have no or an OWID_ code
+    passengers = passengers[passengers['Code'].str.fullmatch('[A-Z]{3}', na=False)]
+    # OWID and the World Bank share the ISO 3166 codes
+    passengers = passengers.merge(read_population(population_path), on=['Code', 'Year'], how='left')
+    passengers = pd.DataFrame({
+        'Country': passengers['Entity'].replace(_OWID_NAMES),
+        'Year': passengers['Year'],
+        'Air passengers per capita': passengers['Air transport, passengers carried'] / passengers['Population'],
+    })
+
+    df = whr.merge(passengers, on=['Country', 'Year'], how='outer')
+    df = df[df['Year'].isin(YEARS)].set_index(['Year', 'Country']).sort_index()
+    return df[list(METRICS)].dropna(how='all')
+
+
+def normalize(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    The METRICS of a trajectories frame normalized as declared, each scaled to unit standard deviation over
+    all countries and years, so every metric weighs the same in a distance.
+    """
+    normalized = {}
+    for column, how in METRICS.items():
+        values = df[column].astype('float64')
+        if how == 'log level':
+            values = np.log(values.where(values > 0))
+        normalized[column] = ((values - values.mean()) / values.std()).clip(-CLIP, CLIP)
+    return pd.DataFrame(normalized)
+
+
+def build_index(df: pd.DataFrame, min_overlap: int = MIN_OVERLAP) -> dict:
+    """
+    The similarity index of a trajectories frame: {"countries", "distances" (countries x countries, inf where
+    two countries share fewer than `min_overlap` entries), "overlap" (number of shared entries)}.
+    """
+    # countries x (metric, year), NaN where missing
+    wide = normalize(df).unstack('Year').reindex(columns=pd.MultiIndex.from_product([list(METRICS), YEARS]))
+    values = wide.to_numpy()
+    mask = (~np.isnan(values)).astype('float64')
+    x = np.nan_to_num(values)
+
+    # sum over the shared entries of (a - b)^2 = a^2 . m_b + m_a . b^2 - 2 a . b, with a and b zero where missing
+    squares = x * x
+    overlap = mask @ mask.T
+    sums = squares @ mask.T + mask @ squares.T - 2 * x @ x.T
+    with np.errstate(divide='ignore', invalid='ignore'):
+        distances = np.sqrt(np.maximum(sums, 0) / overlap)
+    distances[overlap < min_overlap] = np.inf
+    np.fill_diagonal(distances, np.inf) # a country is not its own peer
+
+    return {
+        'countries': wide.index.astype(str).to_numpy(),
+        'distances': distances,
+        'overlap': overlap.astype(int),
+    }
+
+
+# mtime_ns of TRAJECTORIES, its index. Sessions run on threads, the lock makes concurrent misses build it once
+_index: tuple[int, dict] | None = None
+_index_lock = threading.Lock()
+
+
+def index() -> dict:
+    """
+    The index of data/peers/trajectories.csv, rebuilt when the file changes.
+    """
+    global _index
+    with _index_lock:
+        mtime_ns = os.stat(TRAJECTORIES).st_mtime_ns
+        if _index is None or _index[0] != mtime_ns:
+            _index = (mtime_ns, build_index(load_trajectories()))
+        return _index[1]
+
+
+def load_trajectories(path: str | PathLike[str] = TRAJECTORIES) -> pd.DataFrame:
+    return pd.read_csv(path, index_col=[0, 1])
+
+
+def top_k(country: str, k: int = 5, idx: dict | None = None) -> pd.DataFrame:
+    """
+    The `k` countries closest to `country` (Country, Distance, Overlap), closest first. Raises KeyError for
+    countries not in the index.
+    """
+    idx = idx or index()
+    rows = np.flatnonzero(idx['countries'] == country)
+    if len(rows) == 0:
+        raise KeyError(f"{country!r} is not in the peer index")
+    distances = idx['distances'][rows[0]]
+
+    k = min(k, int(np.isfinite(distances).sum()))
+    nearest = np.argpartition(distances, k)[:k] if k < len(distances) else np.arange(len(distances))
+    nearest = nearest[np.argsort(distances[nearest])][:k]
+    return pd.DataFrame({
+        'Country': idx['countries'][nearest],
+        'Distance': distances[nearest],
+        'Overlap': idx['overlap'][rows[0], nearest],
+    })
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--country', default="Sri Lanka", help="country to find peers of (default: Sri Lanka)")
+    parser.add_argument('-k', type=int, default=10, help="number of peers (default: 10)")
+    args = parser.parse_args()
+
+    trajectories = load_trajectories()
+    start = time.perf_counter()
+    idx = build_index(trajectories)
+    print(f"Index of {len(idx['countries'])} countries: {time.perf_counter() - start:.3f} s")
+
+    start = time.perf_counter()
+    for country in idx['countries']:
+        top_k(country, args.k, idx)
+    print(f"Top {args.k} of every country: {time.perf_counter() - start:.3f} s")
+
+    print(top_k(args.country, args.k, idx).to_string(index=False))
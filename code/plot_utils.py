@@ -1,9 +1,24 @@
+import json
+import os
+import re
+import textwrap
+import time
+from typing import Callable
+
 import numpy as np
 import pandas as pd
 import plotly.graph_objects as go
 import streamlit as st
+from plotly.subplots import make_subplots
 
+import figure_cache
+import peers
+import regimes
+import snapshots
+from data_utils import data_fingerprint
 from definitions import COLORS
+from happiness import REPORTS
+from instrumentation import timed, timer
 
 
 st.set_page_config(
@@ -13,88 +28,181 @@ st.set_page_config(
     initial_sidebar_state="collapsed")
 
 
-def plot_panel1(data: dict[str, dict[str, pd.DataFrame]], sl_events: dict[int, dict[str, str]]) -> None:
-    st.markdown(f"""
-        <h1 style='color:{COLORS['Sri Lanka']};'>
-        Incidents That Shaped Sri Lanka</h1>
-        """, unsafe_allow_html=True)
-
-    st.write("""
-        By navigating the timeline through a select set of years, you can see which major events have occurred and their effects on inflation rates, GDP, tourism industry, and happiness of Sri Lanka's citizens.
-    """)
-
-    # Define specific years for the slider
-    year_options = [2000, 2004, 2009, 2018, 2019, 2020, 2021, 2022, 2024]
-    selected_year = st.select_slider(
-        label="Select Year Range",
-        options=year_options,
-        value=2000, # == starting value
-        help=f"You can choose from {year_options}",
-        label_visibility="visible"
-    )
-    assert type(selected_year) == int # typ checking fix
-
-
-    # Display the selected event name and description
-    try:
-        with st.container(border=True, height=192):
-            event_data = sl_events[selected_year]
-            # syntax: [label](page_name#section_id)
-            st.markdown(f"[{event_data['Name']}](Incidents#{event_data['Id']})")
-            st.markdown(f"{event_data['Description']}")
-            st.markdown(f"{event_data['Effect']}")
-
-    except Exception as e:
-        st.write("Error loading event descriptions!")
-        st.write(e)
-
-
+def year_axis(years: pd.Index | np.ndarray) -> np.ndarray:
+    """
+    Vectorized conversion of integer years to January 1st, as milliseconds since epoch.
+    Plotly ships the result as a typed array and plotly.js reads it as dates on axes with type="date".
+    """
+    dates = (np.asarray(years, dtype="int64") - 1970).astype("datetime64[Y]")
+    return dates.astype("datetime64[ms]").astype("int64").astype("float64")
+
+
+# SL_COMPACT_FIGURES=0 sends full float64 values, e.g. to compare payload sizes
+COMPACT_FIGURES = os.environ.get("SL_COMPACT_FIGURES", "1") != "0"
+
+
+# SL_PANEL1_ANIMATED=1 replaces the panel 1 select_slider by a slider inside the figure, see build_panel1_animation
+PANEL1_ANIMATED = os.environ.get("SL_PANEL1_ANIMATED", "0") == "1"
+
+
+def compact(values: pd.Series | np.ndarray, decimals: int) -> np.ndarray:
+    """
+    Rounds to the precision shown in the hover labels and downcasts to float32,
+    which plotly ships as a base64 typed array of 4 bytes per value.
+    """
+    values = np.asarray(values, dtype="float64")
+    if not COMPACT_FIGURES:
+        return values
+    return np.round(values, decimals).astype("float32")
+
+
+def trace_header(country: str) -> str:
+    """
+    First hover line of a country's trace. Constant per trace, so it's part of the hovertemplate
+    instead of being repeated in the customdata of every point.
+    """
+    return f"<b style='color:{country_color(country)}'>{country}</b><br>"
+
+
+def country_color(country: str) -> str:
+    # peer countries share one color
+    return COLORS.get(country, COLORS['peer'])
+
+
+# Specific years for the panel 1 slider
+YEAR_OPTIONS = [2000, 2004, 2009, 2018, 2019, 2020, 2021, 2022, 2024]
+
+# SL_PANEL1_HIGHLIGHTS=yoy colors the panel 1 lines by their year-over-year change instead of PANEL1_BREAKPOINTS,
+# SL_PANEL1_HIGHLIGHTS=regimes by the regimes found by regimes.py
+PANEL1_HIGHLIGHTS = os.environ.get("SL_PANEL1_HIGHLIGHTS", "curated")
+
+# Curated highlights of the panel 1 timeline. A breakpoint colors the line from the previous breakpoint's year
+# up to its own year, the first one only marks the start
+PANEL1_BREAKPOINTS = pd.DataFrame(
+    [
+        ("inflation", 2000, "neutral"),
+        ("inflation", 2004, "neutral"),
+        ("inflation", 2005, "bad"),
+        ("inflation", 2008, "neutral"),
+        ("inflation", 2009, "good"),
+        ("inflation", 2021, "neutral"),
+        ("inflation", 2022, "bad"),
+        ("inflation", 2025, "neutral"),
+        ("GDP", 2000, "neutral"),
+        ("GDP", 2009, "neutral"),
+        ("GDP", 2018, "good"),
+        ("GDP", 2021, "neutral"),
+        ("GDP", 2022, "bad"),
+        ("GDP", 2025, "neutral"),
+        ("happiness", 2000, "neutral"),
+        ("happiness", 2010, "neutral"),
+        ("happiness", 2018, "good"),
+        ("happiness", 2023, "neutral"),
+        ("happiness", 2025, "bad"),
+        ("tourism", 2000, "neutral"),
+        ("tourism", 2009, "neutral"),
+        ("tourism", 2018, "good"),
+        ("tourism", 2021, "bad"),
+        ("tourism", 2025, "neutral"),
+    ],
+    columns=["Metric", "Year", "Color"]
+)
+
+# metric -> (column, threshold of the year-over-year change, in % or pp, higher is better) for SL_PANEL1_HIGHLIGHTS=yoy
+PANEL1_YOY: dict[str, tuple[str, float, bool]] = {
+    'inflation': ('Inflation Value Annual Change (pp)', 2, False),
+    'GDP': ('GDP per capita (current US$) Annual Change (%)', 5, True),
+    'happiness': ('Happiness score Annual Change (%)', 3, True),
+    'tourism': ('tourists arrived Annual Change (%)', 10, True),
+}
+
+
+# metric -> the column panel 1 plots
+PANEL1_COLUMNS = {
+    'inflation': 'Inflation Value (%)',
+    'GDP': 'GDP per capita (current US$)',
+    'happiness': 'Happiness score',
+    'tourism': 'tourists arrived',
+}
+
+
+def segment_colors(years: np.ndarray, breakpoints: pd.DataFrame) -> np.ndarray:
+    """
+    The color of the line from the previous year to each of `years`, from a table of breakpoints
+    ('Year', 'Color', sorted by year): the color of the first breakpoint at or after the year.
+    Years after the last breakpoint keep its color, without breakpoints all lines are "neutral".
+    """
+    if breakpoints.empty:
+        return np.full(len(years), "neutral", dtype=object)
+    positions = np.searchsorted(breakpoints['Year'].to_numpy(), years, side='left')
+    return breakpoints['Color'].to_numpy()[positions.clip(1, len(breakpoints) - 1)]
+
+
+def yoy_breakpoints(change: pd.Series, threshold: float, higher_is_better: bool = True) -> pd.DataFrame:
+    """
+    Breakpoints coloring a series by its year-over-year `change` (indexed by year): "good" where it changes by at
+    least `threshold` in the better direction, "bad" in the worse one, "neutral" otherwise or without data.
+    Consecutive years of the same color collapse into one breakpoint.
+    """
+    change = change if higher_is_better else -change
+    colors = np.select([change >= threshold, change <= -threshold], ["good", "bad"], "neutral")
+    years = change.index.to_numpy()
+    # the last year of every run of one color, plus the start
+    last_of_run = np.r_[colors[1:] != colors[:-1], True]
+    last_of_run[0] = True
+    return pd.DataFrame({'Year': years[last_of_run], 'Color': colors[last_of_run]})
+
+
+def panel1_breakpoints(data: dict[str, dict[str, pd.DataFrame]], metric: str) -> pd.DataFrame:
+    """
+    The breakpoints of one panel 1 metric, curated or data-driven depending on SL_PANEL1_HIGHLIGHTS.
+    """
+    if PANEL1_HIGHLIGHTS == "yoy":
+        column, threshold, higher_is_better = PANEL1_YOY[metric]
+        return yoy_breakpoints(data[metric]['sl'][column], threshold, higher_is_better)
+    if PANEL1_HIGHLIGHTS == "regimes":
+        found = regimes.detect_cached(regimes.country_frame(data[metric]), metric)["regimes"]
+        found = found[(found['Country'] == "Sri Lanka") & (found['Metric'] == PANEL1_COLUMNS[metric])]
+        return regimes.regime_breakpoints(found, higher_is_better=PANEL1_YOY[metric][2])
+    return PANEL1_BREAKPOINTS[PANEL1_BREAKPOINTS['Metric'] == metric]
+
+
+def color_traces(
+    values: np.ndarray,
+    dates: np.ndarray,
+    colors: np.ndarray,
+    palette: list[str] | np.ndarray
+) -> dict[str, tuple[np.ndarray, np.ndarray]]:
+    """
+    Splits a line into one (x, y) pair per color of `palette`, however many segments there are.
+    colors[k] is the color of the line from point k - 1 to point k. Each color's points are separated by NaN
+    wherever the line has another color in between, plotly leaves a gap there.
+    """
+    traces = {}
+    for color in palette:
+        piece = colors[1:] == color # piece k: point k -> k + 1
+        included = np.r_[piece, False] | np.r_[False, piece]
+        indices = np.flatnonzero(included)
+        # consecutive points that aren't joined by a piece of this color
+        gaps = np.flatnonzero((np.diff(indices) != 1) | ~piece[indices[:-1]]) + 1 if len(indices) else indices
+        x = np.insert(values[indices], gaps, np.nan)
+        # the gap's y is irrelevant, x is NaN
+        y = np.insert(dates[indices], gaps, dates[indices][gaps] if len(gaps) else [])
+        traces[color] = (x, y)
+    return traces
+
+
+@timed()
+def build_panel1_figure(data: dict[str, dict[str, pd.DataFrame]], selected_year: int) -> go.Figure:
     # Filter data while handling missing values
     all_years = np.arange(2000, 2025)
     visible_years = all_years[all_years <= selected_year]
 
-    inflation_filtered = data['inflation']['sl']['Inflation Value (%)'].reindex(visible_years)
-    gdp_filtered = data['GDP']['sl']['GDP per capita (current US$)'].reindex(visible_years)
-    happiness_filtered = data['happiness']['sl']['Happiness score'].reindex(visible_years)
-    tourism_filtered = data['tourism']['sl']['tourists arrived'].reindex(visible_years)
-
-
-    g, b, n = COLORS["good"], COLORS["bad"], COLORS["neutral"]
-
-    color_highlights = {
-        "inflation": [
-            (2000, n),
-            (2004, n),
-            (2005, b),
-            (2008, n),
-            (2009, g),
-            (2021, n),
-            (2022, b),
-            (2025, n)
-        ],
-        "GDP": [
-            (2000, n),
-            (2009, n),
-            (2018, g),
-            (2021, n),
-            (2022, b),
-            (2025, n),
-        ],
-        "happiness": [
-            (2000, n),
-            (2010, n),
-            (2018, g),
-            (2023, n),
-            (2025, b),
-        ],
-        "tourism": [
-            (2000, n),
-            (2009, n),
-            (2018, g),
-            (2021, b),
-            (2025, n),
-        ],
-    }
+    inflation_filtered = data['inflation']['sl'][PANEL1_COLUMNS['inflation']].reindex(visible_years)
+    gdp_filtered = data['GDP']['sl'][PANEL1_COLUMNS['GDP']].reindex(visible_years)
+    happiness_filtered = data['happiness']['sl'][PANEL1_COLUMNS['happiness']].reindex(visible_years)
+    tourism_filtered = data['tourism']['sl'][PANEL1_COLUMNS['tourism']].reindex(visible_years)
+
 
     common_traces = dict(
         mode='lines', # hide markers
@@ -103,26 +211,29 @@ def plot_panel1(data: dict[str, dict[str, pd.DataFrame]], sl_events: dict[int, d
         hoverinfo="none", # would be nicer to see the year (y-value without the line color inside the tooltip)
     )
 
+    # shared by all traces, the series are all reindexed to visible_years
+    dates = year_axis(visible_years)
+
     # plot data
     fig = go.Figure()
 
-    for i, (filtered_data, metric) in enumerate([
-        (inflation_filtered, 'inflation'),
-        (gdp_filtered, 'GDP'),
-        (happiness_filtered, 'happiness'),
-        (tourism_filtered, 'tourism')
+    # panel 1 has no hover labels, values only need to be precise at plot resolution
+    for i, (filtered_data, metric, decimals) in enumerate([
+        (inflation_filtered, 'inflation', 1),
+        (gdp_filtered, 'GDP', 0),
+        (happiness_filtered, 'happiness', 2),
+        (tourism_filtered, 'tourism', -2)
     ], start=1):
-        for (start_year, _), (end_year, color) in zip(color_highlights[metric], color_highlights[metric][1:]):
-            selection=filtered_data[(filtered_data.index >= start_year) & (filtered_data.index <= end_year)]
-
+        breakpoints = panel1_breakpoints(data, metric)
+        colors = segment_colors(visible_years, breakpoints)
+        # one trace per color, even if empty, so every year's figure has the same traces (see build_panel1_animation)
+        for color, (x, y) in color_traces(compact(filtered_data, decimals), dates, colors, breakpoints['Color'].unique()).items():
             fig.add_trace(
                 go.Scatter(
-                    x=selection,
-                    y=selection.index.to_series().apply(lambda x: f"{x}-01-01"),
+                    x=x,
+                    y=y,
                     xaxis=f"x{i}",      # Use different x-axis for each metric
-                    line_color=color,   # if color != n else COLORS[metric],
-                    # only highlight markers inside sections >= 2 years
-                    marker_color=[n] + [color]*(len(selection) - 2) + [color if len(selection) > 1 else n],
+                    line_color=COLORS[color],
                     **common_traces,
                 )
             )
@@ -176,6 +287,7 @@ def plot_panel1(data: dict[str, dict[str, pd.DataFrame]], sl_events: dict[int, d
         ),
         # Reverse range and styling
         yaxis=dict(
+            type="date",
             range=[
                 pd.Timestamp("2025-02-01"),
                 pd.Timestamp("2000-01-01"),
@@ -196,17 +308,165 @@ def plot_panel1(data: dict[str, dict[str, pd.DataFrame]], sl_events: dict[int, d
             line_width=0.25
         )
 
+    return fig
+
+
+def panel1_figures(data: dict[str, dict[str, pd.DataFrame]]) -> dict[int, go.Figure]:
+    """
+    Lookup table of the panel 1 figure for every slider position, built once per process.
+    Callers must not modify the returned figures.
+    """
+    fingerprint = data_fingerprint({metric: data[metric]['sl'] for metric in ['inflation', 'GDP', 'happiness', 'tourism']})
+    return figure_cache.get_or_build(
+        ("panel1_figures", fingerprint),
+        lambda: {year: build_panel1_figure(data, year) for year in YEAR_OPTIONS}
+    )
+
+
+def panel1_event_annotation(event: dict[str, str] | None) -> dict:
+    """
+    The event box of plot_panel1 as an annotation below the timeline, used by the animated mode.
+    Annotations don't wrap, so the text is wrapped here.
+    """
+    text = ""
+    if event is not None:
+        lines = [f"<a href='Incidents#{event['Id']}' target='_self'><b>{event['Name']}</b></a>"]
+        for field in ['Description', 'Effect']:
+            if event[field].strip():
+                lines += ["", *textwrap.wrap(event[field], 110)]
+        text = "<br>".join(lines)
+
+    return dict(
+        text=text,
+        xref="paper",
+        yref="paper",
+        x=0,
+        y=-0.22,
+        xanchor="left",
+        yanchor="top",
+        align="left",
+        showarrow=False
+    )
+
+
+@timed()
+def build_panel1_animation(data: dict[str, dict[str, pd.DataFrame]], sl_events: dict[int, dict[str, str]]) -> go.Figure:
+    """
+    Panel 1 with a slider inside the figure and one animation frame per slider position. The figure is
+    sent once and the slider runs in the browser, moving it doesn't rerun the script or resend anything.
+
+    Every year has the same traces (segments without visible years are empty), so a frame only carries
+    the x/y values of the traces that aren't identical in all years, plus the shapes and the event text.
+    """
+    figures = panel1_figures(data)
+    first = YEAR_OPTIONS[0]
+
+    traces = [fig.data for fig in figures.values()]
+    changing = [
+        i for i in range(len(traces[0]))
+        if any(
+            not np.array_equal(t[i].x, traces[0][i].x, equal_nan=True) or not np.array_equal(t[i].y, traces[0][i].y)
+            for t in traces[1:]
+        )
+    ]
+
+    fig = go.Figure(figures[first]) # copy, the cached figures are shared
+    fig.frames = [
+        go.Frame(
+            name=str(year),
+            traces=changing,
+            data=[go.Scatter(x=figures[year].data[i].x, y=figures[year].data[i].y) for i in changing],
+            layout=dict(shapes=figures[year].layout.shapes, annotations=[panel1_event_annotation(sl_events.get(year))])
+        )
+        for year in YEAR_OPTIONS
+    ]
+
+    # redraw, because the "No Data" shape and the event text are layout changes
+    step_options = dict(mode="immediate", frame=dict(duration=0, redraw=True), transition=dict(duration=0))
+    fig.update_layout(
+        annotations=[panel1_event_annotation(sl_events.get(first))],
+        sliders=[dict(
+            active=0,
+            currentvalue=dict(prefix="Year: "),
+            x=0,
+            len=1,
+            y=-0.02,
+            yanchor="top",
+            pad=dict(t=0),
+            steps=[
+                dict(label=str(year), method="animate", args=[[str(year)], step_options])
+                for year in YEAR_OPTIONS
+            ]
+        )],
+        height=860,
+        margin=dict(b=260)
+    )
+    return fig
+
+
+def panel1_animation(data: dict[str, dict[str, pd.DataFrame]], sl_events: dict[int, dict[str, str]]) -> go.Figure:
+    """
+    build_panel1_animation, built once per process. Callers must not modify the returned figure.
+    """
+    fingerprint = data_fingerprint({metric: data[metric]['sl'] for metric in ['inflation', 'GDP', 'happiness', 'tourism']})
+    events = json.dumps(sl_events, sort_keys=True)
+    return figure_cache.get_or_build(
+        ("panel1_animation", fingerprint, events),
+        lambda: build_panel1_animation(data, sl_events)
+    )
+
+
+@timed()
+def plot_panel1(data: dict[str, dict[str, pd.DataFrame]], sl_events: dict[int, dict[str, str]]) -> None:
+    st.markdown(f"""
+        <h1 style='color:{COLORS['Sri Lanka']};'>
+        Incidents That Shaped Sri Lanka</h1>
+        """, unsafe_allow_html=True)
+
+    st.write("""
+        By navigating the timeline through a select set of years, you can see which major events have occurred and their effects on inflation rates, GDP, tourism industry, and happiness of Sri Lanka's citizens.
+    """)
+
+    if PANEL1_ANIMATED:
+        with timer("st.plotly_chart panel1"):
+            snapshots.plotly_chart("panel1_animation", lambda: panel1_animation(data, sl_events), width="stretch")
+        return
+
+    selected_year = st.select_slider(
+        label="Select Year Range",
+        options=YEAR_OPTIONS,
+        value=2000, # == starting value
+        help=f"You can choose from {YEAR_OPTIONS}",
+        label_visibility="visible"
+    )
+    assert type(selected_year) == int # typ checking fix
+
+
+    # Display the selected event name and description
+    try:
+        with st.container(border=True, height=192):
+            event_data = sl_events[selected_year]
+            # syntax: [label](page_name#section_id)
+            st.markdown(f"[{event_data['Name']}](Incidents#{event_data['Id']})")
+            st.markdown(f"{event_data['Description']}")
+            st.markdown(f"{event_data['Effect']}")
+
+    except Exception as e:
+        st.write("Error loading event descriptions!")
+        st.write(e)
+
     # render in streamlit
-    st.plotly_chart(fig, width="stretch")
+    with timer("st.plotly_chart panel1"):
+        snapshots.plotly_chart(f"panel1_{selected_year}", lambda: panel1_figures(data)[selected_year], width="stretch")
 
 
+@timed()
 def plot_inflation_data(data: dict[str, pd.DataFrame]) -> go.Figure:
     fig = go.Figure()
     hovertemplate = (
-        "<b style='color:%{customdata[1]}'>%{customdata[0]}</b><br>"
         # "Year: %{x}<br>"
         "Inflation: <b>%{y:.1f}%</b><br>"
-        "Reason: %{customdata[2]}<br>"
+        "Reason: %{text}<br>"
         "<extra></extra>"
     )
 
@@ -216,22 +476,18 @@ def plot_inflation_data(data: dict[str, pd.DataFrame]) -> go.Figure:
     for country, df in [('Sri Lanka', data['sl']), ('Germany', data['de'])]:
         fig.add_trace(
             go.Scatter(
-                # pd.to_datetime(df.index) doesn't work here
-                x=df.index.to_series().apply(lambda x: f"{x}-01-01"),
-                y=df['Inflation Value (%)'],
+                x=year_axis(df.index),
+                y=compact(df['Inflation Value (%)'], 1),
                 line=dict(color=COLORS[country]),
-                customdata=np.column_stack((
-                    [country] * len(df),
-                    [COLORS[country]] * len(df),
-                    df['Reason']
-                )),
-                hovertemplate=hovertemplate,
+                text=df['Reason'],
+                hovertemplate=trace_header(country) + hovertemplate,
                 name=country # legend label
             )
         )
 
     fig.update_layout(
         title_text="Inflation",
+        xaxis=dict(type="date"),
         yaxis=dict(range=[0, 51]),
         hovermode='x unified'
     )
@@ -239,19 +495,19 @@ def plot_inflation_data(data: dict[str, pd.DataFrame]) -> go.Figure:
     return fig
 
 
+@timed()
 def plot_GDP_data(data: dict[str, pd.DataFrame]) -> go.Figure:
     fig = go.Figure()
     hovertemplate = (
-        "<b style='color:%{customdata[1]}'>%{customdata[0]}</b><br>"
         # "Year: %{x}<br>"
         "Change YoY: <b>%{y:.2f}%</b><br>"
-        "GDP per capita: <b>%{customdata[2]:,.0f}</b> US$<br>"
-        "GDP: <b>%{customdata[3]:,.1f}</b> billion US$<br>"
-        "Gov. debt: <b>%{customdata[4]:.1f}%</b> of GDP<br>"
-        "Industry: <b>%{customdata[5]:.1f}%</b> of GDP<br>"
-        "Agriculture: <b>%{customdata[6]:.1f}%</b> of GDP<br>"
-        "Services: <b>%{customdata[7]:.1f}%</b> of GDP<br>"
-        "Military exp.: <b>%{customdata[8]:.2f}%</b> of GDP<br>"
+        "GDP per capita: <b>%{customdata[0]:,.0f}</b> US$<br>"
+        "GDP: <b>%{customdata[1]:,.1f}</b> billion US$<br>"
+        "Gov. debt: <b>%{customdata[2]:.1f}%</b> of GDP<br>"
+        "Industry: <b>%{customdata[3]:.1f}%</b> of GDP<br>"
+        "Agriculture: <b>%{customdata[4]:.1f}%</b> of GDP<br>"
+        "Services: <b>%{customdata[5]:.1f}%</b> of GDP<br>"
+        "Military exp.: <b>%{customdata[6]:.2f}%</b> of GDP<br>"
         "<extra></extra>"
     ) # HTML
 
@@ -259,27 +515,26 @@ def plot_GDP_data(data: dict[str, pd.DataFrame]) -> go.Figure:
     for country, df in [('Sri Lanka', data['sl']), ('Germany', data['de'])]:
         fig.add_trace(
             go.Scatter(
-                x=df.index.to_series().apply(lambda x: f"{x}-01-01"),
-                y=df['GDP (billion US$) Annual Change (%)'],
+                x=year_axis(df.index),
+                y=compact(df['GDP (billion US$) Annual Change (%)'], 2),
                 line=dict(color=COLORS[country]),
                 customdata=np.column_stack((
-                    [country] * len(df),
-                    [COLORS[country]] * len(df),
-                    df['GDP per capita (current US$)'],
-                    df['GDP (billion US$)'],
-                    df['Government debt (% of GDP)'],
-                    df['Industry (including construction), value added (% of GDP)'],
-                    df['Agriculture, forestry, and fishing, value added (% of GDP)'],
-                    df['Services, value added (% of GDP)'],
-                    df['Military expenditure (% of GDP)'],
+                    compact(df['GDP per capita (current US$)'], 0),
+                    compact(df['GDP (billion US$)'], 1),
+                    compact(df['Government debt (% of GDP)'], 1),
+                    compact(df['Industry (including construction), value added (% of GDP)'], 1),
+                    compact(df['Agriculture, forestry, and fishing, value added (% of GDP)'], 1),
+                    compact(df['Services, value added (% of GDP)'], 1),
+                    compact(df['Military expenditure (% of GDP)'], 2),
                 )),
-                hovertemplate=hovertemplate,
+                hovertemplate=trace_header(country) + hovertemplate,
                 name=country
             )
         )
 
     fig.update_layout(
         title_text="GDP per capita (yearly change in %)",
+        xaxis=dict(type="date"),
         yaxis=dict(range=[-21, 41]),
         hovermode='x unified'
     )
@@ -287,45 +542,46 @@ def plot_GDP_data(data: dict[str, pd.DataFrame]) -> go.Figure:
     return fig
 
 
+@timed()
 def plot_happiness_data(data: dict[str, pd.DataFrame]) -> go.Figure:
     fig = go.Figure()
     hovertemplate = (
-        "<b style='color:%{customdata[1]}'>%{customdata[0]}</b><br>"
         "Year: %{x}<br>"
-        "Rank: #%{customdata[2]:.0f}<br>"
+        "Rank: #%{customdata[0]:.0f}<br>"
         "Happiness Score: <b>%{y:.2f}</b><br><br>"
         "Score Breakdown:<br>"
-        "GDP per capita: <b>%{customdata[3]:.3f}</b><br>"
-        "Social support: <b>%{customdata[4]:.3f}</b><br>"
-        "Healthy life expectancy: <b>%{customdata[5]:.3f}</b><br>"
-        "Freedom to make life choices: <b>%{customdata[6]:.3f}</b><br>"
-        "Generosity: <b>%{customdata[7]:.3f}</b><br>"
-        "Perceptions of corruption: <b>%{customdata[8]:.3f}</b><br>"
-        "Dystopia + residual: <b>%{customdata[9]:.3f}</b><br>"
+        "GDP per capita: <b>%{customdata[1]:.3f}</b><br>"
+        "Social support: <b>%{customdata[2]:.3f}</b><br>"
+        "Healthy life expectancy: <b>%{customdata[3]:.3f}</b><br>"
+        "Freedom to make life choices: <b>%{customdata[4]:.3f}</b><br>"
+        "Generosity: <b>%{customdata[5]:.3f}</b><br>"
+        "Perceptions of corruption: <b>%{customdata[6]:.3f}</b><br>"
+        "Dystopia + residual: <b>%{customdata[7]:.3f}</b><br>"
         "<extra></extra>"
     ) # HTML
 
     for country, data_df in [('Germany', data['de']), ('Sri Lanka', data['sl'])]:
-        # better data source starting from 2015
-        for i, df in enumerate([data_df[data_df.index < 2015], data_df[data_df.index >= 2015]]):
+        # the yearly reports (from 2015) measure differently than the survey panels before
+        report = data_df['Source'].isin(REPORTS)
+        for i, df in enumerate([data_df[~report], data_df[report]]):
             fig.add_trace(
                 go.Scatter(
-                    x=df.index.to_series().apply(lambda x: f"{x}-01-01"),
-                    y=df['Happiness score'],
+                    x=year_axis(df.index),
+                    y=compact(df['Happiness score'], 2),
                     line=dict(color=COLORS[country]),
                     customdata=np.column_stack((
-                        [country] * len(df),
-                        [COLORS[country]] * len(df),
-                        df['Happiness rank'],
-                        df['GDP per capita'],
-                        df['Social support'],
-                        df['Healthy life expectancy'],
-                        df['Freedom to make life choices'],
-                        df['Generosity'],
-                        df['Perceptions of corruption'],
-                        df['Dystopia + residual']
+                        compact(df['Happiness rank'], 0),
+                        *(compact(df[column], 3) for column in [
+                            'GDP per capita',
+                            'Social support',
+                            'Healthy life expectancy',
+                            'Freedom to make life choices',
+                            'Generosity',
+                            'Perceptions of corruption',
+                            'Dystopia + residual'
+                        ])
                     )),
-                    hovertemplate=hovertemplate,
+                    hovertemplate=trace_header(country) + hovertemplate,
                     name=country,
                     showlegend=(i == 0) # hide second identical legend label
                 )
@@ -364,6 +620,7 @@ def plot_happiness_data(data: dict[str, pd.DataFrame]) -> go.Figure:
 
     fig.update_layout(
         title_text="Happiness Score",
+        xaxis=dict(type="date"),
         yaxis=dict(range=[0, 10.05]), # 10 or 10.05
         # hovermode='x unified'
     )
@@ -371,37 +628,34 @@ def plot_happiness_data(data: dict[str, pd.DataFrame]) -> go.Figure:
     return fig
 
 
+@timed()
 def plot_tourism_data(data: dict[str, pd.DataFrame]) -> go.Figure:
     fig = go.Figure()
     hovertemplate = (
-        "<b style='color:%{customdata[1]}'>%{customdata[0]}</b><br>"
         "Tourists per capita: <b>%{y:,.3f}</b><br>"
-        "Total Tourists: <b>%{customdata[2]:,.1f} million</b><br>"
-        "Population: <b>%{customdata[3]:,.1f} million</b><br>"
+        "Total Tourists: <b>%{customdata[0]:,.1f} million</b><br>"
+        "Population: <b>%{customdata[1]:,.1f} million</b><br>"
         "<extra></extra>"
     )
 
     for country, df in [('Germany', data['de']), ('Sri Lanka', data['sl'])]:
-        df['tourists_per_capita'] = df['tourists arrived'] / df['population']
-
         fig.add_trace(
             go.Scatter(
-                x=df.index.to_series().apply(lambda x: f"{x}-01-01"),
-                y=df['tourists_per_capita'],
+                x=year_axis(df.index),
+                y=compact(df['tourists_per_capita'], 3),
                 line=dict(color=COLORS[country]),
                 customdata=np.column_stack((
-                    [country] * len(df),
-                    [COLORS[country]] * len(df),
-                    df["tourists arrived"] / 1e6,
-                    df["population"] / 1e6
+                    compact(df["tourists arrived"] / 1e6, 1),
+                    compact(df["population"] / 1e6, 1)
                 )),
-                hovertemplate=hovertemplate,
+                hovertemplate=trace_header(country) + hovertemplate,
                 name=country
             )
         )
 
     fig.update_layout(
         title_text="Yearly Tourist Arrivals per capita",
+        xaxis=dict(type="date"),
         yaxis=dict(range=[0, 0.51]),
         hovermode='x unified'
     )
@@ -409,12 +663,132 @@ def plot_tourism_data(data: dict[str, pd.DataFrame]) -> go.Figure:
     return fig
 
 
-def plot_panel2(data: dict[str, dict[str, pd.DataFrame]], plot_descriptions: dict[str, str]) -> None:
-    st.markdown(
-        f"<h1 style='color:{COLORS['Sri Lanka']};'>Comparing Sri Lanka and Germany</h1>",
-        unsafe_allow_html=True
+def cached_figure(
+    builder: Callable[[dict[str, pd.DataFrame]], go.Figure],
+    data: dict[str, pd.DataFrame],
+    layout: dict,
+    traces: dict
+) -> go.Figure:
+    """
+    Returns builder(data) with `layout` and `traces` applied, building it only once per process.
+    Callers must not modify the returned figure.
+    """
+    def build() -> go.Figure:
+        fig = builder(data)
+        fig.update_layout(**layout, overwrite=False)
+        fig.update_traces(**traces, overwrite=False)
+        return fig
+
+    config = json.dumps([layout, traces], sort_keys=True, default=str)
+    return figure_cache.get_or_build((builder.__name__, data_fingerprint(data), config), build)
+
+
+def figure_cache_stats() -> dict[str, float]:
+    """
+    Hits, builds and build time of the figure cache. `last_rerun_seconds` is the time plot_panel2 spent
+    getting its figures in the latest rerun of the current session, compare it with SL_FIGURE_CACHE=0 for the
+    uncached baseline. All sessions' times are in the "panel2 figures" timer of the instrumentation.
+    """
+    return {**figure_cache.stats(), "last_rerun_seconds": st.session_state.get("panel2_rerun_seconds", 0.0)}
+
+
+# number of peer countries offered besides Germany in the panel 2 comparison selector
+PEER_COUNT = 10
+
+# trajectories column -> subplot title, hover format, transform to the shown value
+PEER_METRICS: dict[str, tuple[str, str, Callable[[pd.Series], pd.Series]]] = {
+    'Log GDP per capita': ("GDP per capita (PPP $)", ",.0f", np.exp),
+    'Happiness score': ("Happiness score", ".2f", lambda values: values),
+    'Air passengers per capita': ("Air passengers per capita", ".2f", lambda values: values),
+}
+
+
+@timed()
+def plot_peer_data(trajectories: pd.DataFrame, peer: str) -> go.Figure:
+    """
+    Sri Lanka and `peer` side by side in every peer index metric both have data for.
+    """
+    countries = {'Sri Lanka': trajectories.xs('Sri Lanka', level='Country'), peer: trajectories.xs(peer, level='Country')}
+    shared = [column for column in PEER_METRICS if all(df[column].notna().any() for df in countries.values())]
+
+    fig = make_subplots(rows=1, cols=len(shared), subplot_titles=[PEER_METRICS[column][0] for column in shared])
+    for i, column in enumerate(shared, start=1):
+        title, fmt, transform = PEER_METRICS[column]
+        for country, df in countries.items():
+            fig.add_trace(
+                go.Scatter(
+                    x=year_axis(df.index),
+                    y=transform(df[column]).to_numpy(),
+                    line=dict(color=country_color(country)),
+                    name=country,
+                    legendgroup=country,
+                    showlegend=i == 1,
+                    hovertemplate=trace_header(country) + f"{title}: <b>%{{y:{fmt}}}</b><extra></extra>",
+                ),
+                row=1, col=i
+            )
+        fig.update_xaxes(type="date", row=1, col=i)
+
+    fig.update_layout(
+        height=350,
+        legend=dict(orientation="h", y=-0.2, xanchor="center", x=0.5),
+        hovermode='x unified'
+    )
+    return fig
+
+
+def peer_options() -> tuple[list[str], dict[str, float]]:
+    """
+    The countries offered by the comparison selector of panel 2, Germany and the countries of the peer index
+    closest to Sri Lanka (see peers.py), with their distance to Sri Lanka. Raises FileNotFoundError or KeyError
+    without a peer index.
+    """
+    candidates = peers.top_k('Sri Lanka', PEER_COUNT + 1)
+    distances = dict(zip(candidates['Country'], candidates['Distance']))
+    return ['Germany'] + [country for country in distances if country != 'Germany'][:PEER_COUNT], distances
+
+
+def peer_figure(peer: str) -> go.Figure:
+    """
+    The chart comparing Sri Lanka with `peer`, built once per process and version of the trajectories.
+    """
+    key = ("plot_peer_data", os.stat(peers.TRAJECTORIES).st_mtime_ns, peer)
+    return figure_cache.get_or_build(key, lambda: plot_peer_data(peers.load_trajectories(), peer))
+
+
+def peer_snapshot_name(peer: str) -> str:
+    # country names contain spaces, dots and parentheses, the snapshot name is part of file names
+    return "peer_" + re.sub(r"[^A-Za-z0-9]+", "_", peer).strip("_")
+
+
+def plot_peer_comparison() -> None:
+    """
+    The comparison country selector of panel 2 (see peer_options) and the chart comparing Sri Lanka with the
+    selected country.
+    """
+    try:
+        options, distances = peer_options()
+    except (FileNotFoundError, KeyError): # build_data.py not run
+        return
+
+    st.subheader("Countries on a similar path")
+    peer = st.selectbox(
+        label="Compare Sri Lanka with",
+        options=options,
+        format_func=lambda country: f"{country} (distance {distances[country]:.2f})" if country in distances else country,
+        help="The countries whose GDP per capita, happiness and air passengers per capita since 2005 are closest to Sri Lanka's",
+        key="panel2_peer",
     )
 
+    with timer("st.plotly_chart peer"):
+        snapshots.plotly_chart(peer_snapshot_name(peer), lambda: peer_figure(peer), width="stretch")
+
+
+def panel2_figures(data: dict[str, dict[str, pd.DataFrame]]) -> dict[str, go.Figure]:
+    """
+    The panel 2 figures of the datasets in `data` with the common config applied, each built once per process.
+    Callers must not modify the returned figures.
+    """
     # Common config for all plots
     common_layout = dict(
         height=400,
@@ -439,27 +813,45 @@ def plot_panel2(data: dict[str, dict[str, pd.DataFrame]], plot_descriptions: dic
         marker=dict(size=6)
     )
 
-    figs = {
-        'inflation': plot_inflation_data(data['inflation']),
-        'GDP': plot_GDP_data(data['GDP']),
-        'happiness': plot_happiness_data(data['happiness']),
-        'tourism': plot_tourism_data(data['tourism'])
+    return {
+        key: cached_figure(builder, data[key], common_layout, common_traces)
+        for key, builder in [
+            ('inflation', plot_inflation_data),
+            ('GDP', plot_GDP_data),
+            ('happiness', plot_happiness_data),
+            ('tourism', plot_tourism_data)
+        ]
+        if key in data
     }
 
-    for key, fig in figs.items():
-        col1, col2 = st.columns([2, 1])  # Column widths: 2/3 for plot, 1/3 for text
 
-        # Configure the plot
-        fig.update_layout(**common_layout, overwrite=False)
-        fig.update_traces(**common_traces, overwrite=False)
+@timed()
+def plot_panel2(data: dict[str, dict[str, pd.DataFrame]], plot_descriptions: dict[str, str]) -> None:
+    st.markdown(
+        f"<h1 style='color:{COLORS['Sri Lanka']};'>Comparing Sri Lanka and Germany</h1>",
+        unsafe_allow_html=True
+    )
+
+    # in static mode the figures are only built for missing snapshots
+    start = time.perf_counter()
+    with timer("panel2 figures"):
+        figs = {} if snapshots.STATIC_MODE else panel2_figures(data)
+    # per session, concurrent sessions rerun independently
+    st.session_state["panel2_rerun_seconds"] = time.perf_counter() - start
+
+    # a dataset that failed to load only hides its own chart, the page reports the error
+    for key in [key for key in ['inflation', 'GDP', 'happiness', 'tourism'] if key in data]:
+        col1, col2 = st.columns([2, 1])  # Column widths: 2/3 for plot, 1/3 for text
 
-        with col1:
-            st.plotly_chart(fig, width="stretch")
+        with col1, timer(f"st.plotly_chart {key}"):
+            snapshots.plotly_chart(f"panel2_{key}", lambda: (figs or panel2_figures(data))[key], width="stretch")
 
         with col2:
             st.write("<br><br><br>", unsafe_allow_html=True)
             st.write(plot_descriptions.get(key, "Description not available"))
 
+    plot_peer_comparison()
+
     st.sidebar.markdown("""
     ### Navigation
     - [Introduction](#sri-lanka-s-journey-a-comparative-study-with-germany)
@@ -0,0 +1,339 @@
+"""
+Refreshes the raw inputs of build_data.py's targets from their upstream sources (World Bank, ECB, FRED, Our
+World in Data), then rebuilds the datasets and the bundle the app serves from them.
+
+All UPSTREAMS are downloaded concurrently on an asyncio loop. The blocking http.client requests run on worker
+threads and reuse keep-alive connections from a per-host pool. Downloads that differ from their file in data/
+are swapped in atomically (os.replace) and build_data.py rebuilds the targets depending on them; if the rebuild
+fails, the old files are put back. The result lists every served table that changed compared with the bundle
+before the refresh, as rows added/removed/changed. A dry run only downloads and lists the changed files and the
+targets they would rebuild. Sessions pick up the new data through the content checks of data_utils._load_cached
+and read_table, so they never wait for a refresh.
+
+The refresh runs as its own job next to the app, e.g. from cron or with --interval SECONDS (default
+SL_REFRESH_INTERVAL), never inside the Streamlit server. SL_REFRESH_BASE_URL (or --base-url) fetches every file
+from <base url>/<path in data/> instead, e.g. from the local stand-in started with --serve, which serves data/.
+
+Usage: python code/refresh.py [--base-url URL] [--dry-run] [--interval SECONDS]
+       python code/refresh.py --serve [PORT]
+"""
+import argparse
+import asyncio
+import contextlib
+import functools
+import http.client
+import io
+import os
+import threading
+import time
+import zipfile
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from os import PathLike
+from pathlib import Path
+from typing import Iterator
+from urllib.parse import quote, urljoin, urlsplit
+
+import pandas as pd
+
+import build_bundle
+import build_data
+from data_utils import DATA_DIR, read_table
+from instrumentation import count, timed
+
+
+REFRESH_INTERVAL = float(os.environ.get("SL_REFRESH_INTERVAL", "0")) # seconds, 0 = refresh once
+REFRESH_BASE_URL = os.environ.get("SL_REFRESH_BASE_URL")
+
+
+def unzip_indicators(content: bytes) -> bytes:
+    """
+    The API_*.csv of a World Bank download, a zip with the data and two metadata files.
+    """
+    if not content.startswith(b"PK"): # already the CSV, e.g. from the stand-in
+        return content
+    with zipfile.ZipFile(io.BytesIO(content)) as archive:
+        name = next(name for name in archive.namelist() if name.startswith("API_"))
+        return archive.read(name)
+
+
+def ecb_portal_layout(content: bytes) -> bytes:
+    """
+    An ECB Data API series (SDMX-CSV: KEY, ..., TIME_PERIOD, OBS_VALUE, ..., TITLE) in the layout of the
+    Data Portal export in data/gdp/: "DATE","TIME PERIOD"," <title> (<key>)", one row per quarter.
+    """
+    if not content.startswith(b"KEY,"): # already the portal layout, e.g. from the stand-in
+        return content
+
+    df = pd.read_csv(io.BytesIO(content), dtype=str, keep_default_na=False)
+    dates = pd.PeriodIndex(df["TIME_PERIOD"].str.replace("-", ""), freq="Q").end_time.strftime("%Y-%m-%d")
+
+    lines = [f'"DATE","TIME PERIOD"," {df["TITLE"].iloc[0]} ({df["KEY"].iloc[0]})"']
+    for date, period, value in zip(dates, df["TIME_PERIOD"].str.replace("-", ""), df["OBS_VALUE"]):
+        lines.append(f'"{date}","{period}","{value}"' if value else f'"{date}","{period}"')
+    return ("\n".join(lines) + "\n").encode()
+
+
+# name -> input of a build_data.TARGETS entry and its upstream url, plus a function turning the download into
+# the file's format. Destatis needs an account and the WHR has no stable download, so the German inflation and a
+# new WHR release (see happiness.VINTAGES) are updated by hand
+UPSTREAMS: dict[str, dict] = {
+    'worldbank_de': {
+        'file': 'gdp/API_DEU_DS2_en_csv_v2_15903.csv',
+        'url': 'https://api.worldbank.org/v2/en/country/DEU?downloadformat=csv',
+        'extract': unzip_indicators,
+    },
+    'worldbank_sl': {
+        'file': 'gdp/API_LKA_DS2_en_csv_v2_21470.csv',
+        'url': 'https://api.worldbank.org/v2/en/country/LKA?downloadformat=csv',
+        'extract': unzip_indicators,
+    },
+    'ecb_debt_de': {
+        'file': 'gdp/ECB Data Portal_20250106050459.csv',
+        'url': 'https://data-api.ecb.europa.eu/service/data/GFS/Q.N.DE.W0.S13.S1.C.L.LE.GD.T._Z.XDC_R_B1GQ_CY._T.F.V.N._T?format=csvdata',
+        'extract': ecb_portal_layout,
+    },
+    'fred_inflation_sl': {
+        'file': 'inflation/Inflation_Sri_Lanka.csv',
+        'url': 'https://fred.stlouisfed.org/graph/fredgraph.csv?id=FPCPITOTLZGLKA',
+    },
+    'owid_passengers': {
+        'file': 'tourism/air-passengers-carried.csv',
+        'url': 'https://ourworldindata.org/grapher/air-passengers-carried.csv?v=1&csvType=full&useColumnShortNames=false',
+    },
+}
+
+
+class ConnectionPool:
+    """
+    Keep-alive HTTP(S) connections per host, shared by concurrent downloads. http.client blocks, so every
+    request runs on a worker thread, at most `per_host` at a time per host.
+    """
+
+    def __init__(self, per_host: int = 4, timeout: float = 60) -> None:
+        self.per_host = per_host
+        self.timeout = timeout
+        self._idle: dict[tuple[str, str], list[http.client.HTTPConnection]] = {}
+        self._limits: dict[tuple[str, str], asyncio.Semaphore] = {}
+        self._lock = threading.Lock()
+
+    def _connect(self, scheme: str, netloc: str) -> http.client.HTTPConnection:
+        with self._lock:
+            idle = self._idle.get((scheme, netloc))
+            if idle:
+                return idle.pop()
+        cls = http.client.HTTPSConnection if scheme == "https" else http.client.HTTPConnection
+        return cls(netloc, timeout=self.timeout)
+
+    def _release(self, scheme: str, netloc: str, connection: http.client.HTTPConnection) -> None:
+        with self._lock:
+            self._idle.setdefault((scheme, netloc), []).append(connection)
+
+    def _request(self, url: str) -> tuple[int, str | None, bytes]:
+        parts = urlsplit(url)
+        target = parts.path + (f"?{parts.query}" if parts.query else "")
+        # a pooled connection may have been closed by the server meanwhile, then retry once on a new one
+        for attempt in range(2):
+            connection = self._connect(parts.scheme, parts.netloc)
+            try:
+                connection.request("GET", target or "/", headers={"User-Agent": "SriLankaEconomy-refresh"})
+                response = connection.getresponse()
+                body = response.read()
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                connection.close()
+                if attempt == 1:
+                    raise
+                continue
+            except Exception:
+                connection.close()
+                raise
+
+            if response.will_close:
+                connection.close()
+            else:
+                self._release(parts.scheme, parts.netloc, connection)
+            return response.status, response.getheader("Location"), body
+        raise AssertionError("unreachable")
+
+    async def get(self, url: str, max_redirects: int = 5) -> bytes:
+        """
+        The body of a GET of `url`, following redirects. Raises OSError for other statuses than 200.
+        """
+        for _ in range(max_redirects + 1):
+            host = urlsplit(url)[:2]
+            limit = self._limits.setdefault(host, asyncio.Semaphore(self.per_host))
+            async with limit:
+                status, location, body = await asyncio.to_thread(self._request, url)
+            if status in (301, 302, 303, 307, 308) and location:
+                url = urljoin(url, location)
+                continue
+            if status != 200:
+                raise OSError(f"GET {url}: HTTP {status}")
+            return body
+        raise OSError(f"GET {url}: more than {max_redirects} redirects")
+
+    def close(self) -> None:
+        with self._lock:
+            for connections in self._idle.values():
+                for connection in connections:
+                    connection.close()
+            self._idle.clear()
+
+
+def _line_diff(old: bytes, new: bytes) -> str:
+    old_lines, new_lines = set(old.splitlines()), set(new.splitlines())
+    return f"+{len(new_lines - old_lines)}/-{len(old_lines - new_lines)} lines"
+
+
+def _swap(path: Path, content: bytes) -> None:
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_bytes(content)
+    os.replace(tmp, path)
+
+
+async def download(pool: ConnectionPool, spec: dict, base_url: str | None) -> bytes:
+    """
+    The current upstream version of one of the UPSTREAMS, in the format of its file in data/.
+    """
+    url = urljoin(base_url.rstrip("/") + "/", quote(spec['file'])) if base_url else spec['url']
+    content = spec.get('extract', lambda body: body)(await pool.get(url))
+    if not content:
+        raise OSError(f"GET {url}: empty response")
+    return content
+
+
+def served_tables() -> dict[str, pd.DataFrame]:
+    """
+    The tables of the bundle as the app reads them, see data_utils.read_table.
+    """
+    return {
+        source: read_table(DATA_DIR / source, index_col)
+        for source, index_col in build_bundle.SOURCES.items()
+    }
+
+
+def table_diff(old: pd.DataFrame, new: pd.DataFrame) -> str | None:
+    """
+    The rows added, removed and changed from `old` to `new`, None if they are equal. (Year, Country) tables
+    are matched by index, the others by content, where a changed row counts as removed and added.
+    """
+    old, new = old.astype(object), new.astype(object) # categoricals with different categories don't compare
+    if isinstance(old.index, pd.RangeIndex):
+        old_rows = set(old.astype(str).itertuples(index=False))
+        new_rows = set(new.astype(str).itertuples(index=False))
+        added, removed, changed = len(new_rows - old_rows), len(old_rows - new_rows), 0
+    else:
+        common = old.index.intersection(new.index)
+        a, b = old.loc[common], new.loc[common].reindex(columns=old.columns)
+        changed = int((~((a == b) | (a.isna() & b.isna())).all(axis=1)).sum())
+        added, removed = len(new.index.difference(old.index)), len(old.index.difference(new.index))
+    if not (added or removed or changed) and list(old.columns) == list(new.columns):
+        return None
+    return f"+{added}/-{removed}/~{changed} rows"
+
+
+async def refresh(upstreams: dict[str, dict] = UPSTREAMS, base_url: str | None = None, dry_run: bool = False) -> dict[str, str]:
+    """
+    Downloads all `upstreams` concurrently, swaps in the changed ones and rebuilds what depends on them (see
+    build_data.py). Returns {name: result} per upstream, then {target: result} of the rebuilt targets and
+    {bundle table: rows added/removed/changed} of the served tables that changed, or {target: "would rebuild"}
+    in a dry run. A failed download reports its
+    error and leaves its file untouched, a failed rebuild puts all downloads back and raises.
+    """
+    pool = ConnectionPool()
+    try:
+        downloads = await asyncio.gather(
+            *(download(pool, spec, base_url) for spec in upstreams.values()),
+            return_exceptions=True
+        )
+    finally:
+        pool.close()
+
+    results, changed = {}, {}
+    for (name, spec), content in zip(upstreams.items(), downloads):
+        if isinstance(content, Exception):
+            results[name] = f"failed: {content}"
+            continue
+        path = DATA_DIR / spec['file']
+        old = path.read_bytes() if path.exists() else b""
+        if content == old:
+            results[name] = "unchanged"
+            continue
+        changed[spec['file']] = (old, content)
+        results[name] = f"{'would update' if dry_run else 'updated'} ({_line_diff(old, content)})"
+
+    if dry_run:
+        results.update({output: "would rebuild" for output in build_data.dependents(list(changed))})
+        return results
+    if not changed:
+        return results
+
+    before = await asyncio.to_thread(served_tables)
+    targets = build_data.dependents(list(changed))
+    for file, (_, content) in changed.items():
+        _swap(DATA_DIR / file, content)
+    try:
+        built = await asyncio.to_thread(build_data.build, targets)
+    except Exception:
+        for file, (old, _) in changed.items():
+            _swap(DATA_DIR / file, old)
+        await asyncio.to_thread(build_data.build, targets)
+        raise
+    count("refresh.updated", len(changed))
+    results.update({output: result for output, result in built.items() if result != "up to date"})
+
+    after = await asyncio.to_thread(served_tables)
+    diffs = {f"bundle {source}": table_diff(before[source], after[source]) for source in after}
+    results.update({source: diff for source, diff in diffs.items() if diff is not None})
+    if all(diff is None for diff in diffs.values()):
+        results["bundle"] = "unchanged"
+    return results
+
+
+@timed()
+def refresh_once(base_url: str | None = REFRESH_BASE_URL, dry_run: bool = False) -> dict[str, str]:
+    return asyncio.run(refresh(base_url=base_url, dry_run=dry_run))
+
+
+@contextlib.contextmanager
+def serve_data(port: int = 0, directory: str | PathLike[str] = DATA_DIR) -> Iterator[str]:
+    """
+    A local stand-in for the upstreams serving the files in `directory` (a copy of data/), yields its base url.
+    Port 0 picks a free port.
+    """
+    handler = functools.partial(SimpleHTTPRequestHandler, directory=str(directory))
+    handler.func.protocol_version = "HTTP/1.1" # keep-alive, like the real upstreams
+    handler.func.log_message = lambda *args: None
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    thread = threading.Thread(target=server.serve_forever, name="refresh-stand-in", daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}/"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--base-url', default=REFRESH_BASE_URL, help="fetch every file from <base url>/<path in data/> instead of its upstream")
+    parser.add_argument('--dry-run', action='store_true', help="only report what would change")
+    parser.add_argument('--interval', type=float, default=REFRESH_INTERVAL, metavar='SECONDS', help="refresh every SECONDS until stopped (default: SL_REFRESH_INTERVAL, or once)")
+    parser.add_argument('--serve', nargs='?', type=int, const=8765, metavar='PORT', help="serve data/ as a stand-in upstream (default port: 8765)")
+    args = parser.parse_args()
+
+    if args.serve is not None:
+        with serve_data(args.serve) as url:
+            print(f"Serving {DATA_DIR} at {url}, stop with Ctrl+C")
+            with contextlib.suppress(KeyboardInterrupt):
+                threading.Event().wait()
+    else:
+        for name, result in refresh_once(args.base_url, args.dry_run).items():
+            print(f"{name}: {result}")
+        with contextlib.suppress(KeyboardInterrupt):
+            while args.interval > 0:
+                time.sleep(args.interval)
+                try:
+                    for name, result in refresh_once(args.base_url, args.dry_run).items():
+                        print(f"{name}: {result}")
+                except Exception as e: # e.g. a failed rebuild, the old data is back in place, try again next time
+                    print(f"refresh failed: {e}")
@@ -0,0 +1,266 @@
+"""
+Change-point and anomaly detection over (Year, Country) indexed datasets, for all countries and metrics at once.
+
+Regimes: every series is segmented into periods of constant mean by optimal partitioning with PELT pruning
+(Killick et al. 2012), on the series scaled by its noise level, estimated from the year-to-year differences.
+All series of a dataset are segmented together, the dynamic program runs over years with NumPy arrays of
+(series, candidate) instead of looping over series.
+Anomalies: years whose change from the previous year is more than Z_THRESHOLD standard deviations away from
+the changes of the ANOMALY_WINDOW years before (rolling z-score).
+
+Results are cached per dataset fingerprint. They back the SL_PANEL1_HIGHLIGHTS=regimes mode of panel 1 and the
+event suggestions of the CLI.
+
+Usage: python code/regimes.py [--country "Sri Lanka"] [--all-countries]
+"""
+import argparse
+import threading
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from data_utils import COUNTRY_NAMES, data_fingerprint
+from instrumentation import timed
+
+
+# penalty per change point, in multiples of log(years) of the noise-scaled series (BIC would be 2)
+PENALTY = 3.0
+MIN_REGIME_YEARS = 2
+ANOMALY_WINDOW = 5
+Z_THRESHOLD = 3.0
+
+
+def _noise_scale(values: np.ndarray) -> np.ndarray:
+    """
+    Robust noise level of every row: the MAD of its year-to-year differences, scaled to a standard deviation.
+    """
+    diffs = np.diff(values, axis=1)
+    with warnings.catch_warnings(): # rows without two consecutive years are NaN
+        warnings.simplefilter("ignore", RuntimeWarning)
+        mad = np.nanmedian(np.abs(diffs - np.nanmedian(diffs, axis=1, keepdims=True)), axis=1)
+    return mad * 1.4826 / np.sqrt(2)
+
+
+def segment(values: np.ndarray, penalty: float = PENALTY, min_size: int = MIN_REGIME_YEARS) -> np.ndarray:
+    """
+    Change points of every row of `values` (series x years, NaN for missing years), as a boolean array of the same
+    shape that is True at the first year of every regime after the first.
+    """
+    m, n = values.shape
+    scale = _noise_scale(values)
+    constant = ~(scale > 0) # constant or too short series have no change points
+    x = values / np.where(constant, 1, scale)[:, None]
+
+    valid = ~np.isnan(x)
+    x = np.where(valid, x, 0)
+    zeros = np.zeros((m, 1))
+    s1 = np.hstack([zeros, np.cumsum(x, axis=1)])
+    s2 = np.hstack([zeros, np.cumsum(x * x, axis=1)])
+    counts = np.hstack([zeros, np.cumsum(valid, axis=1)])
+    beta = penalty * np.log(np.maximum(counts[:, -1], 2))
+
+    # F[:, t]: cost of the best segmentation of years [0, t), last[:, t]: start of its last segment
+    F = np.full((m, n + 1), np.inf)
+    F[:, 0] = -beta
+    last = np.zeros((m, n + 1), dtype=np.int64)
+    candidates = np.zeros((m, n + 1), dtype=bool)
+    candidates[:, 0] = True
+    rows = np.arange(m)
+
+    for t in range(min_size, n + 1):
+        s = slice(0, t - min_size + 1)
+        length = counts[:, t, None] - counts[:, s]
+        cost = (s2[:, t, None] - s2[:, s]) - (s1[:, t, None] - s1[:, s]) ** 2 / np.maximum(length, 1)
+        total = np.where(candidates[:, s], F[:, s] + cost + beta[:, None], np.inf)
+        best = np.argmin(total, axis=1)
+        F[:, t] = total[rows, best]
+        last[:, t] = best
+        # PELT: a start that is worse than the optimum now can never become optimal later
+        candidates[:, s] &= F[:, s] + cost <= F[:, t, None]
+        if t <= n - min_size:
+            candidates[:, t] = True
+
+    # backtrack all rows together
+    change_points = np.zeros((m, n), dtype=bool)
+    position = np.full(m, n)
+    while (position > 0).any():
+        start = last[rows, position]
+        inner = (position > 0) & (start > 0)
+        change_points[rows[inner], start[inner]] = True
+        position = np.where(position > 0, start, 0)
+
+    change_points[constant] = False
+    return change_points
+
+
+def rolling_zscores(values: np.ndarray, window: int = ANOMALY_WINDOW) -> tuple[np.ndarray, np.ndarray]:
+    """
+    The year-to-year changes of every row of `values` and their z-scores against the `window` changes before.
+    """
+    changes = np.diff(values, axis=1, prepend=np.nan)
+    frame = pd.DataFrame(changes.T)
+    history = frame.rolling(window, min_periods=3)
+    mean, std = history.mean().shift(1).to_numpy().T, history.std().shift(1).to_numpy().T
+    with np.errstate(all="ignore"):
+        z = np.where(std > 0, (changes - mean) / std, np.nan)
+    return changes, z
+
+
+@timed()
+def detect(df: pd.DataFrame, dataset: str) -> dict[str, pd.DataFrame]:
+    """
+    Regimes and anomalies of every numeric column of a (Year, Country) indexed frame, for all of its countries.
+    Returns {"regimes": Country, Metric, Start, End, Mean, After gap; "anomalies": Country, Metric, Year, Change, Z}.
+    A series with missing years starts a new regime after every gap ("After gap"), whatever its values.
+    """
+    numeric = df.select_dtypes("number").astype("float64")
+    # series x years, one row per (column, country)
+    wide = numeric.unstack("Country").T.sort_index(axis=1)
+    years = wide.columns.to_numpy()
+    metrics = wide.index.get_level_values(0).to_numpy()
+    countries = wide.index.get_level_values(1).astype(str).to_numpy()
+    values = wide.to_numpy()
+    valid = ~np.isnan(values)
+
+    # regimes: split every row at its change points and at gaps, keep the years with data
+    change_points = segment(values)
+    after_gap = valid & ~np.hstack([np.ones((len(values), 1), dtype=bool), valid[:, :-1]]) & (np.cumsum(valid, axis=1) > 1)
+    regime_id = np.cumsum(change_points | after_gap, axis=1)
+    rows, cols = np.nonzero(valid)
+    long = pd.DataFrame({
+        "row": rows,
+        "regime": regime_id[rows, cols],
+        "Year": years[cols],
+        "value": values[rows, cols],
+        "after_gap": after_gap[rows, cols],
+    })
+    regimes = long.groupby(["row", "regime"], sort=True).agg(
+        Start=("Year", "min"), End=("Year", "max"), Mean=("value", "mean"), after_gap=("after_gap", "first")
+    )
+    row_index = regimes.index.get_level_values("row")
+    regimes = pd.DataFrame({
+        "Country": countries[row_index],
+        "Metric": metrics[row_index],
+        "Start": regimes["Start"].to_numpy(),
+        "End": regimes["End"].to_numpy(),
+        "Mean": regimes["Mean"].to_numpy(),
+        "After gap": regimes["after_gap"].to_numpy(),
+    })
+
+    changes, z = rolling_zscores(values)
+    rows, cols = np.nonzero(np.abs(np.nan_to_num(z)) >= Z_THRESHOLD)
+    anomalies = pd.DataFrame({
+        "Country": countries[rows],
+        "Metric": metrics[rows],
+        "Year": years[cols],
+        "Change": changes[rows, cols],
+        "Z": z[rows, cols],
+    })
+
+    return {
+        "regimes": regimes.assign(Dataset=dataset),
+        "anomalies": anomalies.assign(Dataset=dataset),
+    }
+
+
+# Process-wide cache shared by all Streamlit sessions, (dataset, data fingerprint) -> results
+_cache: dict[tuple[str, str], dict[str, pd.DataFrame]] = {}
+_cache_lock = threading.Lock()
+
+
+def detect_cached(df: pd.DataFrame, dataset: str) -> dict[str, pd.DataFrame]:
+    """
+    detect, computed once per version of the data. Callers must not modify the returned frames.
+    """
+    key = (dataset, data_fingerprint({dataset: df}))
+    with _cache_lock:
+        if key in _cache:
+            return _cache[key]
+    results = detect(df, dataset)
+    with _cache_lock:
+        _cache[key] = results
+    return results
+
+
+def country_frame(frames: dict[str, pd.DataFrame]) -> pd.DataFrame:
+    """
+    A {"de": ..., "sl": ...} dataset of the main page's data dict as one (Year, Country) indexed frame.
+    """
+    return pd.concat({COUNTRY_NAMES[key]: df for key, df in frames.items()}, names=["Country", "Year"]).swaplevel().sort_index()
+
+
+def detect_data(data: dict[str, dict[str, pd.DataFrame]]) -> dict[str, pd.DataFrame]:
+    """
+    Regimes and anomalies of every metric of the main page's data dict, see detect.
+    """
+    results = [detect_cached(country_frame(frames), dataset) for dataset, frames in data.items()]
+    return {name: pd.concat([result[name] for result in results], ignore_index=True) for name in ["regimes", "anomalies"]}
+
+
+def regime_breakpoints(regimes: pd.DataFrame, higher_is_better: bool = True) -> pd.DataFrame:
+    """
+    Breakpoints (see plot_utils.segment_colors) coloring the regimes of one series: "good" where the mean
+    improved on the regime before, "bad" where it worsened, the first regime "neutral". No breakpoints if
+    there are no regimes, e.g. for a series without data.
+    """
+    if regimes.empty:
+        return pd.DataFrame({"Year": pd.Series(dtype="int64"), "Color": pd.Series(dtype=object)})
+    regimes = regimes.sort_values("Start")
+    better = np.diff(regimes["Mean"].to_numpy()) * (1 if higher_is_better else -1)
+    colors = np.r_[["neutral"], np.where(better > 0, "good", "bad")]
+    return pd.DataFrame({
+        "Year": np.r_[regimes["Start"].iloc[0], regimes["End"].to_numpy()],
+        "Color": np.r_[["neutral"], colors],
+    })
+
+
+def suggest_events(results: dict[str, pd.DataFrame], min_metrics: int = 2) -> pd.DataFrame:
+    """
+    Years in which at least `min_metrics` metrics of a country start a new regime or have an anomaly,
+    with the metrics involved. Candidates for the timeline events.
+    """
+    regimes = results["regimes"]
+    # a regime starting after the country's first year of data for the metric is a change point, unless it only
+    # starts because of missing years
+    first = regimes.groupby(["Country", "Dataset", "Metric"])["Start"].transform("min")
+    change = (regimes["Start"] > first) & ~regimes["After gap"]
+    changes = regimes.loc[change, ["Country", "Dataset", "Metric", "Start"]].rename(columns={"Start": "Year"})
+    signals = pd.concat([changes, results["anomalies"][["Country", "Dataset", "Metric", "Year"]]]).drop_duplicates()
+    signals["Metric"] = signals["Dataset"] + ": " + signals["Metric"].astype(str)
+
+    events = signals.groupby(["Country", "Year"])["Metric"].agg(["nunique", lambda metrics: sorted(set(metrics))])
+    events.columns = ["Metrics", "Which"]
+    return events[events["Metrics"] >= min_metrics].reset_index()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--country', default="Sri Lanka", help="country to print (default: Sri Lanka)")
+    parser.add_argument('--all-countries', action='store_true', help="also run over all countries of the WHR vintages")
+    args = parser.parse_args()
+
+    from data_utils import DATA_DIR, load_data, load_sl_events
+
+    data = load_data()
+    start = time.perf_counter()
+    results = detect_data(data)
+    print(f"Main page datasets: {time.perf_counter() - start:.3f} s")
+
+    if args.all_countries:
+        import happiness
+        panel = happiness.merge_vintages().drop(columns=['Source'])
+        start = time.perf_counter()
+        all_results = detect(panel, 'happiness')
+        countries = panel.index.get_level_values('Country').nunique()
+        print(f"All {countries} WHR countries: {time.perf_counter() - start:.3f} s, {len(all_results['regimes'])} regimes, {len(all_results['anomalies'])} anomalies")
+
+    with pd.option_context('display.max_rows', None, 'display.width', 200, 'display.max_colwidth', 120):
+        print(results['regimes'][results['regimes']['Country'] == args.country].to_string(index=False))
+        print(results['anomalies'][results['anomalies']['Country'] == args.country].to_string(index=False))
+
+        events = suggest_events(results)
+        known = set(load_sl_events(DATA_DIR / 'sl_events.json')) if args.country == "Sri Lanka" else set()
+        events = events[events['Country'] == args.country]
+        print(events.assign(Known=events['Year'].isin(known)).to_string(index=False))
@@ -0,0 +1,159 @@
+"""
+Declared schemas of the curated datasets in data/, enforced by data_utils.read_table and build_bundle.py.
+
+Integers get the smallest type that fits, nullable (Int16/Int32) where values are missing. Repeated text
+(Country, Reason, Source) is categorical. Floats are float32 where the charts format them to a few decimals anyway
+(the panels, coordinates); values shown unformatted in the Incidents hover labels stay float64,
+float32 would show e.g. 4.2 as 4.199999809.
+"""
+import numpy as np
+import pandas as pd
+
+
+class SchemaError(ValueError):
+    """
+    A dataset doesn't match its declared schema.
+    """
+
+
+PANEL_INDEX = {'Year': 'int16', 'Country': 'category'}
+
+# source (relative to data/) -> column -> dtype, incl. index columns
+SCHEMAS: dict[str, dict[str, str]] = {
+    'inflation/Inflation_Germany_SriLanka_2000_2023.csv': {
+        **PANEL_INDEX,
+        'Inflation Value (%)': 'float32',
+        'Reason': 'category',
+    },
+    'gdp/gdp_de_sl_V2.csv': {
+        **PANEL_INDEX,
+        'GDP (billion US$)': 'float32',
+        'Government debt (% of GDP)': 'float32',
+        'Industry (including construction), value added (% of GDP)': 'float32',
+        'Agriculture, forestry, and fishing, value added (% of GDP)': 'float32',
+        'Services, value added (% of GDP)': 'float32',
+        'Military expenditure (% of GDP)': 'float32',
+        'GDP per capita (current US$)': 'float32',
+        'GDP (billion US$) Annual Change (%)': 'float32',
+        'GDP per capita (current US$) Annual Change (%)': 'float32',
+    },
+    'happiness/happiness_de_sl.csv': {
+        **PANEL_INDEX,
+        'Happiness rank': 'Int16',
+        'Happiness score': 'float32',
+        'GDP per capita': 'float32',
+        'Social support': 'float32',
+        'Healthy life expectancy': 'float32',
+        'Freedom to make life choices': 'float32',
+        'Generosity': 'float32',
+        'Perceptions of corruption': 'float32',
+        'Dystopia + residual': 'float32',
+        'Source': 'category',
+    },
+    'tourism/tourism_de_sl.csv': {
+        **PANEL_INDEX,
+        'tourists arrived': 'int32',
+        'population': 'int32',
+    },
+    'incidents/Tourism_Sri_Lanka_2016_2019.csv': {
+        'Year': 'int16',
+        'Arrivals_in_Millions': 'float64',
+        'Revenue_in_Billions_USD': 'float64',
+    },
+    'incidents/civil_war_events_2000_2009.csv': {
+        'Year': 'int16',
+        'Event': 'str',
+        'Latitude': 'float32',
+        'Longitude': 'float32',
+        'Description': 'str',
+        'Army Casualties': 'Int32',
+        'LTTE Casualties': 'Int32',
+        'Civilian Casualties': 'Int32',
+    },
+    'incidents/covid_data.csv': {
+        'Country': 'category',
+        'Year': 'int16',
+        'Infections': 'int32',
+        'Deaths': 'int32',
+        'Economic Loss (Billion USD)': 'int32',
+    },
+    'incidents/easter_attacks_data.csv': {
+        'Location': 'str',
+        'Latitude': 'float32',
+        'Longitude': 'float32',
+        'Killed': 'int16',
+        'Injured': 'int16',
+        'Terrorists Killed': 'int16',
+    },
+    'incidents/economic_crisis_data.csv': {
+        'Year': 'int16',
+        'GDP Growth (%)': 'float64',
+        'Inflation (%)': 'float64',
+        'Debt to GDP Ratio (%)': 'float64',
+        'Unemployment Rate (%)': 'float64',
+    },
+    'incidents/financial_crisis_data.csv': {
+        'State': 'str',
+        'Latitude': 'float32',
+        'Longitude': 'float32',
+        '2008 Unemployment Rate (%)': 'float64',
+        '2008 Industrial Output Change (%)': 'float64',
+        '2009 Unemployment Rate (%)': 'float64',
+        '2009 Industrial Output Change (%)': 'float64',
+    },
+    'incidents/refugee_crisis_data.csv': {
+        'State': 'str',
+        'Latitude': 'float32',
+        'Longitude': 'float32',
+        'Refugees Accepted': 'int32',
+        'Cost (Million Euros)': 'int32',
+    },
+    'incidents/tsunami_data.csv': {
+        'District': 'str',
+        'Latitude': 'float32',
+        'Longitude': 'float32',
+        'Time': 'str',
+        'Deaths': 'int32',
+        'Damage': 'str',
+    },
+}
+
+
+def _cast(values: pd.Series, dtype: str, name: str) -> pd.Series:
+    target = pd.api.types.pandas_dtype(dtype)
+    if values.dtype == target:
+        return values
+
+    # astype wraps around silently on overflow
+    if pd.api.types.is_integer_dtype(target) and pd.api.types.is_numeric_dtype(values):
+        info = np.iinfo(target.numpy_dtype if hasattr(target, "numpy_dtype") else target)
+        out_of_range = values[(values < info.min) | (values > info.max)]
+        if not out_of_range.empty:
+            raise SchemaError(f"{name}: column '{values.name}' doesn't fit {dtype}, e.g. {out_of_range.iloc[0]} in row {out_of_range.index[0]}")
+
+    try:
+        return values.astype(target)
+    except (TypeError, ValueError) as e:
+        raise SchemaError(f"{name}: column '{values.name}' doesn't fit {dtype}: {e}") from e
+
+
+def enforce_schema(df: pd.DataFrame, schema: dict[str, str], name: str) -> pd.DataFrame:
+    """
+    Returns `df` with its columns and index levels cast to `schema`. Raises SchemaError naming `name` and
+    the missing or unexpected columns, or the column whose values don't fit the declared dtype.
+    """
+    index_names = [level for level in df.index.names if level is not None]
+    columns = [*index_names, *df.columns]
+    missing = [column for column in schema if column not in columns]
+    unexpected = [column for column in columns if column not in schema]
+    if missing or unexpected:
+        raise SchemaError(f"{name}: missing columns {missing}, unexpected columns {unexpected}")
+
+    if all(df[column].dtype == schema[column] for column in df.columns) and \
+       all(df.index.get_level_values(level).dtype == schema[level] for level in index_names):
+        return df # e.g. from the bundle, which is written with the schemas applied
+
+    if index_names:
+        df = df.reset_index()
+    df = pd.DataFrame({column: _cast(df[column], dtype, name) for column, dtype in schema.items()}, index=df.index)
+    return df.set_index(index_names) if index_names else df
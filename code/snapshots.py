@@ -0,0 +1,131 @@
+"""
+Static mode: the pages show figures exported ahead of time by export_snapshots.py instead of building them.
+
+Switched on with SL_STATIC_SNAPSHOTS=1. A snapshot is shown as an image when it was exported as SVG or PNG
+(needs kaleido), otherwise as an interactive chart read from its JSON export once per process.
+Figures without a snapshot are built as usual, and so are all figures when the snapshots are outdated:
+the manifest records the data_version() they were exported from, the content of every file the figures are
+built from plus the settings that change them.
+"""
+import hashlib
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Callable
+
+import plotly.graph_objects as go
+import plotly.io as pio
+import streamlit as st
+
+import figure_cache
+from data_utils import DATA_DIR, DATASET_PATHS, file_digest
+
+
+SNAPSHOT_DIR = DATA_DIR / 'snapshots'
+SNAPSHOT_MANIFEST = SNAPSHOT_DIR / 'manifest.json'
+
+STATIC_MODE = os.environ.get("SL_STATIC_SNAPSHOTS", "0") == "1"
+
+# settings that change the content of the figures (SL_PANEL1_ANIMATED only changes which ones are shown)
+FIGURE_SETTINGS = ["SL_COMPACT_FIGURES", "SL_PANEL1_HIGHLIGHTS", "SL_OFFLINE_MAPS"]
+
+logger = logging.getLogger(__name__)
+
+
+def figure_inputs() -> list[Path]:
+    """
+    The files the figures of both pages are built from.
+    """
+    return [
+        *DATASET_PATHS.values(),
+        DATA_DIR / 'sl_events.json',
+        DATA_DIR / 'peers' / 'trajectories.csv',
+        *sorted((DATA_DIR / 'incidents').glob('*.csv')),
+        *sorted((Path(__file__).parent / 'pages').glob('*_geo.json')),
+    ]
+
+
+# path -> (mtime_ns, size, sha256), so an unchanged file is only stat()ed
+_digests: dict[Path, tuple[int, int, str]] = {}
+
+
+def data_version() -> str:
+    """
+    Hash of the content of figure_inputs() and of the FIGURE_SETTINGS.
+    """
+    h = hashlib.sha256()
+    for path in figure_inputs():
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            h.update(f"{path.name}:missing".encode())
+            continue
+        cached = _digests.get(path)
+        if cached is None or cached[:2] != (stat.st_mtime_ns, stat.st_size):
+            cached = (stat.st_mtime_ns, stat.st_size, file_digest(path))
+            _digests[path] = cached
+        h.update(f"{path.name}:{cached[2]}".encode())
+    for variable in FIGURE_SETTINGS:
+        h.update(f"{variable}={os.environ.get(variable, '')}".encode())
+    return h.hexdigest()
+
+# mtime_ns of the manifest, parsed manifest
+_manifest: tuple[int, dict] | None = None
+
+
+def manifest() -> dict:
+    """
+    The manifest written by export_snapshots.py, {} if there is none. Re-read when it changes.
+    """
+    global _manifest
+    try:
+        mtime_ns = os.stat(SNAPSHOT_MANIFEST).st_mtime_ns
+    except FileNotFoundError:
+        return {}
+
+    if _manifest is None or _manifest[0] != mtime_ns:
+        with open(SNAPSHOT_MANIFEST, "r") as f:
+            _manifest = (mtime_ns, json.load(f))
+    return _manifest[1]
+
+
+# the outdated manifest version that was logged last
+_logged_version: str | None = None
+
+
+def snapshot_path(name: str, fmt: str) -> Path | None:
+    """
+    Path of the `fmt` export of snapshot `name`, None if it wasn't exported or the snapshots are outdated.
+    """
+    global _logged_version
+    current = manifest()
+    if current.get("version") != data_version():
+        if current and current.get("version") != _logged_version:
+            _logged_version = current.get("version")
+            logger.warning("The snapshots in %s are outdated, building the figures instead. Rerun export_snapshots.py", SNAPSHOT_DIR)
+        return None
+
+    file = current.get("figures", {}).get(name, {}).get(fmt)
+    return SNAPSHOT_DIR / file if file is not None else None
+
+
+def plotly_chart(name: str, build: Callable[[], go.Figure], **kwargs) -> None:
+    """
+    st.plotly_chart(build(), **kwargs), or in static mode the snapshot `name`.
+    """
+    if STATIC_MODE:
+        for fmt in ["svg", "png"]:
+            path = snapshot_path(name, fmt)
+            if path is not None:
+                st.image(str(path), **kwargs)
+                return
+
+        path = snapshot_path(name, "json")
+        if path is not None:
+            # the file name contains the content hash, so it is a valid cache key
+            fig = figure_cache.get_or_build(("snapshot", path.name), lambda: pio.read_json(path))
+            st.plotly_chart(fig, **kwargs)
+            return
+
+    st.plotly_chart(build(), **kwargs)
@@ -0,0 +1,126 @@
+"""
+Streaming ingestion of World Bank wide-format indicator dumps (API_*_DS2_*.csv, one row per
+country and indicator, one column per year) into the long (Year, Country) layout of
+data/gdp/gdp_de_sl_V2.csv that data_utils.load_GDP_data reads.
+
+The dumps are read in chunks and only the requested indicators and years are kept,
+so memory stays bounded by the selection, even for the all-countries bulk file.
+
+The output is the World Bank's current vintage, not the curated one: Sri Lanka's GDP per capita is up to 311 US$
+higher from 2010 on, and the annual changes are computed from unrounded values, see "GDP Data" in the README.
+
+Usage: python code/worldbank.py data/gdp/API_DEU_DS2_en_csv_v2_15903.csv data/gdp/API_LKA_DS2_en_csv_v2_21470.csv --out gdp.csv
+"""
+import argparse
+import csv
+from os import PathLike
+from pathlib import Path
+from typing import Iterable
+
+import pandas as pd
+
+from data_utils import previous_year
+
+
+# indicator code -> (column name in gdp_de_sl_V2.csv, scale)
+GDP_INDICATORS: dict[str, tuple[str, float]] = {
+    'NY.GDP.MKTP.CD': ('GDP (billion US$)', 1e-9),
+    'GC.DOD.TOTL.GD.ZS': ('Government debt (% of GDP)', 1),
+    'NV.IND.TOTL.ZS': ('Industry (including construction), value added (% of GDP)', 1),
+    'NV.AGR.TOTL.ZS': ('Agriculture, forestry, and fishing, value added (% of GDP)', 1),
+    'NV.SRV.TOTL.ZS': ('Services, value added (% of GDP)', 1),
+    'MS.MIL.XPND.GD.ZS': ('Military expenditure (% of GDP)', 1),
+    'NY.GDP.PCAP.CD': ('GDP per capita (current US$)', 1),
+}
+
+# columns that get an additional "<column> Annual Change (%)"
+GDP_ANNUAL_CHANGES = ['GDP (billion US$)', 'GDP per capita (current US$)']
+
+
+def _header(path: str | PathLike[str]) -> tuple[int, list[str]]:
+    """
+    Returns the line number and the columns of the header. Bulk downloads start with a few metadata
+    lines ("Data Source", "Last Updated Date"), the per-country API files don't.
+    """
+    with open(path, "r", encoding="utf-8-sig", newline="") as f:
+        for line_number, row in enumerate(csv.reader(f)):
+            if row and row[0] == "Country Name":
+                return line_number, row
+    raise ValueError(f"{path} is not a World Bank indicator file, no 'Country Name' header found")
+
+
+def read_indicators(
+    paths: Iterable[str | PathLike[str]],
+    indicators: dict[str, tuple[str, float]],
+    years: range,
+    countries: Iterable[str] | None = None,
+    chunksize: int = 2000
+) -> pd.DataFrame:
+    """
+    Reads `indicators` (code -> (column, scale)) for `years` from World Bank dumps into a frame indexed
+    by (Year, Country) with one column per indicator. `countries` filters by country name.
+    """
+    countries = set(countries) if countries is not None else None
+    parts = []
+
+    for path in paths:
+        skiprows, columns = _header(path)
+        year_columns = [str(year) for year in years if str(year) in columns]
+
+        chunks = pd.read_csv(
+            path,
+            skiprows=skiprows,
+            usecols=["Country Name", "Indicator Code", *year_columns],
+            dtype={year: "float64" for year in year_columns},
+            encoding="utf-8-sig",
+            chunksize=chunksize,
+        )
+        for chunk in chunks:
+            chunk = chunk[chunk["Indicator Code"].isin(indicators.keys())]
+            if countries is not None:
+                chunk = chunk[chunk["Country Name"].isin(countries)]
+            if not chunk.empty:
+                parts.append(chunk.melt(id_vars=["Country Name", "Indicator Code"], var_name="Year"))
+
+    columns = [column for column, _ in indicators.values()]
+    if not parts:
+        return pd.DataFrame(columns=columns, index=pd.MultiIndex.from_arrays([[], []], names=["Year", "Country"]))
+
+    long = pd.concat(parts, ignore_index=True)
+    long["Year"] = long["Year"].astype("int64")
+    long["value"] *= long["Indicator Code"].map({code: scale for code, (_, scale) in indicators.items()})
+    long["Indicator Code"] = long["Indicator Code"].map({code: column for code, (column, _) in indicators.items()})
+
+    df = long.pivot_table(index=["Year", "Country Name"], columns="Indicator Code", values="value", dropna=False)
+    df.index.names = ["Year", "Country"]
+    df.columns.name = None
+    return df.reindex(columns=columns).sort_index()
+
+
+def read_GDP_data(
+    paths: Iterable[str | PathLike[str]],
+    years: range,
+    countries: Iterable[str] | None = None
+) -> pd.DataFrame:
+    """
+    The GDP dataset in the layout of gdp_de_sl_V2.csv, including the annual changes.
+    """
+    # one extra year, so the first annual change isn't NaN
+    df = read_indicators(paths, GDP_INDICATORS, range(years.start - 1, years.stop), countries)
+    for column in GDP_ANNUAL_CHANGES:
+        df[f"{column} Annual Change (%)"] = (df[column] / previous_year(df[column]) - 1) * 100
+    return df[df.index.get_level_values("Year") >= years.start]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('paths', nargs='+', type=Path, help="World Bank API_*_DS2_*.csv files")
+    parser.add_argument('--out', type=Path, required=True, help="output CSV")
+    parser.add_argument('--start', type=int, default=2000, help="first year (default: 2000)")
+    parser.add_argument('--end', type=int, default=2023, help="last year (default: 2023)")
+    parser.add_argument('--country', action='append', help="country name to keep, repeatable (default: all)")
+    args = parser.parse_args()
+
+    df = read_GDP_data(args.paths, range(args.start, args.end + 1), args.country)
+    df.to_csv(args.out)
+    print(f"Wrote {len(df)} rows to {args.out}")
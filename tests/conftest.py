@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# the app's modules import each other as top-level modules, like `streamlit run code/Sri_Lankas_Journey.py` does
+sys.path.insert(0, str(Path(__file__).parent.parent / 'code'))
@@ -0,0 +1,57 @@
+"""
+Rendering must not modify the cached data it is given, the frames are shared by all sessions.
+"""
+import pandas as pd
+
+import data_utils
+import figure_cache
+import plot_utils
+from data_utils import DATA_DIR, DATASET_LOADERS, DATASET_PATHS, data_fingerprint, load_dataset, load_panel, load_sl_events
+
+
+def fingerprints() -> dict[str, str]:
+    """
+    Fingerprints of the frames the loaders return, and of the cached values behind them.
+    """
+    result = {}
+    for dataset, path in DATASET_PATHS.items():
+        result[dataset] = data_fingerprint(load_dataset(dataset, path))
+        result[f"{dataset} panel"] = data_fingerprint({dataset: load_panel(path, dataset).frame})
+    with data_utils._cache_lock:
+        entries = dict(data_utils._cache)
+    for key, (*_, values) in entries.items():
+        frames = {str(name): value.frame if isinstance(value, data_utils.CountryPanel) else value for name, value in values.items()}
+        result[str(key)] = data_fingerprint(frames)
+    return result
+
+
+def test_rendering_leaves_cached_inputs_unchanged():
+    data_utils.clear_cache()
+    figure_cache.clear()
+    data = {dataset: load_dataset(dataset, DATASET_PATHS[dataset]) for dataset in DATASET_LOADERS}
+    sl_events = load_sl_events(DATA_DIR / 'sl_events.json')
+    before = fingerprints()
+    given = {dataset: data_fingerprint(frames) for dataset, frames in data.items()}
+
+    # every panel figure: panel 1 for all years and animated, panel 2
+    figures = [
+        *plot_utils.panel1_figures(data).values(),
+        plot_utils.build_panel1_animation(data, sl_events),
+        *plot_utils.panel2_figures(data).values(),
+    ]
+    for builder in [plot_utils.plot_inflation_data, plot_utils.plot_GDP_data, plot_utils.plot_happiness_data, plot_utils.plot_tourism_data]:
+        figures.append(builder(data[builder.__name__.removeprefix('plot_').removesuffix('_data')]))
+    assert len(figures) > len(DATASET_LOADERS)
+
+    assert {dataset: data_fingerprint(frames) for dataset, frames in data.items()} == given
+    misses = data_utils.cache_stats()["misses"]
+    assert fingerprints() == before
+    # the second fingerprints came from the cache, not from parsing the files again
+    assert data_utils.cache_stats()["misses"] == misses
+
+
+def test_derived_metrics_are_precomputed():
+    tourism = load_dataset('tourism', DATASET_PATHS['tourism'])['sl']
+    pd.testing.assert_series_equal(
+        tourism['tourists_per_capita'], tourism['tourists arrived'] / tourism['population'], check_names=False
+    )
@@ -0,0 +1,90 @@
+"""
+The process-wide cache of parsed files and the year-indexed event store, see data_utils.py.
+"""
+import os
+
+import pandas as pd
+import pytest
+
+import data_utils
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    data_utils.clear_cache()
+    yield
+    data_utils.clear_cache()
+
+
+@pytest.fixture
+def events(tmp_path):
+    path = tmp_path / 'events.csv'
+    path.write_text('Year,Event,Deaths\n2001,b,2\n2000,a,1\n2001,c,3\n2003,d,4\n')
+    return path
+
+
+def counting_loader(calls: list):
+    def read(p):
+        calls.append(p)
+        return {'df': pd.read_csv(p)}
+    return read
+
+
+def test_unchanged_file_is_parsed_once(events):
+    calls = []
+    loader = counting_loader(calls)
+    data_utils._load_cached(events, loader)
+    data_utils._load_cached(events, loader)
+
+    assert len(calls) == 1
+    assert data_utils.cache_stats() == {'hits': 1, 'misses': 1, 'entries': 1}
+
+
+def test_touched_file_is_rehashed_not_reparsed(events):
+    calls = []
+    loader = counting_loader(calls)
+    data_utils._load_cached(events, loader)
+    stat = os.stat(events)
+    os.utime(events, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+    data_utils._load_cached(events, loader)
+    assert len(calls) == 1
+
+
+def test_rewritten_file_is_reparsed(events):
+    calls = []
+    loader = counting_loader(calls)
+    data_utils._load_cached(events, loader)
+    stat = os.stat(events)
+
+    # same size and mtime: still cached, the check is on the stat only
+    events.write_text(events.read_text().replace('2003,d,4', '2003,e,4'))
+    os.utime(events, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    assert data_utils._load_cached(events, loader)['df']['Event'].iloc[-1] == 'd'
+
+    # another size
+    events.write_text(events.read_text() + '2004,f,5\n')
+    os.utime(events, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    assert data_utils._load_cached(events, loader)['df']['Event'].iloc[-1] == 'f'
+
+    # same size, another mtime
+    events.write_text(events.read_text().replace('2004,f,5', '2004,g,5'))
+    os.utime(events, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert data_utils._load_cached(events, loader)['df']['Event'].iloc[-1] == 'g'
+    assert len(calls) == 3
+
+
+def test_writes_by_the_caller_do_not_reach_the_cache(events):
+    loader = counting_loader([])
+    df = data_utils._load_cached(events, loader)['df']
+    df.loc[0, 'Event'] = 'changed'
+    assert data_utils._load_cached(events, loader)['df'].loc[0, 'Event'] == 'b'
+
+
+def test_events_by_year(events):
+    by_year = data_utils.load_events_by_year(events)
+
+    assert list(by_year) == [2000, 2001, 2003]
+    assert list(by_year[2001]['Event']) == ['b', 'c'] # file order within a year
+    assert by_year[2001]['Deaths'].dtype == 'int64'
+    assert 2002 not in by_year
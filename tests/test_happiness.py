@@ -0,0 +1,58 @@
+"""
+Merging the World Happiness Report vintages, see happiness.py.
+"""
+import json
+
+import pandas as pd
+import pytest
+
+import happiness
+
+
+@pytest.fixture(scope='module')
+def merged() -> pd.DataFrame:
+    return happiness.merge_vintages()
+
+
+def test_country_names_are_harmonized(merged):
+    countries = set(merged.index.get_level_values('Country'))
+    assert not any(country.endswith('*') for country in countries)
+    for old, new in {**happiness.COUNTRY_NAMES, 'Congo': 'Congo (Brazzaville)'}.items():
+        assert old not in countries
+        assert new in countries
+
+
+@pytest.mark.parametrize('country, year', [
+    ('Czechia', 2015), # "Czech Republic" in the 2015-2021 reports
+    ('Türkiye', 2022), # "Turkey" in the reports until 2022, "Turkiye" from 2023
+    ('Hong Kong S.A.R. of China', 2017), # "Hong Kong S.A.R., China" in 2017, "Hong Kong" in 2015, 2016, 2018, 2019
+    ('Taiwan Province of China', 2018),
+    ('Luxembourg', 2022), # "Luxembourg*" in 2022
+    ('Botswana', 2022),
+])
+def test_one_row_per_year_and_country(merged, country, year):
+    assert merged.index.is_unique
+    rows = merged.xs(country, level='Country')
+    assert year in rows.index
+    assert rows.index.is_unique
+
+
+def test_derived_residuals_are_rounded(merged):
+    derived = merged[merged['Source'].isin(['2018.csv', '2019.csv'])]['Dystopia + residual']
+    pd.testing.assert_series_equal(derived, derived.round(happiness.DECIMALS))
+
+
+def test_write_merged_reads_the_given_inputs(tmp_path):
+    # the two panels, so the output only has the years before the reports
+    files = ['World Happiness Report 2008-2024.csv', 'world-happiness-report_2008_2020.csv']
+    for file in files:
+        (tmp_path / file).write_bytes((happiness.HAPPINESS_DIR / file).read_bytes())
+
+    out = tmp_path / 'merged.csv'
+    df = happiness.write_merged(out, ['Sri Lanka'], [tmp_path / file for file in files])
+
+    assert set(df['Source']) <= set(files)
+    assert df.index.get_level_values('Year').max() <= 2014
+    assert list(tmp_path.glob('*.tmp')) == []
+    with open(out.with_name(out.name + '.version.json')) as f:
+        assert set(json.load(f)['sources']) == set(files)
@@ -0,0 +1,73 @@
+"""
+Responsive variants of the intro pictures, see images.py.
+"""
+import hashlib
+
+import numpy as np
+import pytest
+from PIL import Image
+
+import images
+
+
+@pytest.fixture
+def pictures(tmp_path):
+    """
+    A picture wider than every width in images.WIDTHS and one narrower than all but the first.
+    """
+    paths = []
+    for name, (width, height) in {'wide.jpg': (1200, 120), 'narrow.png': (500, 50)}.items():
+        path = tmp_path / name
+        # a gradient, quick to encode
+        gradient = np.linspace(0, 255, width * height * 3).reshape(height, width, 3).astype(np.uint8)
+        Image.fromarray(gradient).save(path)
+        paths.append(path)
+    return paths
+
+
+def test_variant_widths_and_names(pictures, tmp_path):
+    out_dir = tmp_path / 'variants'
+    entries = images.build_variants(pictures, out_dir)
+
+    assert entries['wide.jpg']['width'] == 1200 and entries['wide.jpg']['height'] == 120
+    for name, widths in {'wide.jpg': [320, 640, 960, 1200], 'narrow.png': [320, 500]}.items():
+        stem = name.split('.')[0]
+        assert set(entries[name]['variants']) == set(images.FORMATS)
+        for fmt, variants in entries[name]['variants'].items():
+            assert [variant['width'] for variant in variants] == widths
+            for variant in variants:
+                content = (out_dir / variant['file']).read_bytes()
+                assert variant['file'] == f"{stem}-{variant['width']}w-{hashlib.sha256(content).hexdigest()[:16]}.{fmt}"
+                assert variant['bytes'] == len(content)
+                with Image.open(out_dir / variant['file']) as image:
+                    assert image.format == fmt.upper()
+                    assert image.width == variant['width']
+                    assert image.height == round(entries[name]['height'] * variant['width'] / entries[name]['width'])
+
+    assert list(out_dir.glob('*.tmp')) == []
+
+
+def test_rebuild_keeps_the_names_and_removes_stale_variants(pictures, tmp_path):
+    out_dir = tmp_path / 'variants'
+    images.build_variants(pictures, out_dir)
+    before = sorted(path.name for path in out_dir.iterdir())
+
+    images.build_variants(pictures, out_dir)
+    assert sorted(path.name for path in out_dir.iterdir()) == before
+
+    entries = images.build_variants(pictures[:1], out_dir)
+    files = {variant['file'] for variants in entries['wide.jpg']['variants'].values() for variant in variants}
+    assert {path.name for path in out_dir.iterdir()} == files | {'manifest.json'}
+
+
+def test_picture_html(pictures, tmp_path):
+    entry = images.build_variants(pictures, tmp_path / 'variants')['narrow.png']
+    markup = images.picture_html(entry, 'A <narrow> picture')
+
+    assert markup.count('<source ') == len(images.FORMATS) - 1
+    jpegs = entry['variants']['jpeg']
+    assert f'src="{images.VARIANT_URL}{jpegs[0]["file"]}"' in markup
+    assert f'srcset="{images.VARIANT_URL}{jpegs[0]["file"]} 320w, {images.VARIANT_URL}{jpegs[1]["file"]} 500w"' in markup
+    assert 'width="500" height="50"' in markup
+    assert 'alt="A &lt;narrow&gt; picture"' in markup and 'loading="lazy"' in markup
+    assert 'loading="eager"' in images.picture_html(entry, 'eager', eager=True)
@@ -0,0 +1,81 @@
+"""
+The peer index and its top-k queries, see peers.py.
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+import peers
+
+
+def trajectories(values: dict[str, float | None]) -> pd.DataFrame:
+    """
+    A trajectories frame where every metric of a country is `values[country]` in every year, None for no data.
+    """
+    index = pd.MultiIndex.from_product([peers.YEARS, list(values)], names=['Year', 'Country'])
+    column = [values[country] for _, country in index]
+    frame = pd.DataFrame({metric: column for metric in peers.METRICS}, index=index, dtype='float64')
+    # positive, so the log-scaled metrics are defined and keep the spacing of the levels
+    for metric, how in peers.METRICS.items():
+        if how == 'log level':
+            frame[metric] = np.exp(frame[metric])
+    return frame
+
+
+def test_distance_of_a_pair():
+    df = trajectories({'A': 0.0, 'B': 1.0, 'C': 3.0})
+    idx = peers.build_index(df)
+
+    normalized = peers.normalize(df)
+    a, b = normalized.xs('A', level='Country'), normalized.xs('B', level='Country')
+    expected = np.sqrt(((a - b) ** 2).to_numpy().mean())
+
+    i, j = list(idx['countries']).index('A'), list(idx['countries']).index('B')
+    assert idx['distances'][i, j] == pytest.approx(expected)
+    assert idx['distances'][j, i] == pytest.approx(expected)
+    assert idx['overlap'][i, j] == len(peers.METRICS) * len(peers.YEARS)
+
+
+def test_countries_sharing_too_few_entries_are_not_compared():
+    df = trajectories({'A': 0.0, 'B': 1.0, 'C': 2.0})
+    # C only has data for its first year
+    df.loc[df.index.get_level_values('Country') == 'C'] = np.nan
+    df.loc[(peers.YEARS[0], 'C')] = 2.0
+    idx = peers.build_index(df)
+
+    c = list(idx['countries']).index('C')
+    assert idx['overlap'][c].max() == len(peers.METRICS) < peers.MIN_OVERLAP
+    assert np.isinf(np.delete(idx['distances'][c], c)).all()
+    assert np.isfinite(peers.build_index(df, min_overlap=1)['distances'][c, list(idx['countries']).index('A')])
+
+
+def test_a_country_is_not_its_own_peer():
+    idx = peers.build_index(trajectories({'A': 0.0, 'B': 1.0}))
+    assert np.isinf(np.diag(idx['distances'])).all()
+
+
+@pytest.fixture
+def idx() -> dict:
+    distances = np.array([
+        [np.inf, 3.0, 1.0, 2.0, np.inf],
+        [3.0, np.inf, 1.0, 1.0, np.inf],
+        [1.0, 1.0, np.inf, 1.0, np.inf],
+        [2.0, 1.0, 1.0, np.inf, np.inf],
+        [np.inf, np.inf, np.inf, np.inf, np.inf],
+    ])
+    return {'countries': np.array(['A', 'B', 'C', 'D', 'E']), 'distances': distances, 'overlap': np.full((5, 5), 30)}
+
+
+def test_top_k_is_ordered_by_distance(idx):
+    assert list(peers.top_k('A', 2, idx)['Country']) == ['C', 'D']
+    assert list(peers.top_k('A', 3, idx)['Distance']) == [1.0, 2.0, 3.0]
+
+
+def test_top_k_returns_only_comparable_countries(idx):
+    assert list(peers.top_k('A', 10, idx)['Country']) == ['C', 'D', 'B']
+    assert peers.top_k('E', 3, idx).empty
+
+
+def test_top_k_of_an_unknown_country_raises(idx):
+    with pytest.raises(KeyError):
+        peers.top_k('Atlantis', 3, idx)
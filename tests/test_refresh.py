@@ -0,0 +1,96 @@
+"""
+Refreshing against a local stand-in for the upstreams (refresh.serve_data), on a copy of data/.
+"""
+import asyncio
+import shutil
+
+import pytest
+
+import build_bundle
+import build_data
+import data_utils
+import refresh
+from data_utils import DATA_DIR, read_table
+
+
+INFLATION = 'inflation/Inflation_Germany_SriLanka_2000_2023.csv'
+UPSTREAM = {'fred_inflation_sl': refresh.UPSTREAMS['fred_inflation_sl']}
+FILE = UPSTREAM['fred_inflation_sl']['file']
+
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    """
+    A copy of data/ the modules read and write instead of data/.
+    """
+    copy = tmp_path / 'data'
+    shutil.copytree(DATA_DIR, copy, ignore=shutil.ignore_patterns('snapshots', 'bundle', '.build_state.json'))
+    for module in (data_utils, build_data, build_bundle, refresh):
+        monkeypatch.setattr(module, 'DATA_DIR', copy)
+    monkeypatch.setattr(data_utils, 'BUNDLE_DIR', copy / 'bundle')
+    monkeypatch.setattr(data_utils, 'BUNDLE_MANIFEST', copy / 'bundle' / 'manifest.json')
+    monkeypatch.setattr(build_data, 'BUILD_STATE', copy / '.build_state.json')
+    build_data.build(build_data.dependents([FILE]))
+    return copy
+
+
+@pytest.fixture
+def upstream(tmp_path):
+    """
+    The stand-in's directory, a copy of the upstream files.
+    """
+    directory = tmp_path / 'upstream'
+    (directory / FILE).parent.mkdir(parents=True)
+    shutil.copy(DATA_DIR / FILE, directory / FILE)
+    return directory
+
+
+def run_refresh(directory, dry_run=False) -> dict[str, str]:
+    with refresh.serve_data(0, directory) as url:
+        return asyncio.run(refresh.refresh(UPSTREAM, url, dry_run))
+
+
+def sri_lanka_2023(data_dir) -> float:
+    df = read_table(data_dir / INFLATION, [0, 1])
+    return df.loc[(2023, 'Sri Lanka'), 'Inflation Value (%)']
+
+
+def test_unchanged_upstream_rebuilds_nothing(data_dir, upstream):
+    assert run_refresh(upstream) == {'fred_inflation_sl': 'unchanged'}
+
+
+def test_changed_upstream_is_swapped_in_and_rebuilt(data_dir, upstream):
+    content = (upstream / FILE).read_text().replace('2023-01-01,16.541174227983198', '2023-01-01,17.541174227983198')
+    (upstream / FILE).write_text(content)
+
+    dry_run = run_refresh(upstream, dry_run=True)
+    assert dry_run['fred_inflation_sl'] == 'would update (+1/-1 lines)'
+    assert dry_run[INFLATION] == 'would rebuild'
+    assert (data_dir / FILE).read_bytes() == (DATA_DIR / FILE).read_bytes()
+
+    results = run_refresh(upstream)
+    assert results['fred_inflation_sl'] == 'updated (+1/-1 lines)'
+    assert (data_dir / FILE).read_text() == content
+    assert list(data_dir.rglob('*.tmp')) == []
+    assert results[INFLATION].startswith('built')
+    assert results[f'bundle {INFLATION}'] == '+0/-0/~1 rows'
+    assert sri_lanka_2023(data_dir) == pytest.approx(17.541)
+
+
+def test_failed_rebuild_puts_the_old_file_back(data_dir, upstream):
+    (upstream / FILE).write_text('observation_date,OTHER_SERIES\n2000-01-01,1\n')
+    before = sri_lanka_2023(data_dir)
+
+    with pytest.raises(KeyError):
+        run_refresh(upstream)
+    assert (data_dir / FILE).read_bytes() == (DATA_DIR / FILE).read_bytes()
+    assert sri_lanka_2023(data_dir) == before
+
+
+def test_failed_download_leaves_the_file_untouched(data_dir, upstream):
+    (upstream / FILE).unlink()
+
+    results = run_refresh(upstream)
+    assert list(results) == ['fred_inflation_sl'] # nothing rebuilt
+    assert results['fred_inflation_sl'].startswith('failed') and 'HTTP 404' in results['fred_inflation_sl']
+    assert (data_dir / FILE).read_bytes() == (DATA_DIR / FILE).read_bytes()
@@ -0,0 +1,49 @@
+"""
+Change points and regimes, see regimes.py.
+"""
+import numpy as np
+import pandas as pd
+
+import regimes
+
+
+def noise(years: int) -> np.ndarray:
+    # deterministic and irregular, so its level estimated from the year-to-year differences is not zero
+    return 0.1 * np.sin(2.0 * np.arange(years))
+
+
+def step_series(level_change: float = 5.0, years: int = 20, step_at: int = 10) -> np.ndarray:
+    return np.where(np.arange(years) < step_at, 0.0, level_change) + noise(years)
+
+
+def test_segment_finds_the_step():
+    values = np.vstack([step_series(), step_series(level_change=0)])
+    change_points = regimes.segment(values)
+
+    assert list(np.flatnonzero(change_points[0])) == [10]
+    assert not change_points[1].any()
+
+
+def test_detect_splits_regimes_at_gaps():
+    years = range(2000, 2020)
+    values = 1.0 + noise(len(years))
+    values[8:11] = np.nan # 2008-2010 missing, same level on both sides
+    df = pd.DataFrame({'Value': values}, index=pd.MultiIndex.from_product([years, ['A']], names=['Year', 'Country']))
+
+    found = regimes.detect(df, 'test')['regimes']
+
+    assert list(zip(found['Start'], found['End'], found['After gap'])) == [(2000, 2007, False), (2011, 2019, True)]
+
+
+def test_regime_breakpoints():
+    found = pd.DataFrame({'Start': [2000, 2010], 'End': [2009, 2019], 'Mean': [1.0, 2.0]})
+    breakpoints = regimes.regime_breakpoints(found)
+    assert list(breakpoints['Year']) == [2000, 2009, 2019]
+    assert list(breakpoints['Color']) == ['neutral', 'neutral', 'good']
+    assert list(regimes.regime_breakpoints(found, higher_is_better=False)['Color']) == ['neutral', 'neutral', 'bad']
+
+
+def test_no_regimes_no_breakpoints():
+    breakpoints = regimes.regime_breakpoints(pd.DataFrame(columns=['Start', 'End', 'Mean']))
+    assert breakpoints.empty
+    assert list(breakpoints.columns) == ['Year', 'Color']
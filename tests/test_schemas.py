@@ -0,0 +1,93 @@
+"""
+Declared schemas and the bundle compiled with them, see schemas.py and build_bundle.py.
+"""
+import shutil
+
+import pandas as pd
+import pytest
+
+import build_bundle
+import data_utils
+from data_utils import DATA_DIR, read_table
+from schemas import SCHEMAS, SchemaError, enforce_schema
+
+
+SCHEMA = {'Year': 'int16', 'Country': 'category', 'Deaths': 'Int32'}
+
+
+def test_values_are_cast():
+    df = enforce_schema(pd.DataFrame({'Year': [2000, 2001], 'Country': ['A', 'B'], 'Deaths': [1, None]}), SCHEMA, 't')
+    assert dict(df.dtypes.astype(str)) == {'Year': 'int16', 'Country': 'category', 'Deaths': 'Int32'}
+    assert df['Deaths'].isna().tolist() == [False, True]
+
+
+def test_index_levels_are_cast():
+    df = pd.DataFrame({'Year': [2000], 'Country': ['A'], 'Deaths': [1]}).set_index(['Year', 'Country'])
+    df = enforce_schema(df, SCHEMA, 't')
+    assert list(df.index.names) == ['Year', 'Country']
+    assert df.index.get_level_values('Year').dtype == 'int16'
+
+
+def test_overflow_raises():
+    df = pd.DataFrame({'Year': [2000, 40000], 'Country': ['A', 'B'], 'Deaths': [1, 2]})
+    with pytest.raises(SchemaError, match="'Year' doesn't fit int16, e.g. 40000 in row 1"):
+        enforce_schema(df, SCHEMA, 't')
+
+
+def test_missing_column_raises():
+    df = pd.DataFrame({'Year': [2000], 'Country': ['A']})
+    with pytest.raises(SchemaError, match=r"t: missing columns \['Deaths'\], unexpected columns \[\]"):
+        enforce_schema(df, SCHEMA, 't')
+
+
+def test_unexpected_column_raises():
+    df = pd.DataFrame({'Year': [2000], 'Country': ['A'], 'Deaths': [1], 'Injured': [2]})
+    with pytest.raises(SchemaError, match=r"unexpected columns \['Injured'\]"):
+        enforce_schema(df, SCHEMA, 't')
+
+
+def test_unparseable_values_raise():
+    df = pd.DataFrame({'Year': [2000], 'Country': ['A'], 'Deaths': ['many']})
+    with pytest.raises(SchemaError, match="'Deaths' doesn't fit Int32"):
+        enforce_schema(df, SCHEMA, 't')
+
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    """
+    A copy of data/ without a bundle, which the modules read and write instead of data/.
+    """
+    copy = tmp_path / 'data'
+    shutil.copytree(DATA_DIR, copy, ignore=shutil.ignore_patterns('snapshots', 'bundle', '.build_state.json'))
+    for module in (data_utils, build_bundle):
+        monkeypatch.setattr(module, 'DATA_DIR', copy)
+    monkeypatch.setattr(data_utils, 'BUNDLE_DIR', copy / 'bundle')
+    monkeypatch.setattr(data_utils, 'BUNDLE_MANIFEST', copy / 'bundle' / 'manifest.json')
+    return copy
+
+
+@pytest.mark.parametrize('source', build_bundle.SOURCES)
+def test_bundle_equals_the_csv(data_dir, source):
+    index_col = build_bundle.SOURCES[source]
+    from_csv = read_table(data_dir / source, index_col)
+    assert data_utils._bundle_entry(data_dir / source) is None
+
+    manifest = build_bundle.build_bundle(data_dir / 'bundle')
+    assert data_utils._bundle_entry(data_dir / source) == manifest['tables'][source]
+    from_bundle = read_table(data_dir / source, index_col)
+
+    expected = from_csv.sort_index() if index_col is not None else from_csv
+    pd.testing.assert_frame_equal(from_bundle, expected)
+    assert dict(from_bundle.dtypes.astype(str)) == {
+        column: dtype for column, dtype in SCHEMAS[source].items() if column in from_bundle.columns
+    }
+
+
+def test_changed_csv_is_read_instead_of_the_bundle(data_dir):
+    source = 'incidents/covid_data.csv'
+    build_bundle.build_bundle(data_dir / 'bundle')
+    path = data_dir / source
+    path.write_text(path.read_text().replace('Sri Lanka', 'Sri  Lanka'))
+
+    assert data_utils._bundle_entry(path) is None
+    assert 'Sri  Lanka' in set(read_table(path)['Country'])
@@ -0,0 +1,62 @@
+"""
+Coloring the panel 1 timeline by breakpoints, see segment_colors, yoy_breakpoints and color_traces in plot_utils.py.
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+import plot_utils
+
+
+def breakpoints(*rows: tuple[int, str]) -> pd.DataFrame:
+    return pd.DataFrame(rows, columns=['Year', 'Color'])
+
+
+def test_a_year_gets_the_color_of_the_next_breakpoint():
+    colors = plot_utils.segment_colors(
+        np.arange(2000, 2012), breakpoints((2000, 'neutral'), (2004, 'bad'), (2008, 'good'), (2010, 'neutral'))
+    )
+    assert list(colors) == ['bad'] * 5 + ['good'] * 4 + ['neutral'] * 3
+
+
+@pytest.mark.parametrize('metric', plot_utils.PANEL1_BREAKPOINTS['Metric'].unique())
+def test_curated_segments_keep_their_colors(metric):
+    rows = plot_utils.PANEL1_BREAKPOINTS[plot_utils.PANEL1_BREAKPOINTS['Metric'] == metric]
+    years = np.arange(2001, 2025)
+    colors = plot_utils.segment_colors(years, rows)
+    # every line into a year of (start, end] has the color of the segment ending at `end`
+    for start, end, color in zip(rows['Year'], rows['Year'][1:], rows['Color'][1:]):
+        assert (colors[(years > start) & (years <= end)] == color).all()
+
+
+def test_without_breakpoints_everything_is_neutral():
+    colors = plot_utils.segment_colors(np.arange(2000, 2005), breakpoints())
+    assert list(colors) == ['neutral'] * 5
+
+
+def test_yoy_breakpoints():
+    change = pd.Series([np.nan, 1.0, 6.0, 7.0, -8.0, np.nan, 0.0], index=range(2000, 2007))
+
+    found = plot_utils.yoy_breakpoints(change, 5)
+    assert list(zip(found['Year'], found['Color'])) == [
+        (2000, 'neutral'), (2001, 'neutral'), (2003, 'good'), (2004, 'bad'), (2006, 'neutral')
+    ]
+    colors = plot_utils.segment_colors(np.arange(2001, 2007), found)
+    assert list(colors) == ['neutral', 'good', 'good', 'bad', 'neutral', 'neutral']
+
+    inverted = plot_utils.yoy_breakpoints(change, 5, higher_is_better=False)
+    assert list(inverted['Color']) == ['neutral', 'neutral', 'bad', 'good', 'neutral']
+
+
+def test_one_trace_per_color_with_gaps_between_runs():
+    values = np.array([1.0, 2.0, 3.0, 4.0, 5.0])
+    dates = np.array(['2000', '2001', '2002', '2003', '2004'], dtype=object)
+    colors = np.array(['neutral', 'good', 'bad', 'good', 'good'], dtype=object)
+
+    traces = plot_utils.color_traces(values, dates, colors, ['good', 'bad', 'neutral'])
+
+    x, y = traces['good']
+    np.testing.assert_array_equal(x, [1.0, 2.0, np.nan, 3.0, 4.0, 5.0])
+    assert list(y[[0, 1, 3, 4, 5]]) == ['2000', '2001', '2002', '2003', '2004']
+    np.testing.assert_array_equal(traces['bad'][0], [2.0, 3.0])
+    assert len(traces['neutral'][0]) == 0
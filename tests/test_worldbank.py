@@ -0,0 +1,77 @@
+"""
+Streaming ingestion of World Bank indicator dumps, see worldbank.py.
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+import worldbank
+from data_utils import DATA_DIR
+
+
+DUMPS = [DATA_DIR / 'gdp/API_DEU_DS2_en_csv_v2_15903.csv', DATA_DIR / 'gdp/API_LKA_DS2_en_csv_v2_21470.csv']
+INDICATORS = {'NY.GDP.MKTP.CD': ('GDP (billion US$)', 1e-9), 'NY.GDP.PCAP.CD': ('GDP per capita', 1)}
+
+
+@pytest.fixture
+def bulk(tmp_path):
+    """
+    A bulk download: metadata lines before the header, several countries and indicators.
+    """
+    path = tmp_path / 'API_bulk.csv'
+    path.write_text(
+        '\ufeff"Data Source","World Development Indicators",\n'
+        '\n'
+        '"Last Updated Date","2024-06-28",\n'
+        '\n'
+        '"Country Name","Country Code","Indicator Name","Indicator Code","2000","2001","2002",\n'
+        '"Aruba","ABW","GDP (current US$)","NY.GDP.MKTP.CD","1000000000","2000000000","",\n'
+        '"Aruba","ABW","Population, total","SP.POP.TOTL","90000","91000","92000",\n'
+        '"Sri Lanka","LKA","GDP (current US$)","NY.GDP.MKTP.CD","16000000000","15000000000","16500000000",\n'
+        '"Sri Lanka","LKA","GDP per capita (current US$)","NY.GDP.PCAP.CD","800","750","825",\n',
+        encoding='utf-8',
+    )
+    return path
+
+
+def test_bulk_download_is_read_past_its_metadata(bulk):
+    df = worldbank.read_indicators([bulk], INDICATORS, range(2000, 2003))
+
+    assert list(df.columns) == ['GDP (billion US$)', 'GDP per capita']
+    assert list(df.index.names) == ['Year', 'Country']
+    assert df.loc[(2001, 'Sri Lanka'), 'GDP (billion US$)'] == pytest.approx(15.0)
+    assert df.loc[(2002, 'Sri Lanka'), 'GDP per capita'] == 825
+    assert np.isnan(df.loc[(2002, 'Aruba'), 'GDP (billion US$)'])
+    assert np.isnan(df.loc[(2000, 'Aruba'), 'GDP per capita'])
+
+
+def test_countries_and_years_are_filtered(bulk):
+    df = worldbank.read_indicators([bulk], INDICATORS, range(2001, 2010), countries=['Sri Lanka'])
+    assert list(df.index) == [(2001, 'Sri Lanka'), (2002, 'Sri Lanka')]
+
+
+def test_nothing_selected_is_an_empty_frame(bulk):
+    df = worldbank.read_indicators([bulk], INDICATORS, range(2000, 2003), countries=['Atlantis'])
+    assert df.empty
+    assert list(df.columns) == ['GDP (billion US$)', 'GDP per capita']
+
+
+def test_not_an_indicator_file_raises(tmp_path):
+    path = tmp_path / 'other.csv'
+    path.write_text('Year,Value\n2000,1\n')
+    with pytest.raises(ValueError):
+        worldbank.read_indicators([path], INDICATORS, range(2000, 2003))
+
+
+def test_chunked_read_equals_whole_read():
+    whole = worldbank.read_indicators(DUMPS, worldbank.GDP_INDICATORS, range(2000, 2024), chunksize=10**6)
+    chunked = worldbank.read_indicators(DUMPS, worldbank.GDP_INDICATORS, range(2000, 2024), chunksize=7)
+    pd.testing.assert_frame_equal(chunked, whole)
+
+
+def test_annual_changes_start_in_the_first_year(bulk):
+    df = worldbank.read_GDP_data([bulk], range(2001, 2003), countries=['Sri Lanka'])
+
+    assert df.index.get_level_values('Year').min() == 2001
+    changes = df.xs('Sri Lanka', level='Country')['GDP per capita (current US$) Annual Change (%)']
+    assert list(changes) == pytest.approx([(750 / 800 - 1) * 100, (825 / 750 - 1) * 100])